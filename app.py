@@ -1,17 +1,17 @@
 """
 application for visualising custom integrators for Lorenz equation
 """
+import itertools
 import tkinter as tk
-from tkinter import Frame, Button
+from tkinter import Frame, Button, filedialog, messagebox
 from tkinter import LEFT, TOP, X, FLAT, RAISED, RIGHT, BOTTOM, DISABLED, NORMAL, YES
-from matplotlib.backends.backend_tkagg import (
-    FigureCanvasTkAgg, NavigationToolbar2Tk)
-# Implement the default Matplotlib key bindings.
-from matplotlib.backend_bases import key_press_handler
-from matplotlib.figure import Figure
-from matplotlib.animation import FuncAnimation
-from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
+from comparison import ComparisonHistory, ComparisonWorker, configuration
+from checkpoint import load_checkpoint, matching_integrator, restore_state, save_checkpoint
+from density import DensityGrid
+from profiling import sparkline
+from trajectory import TrajectoryBuffer
+from worker import IntegrationWorker
 
 
 def makeform(widget, fields, params):
@@ -39,38 +39,67 @@ def makeform(widget, fields, params):
 class Wiz(tk.Tk):
     """
     window for visualisation
-    takes dict of integrators for init
+    takes dict of integrators for init,
+    max_points limits trajectory kept on screen to last max_points points (None keeps all),
+    point_budget turns on level of detail rendering with at most that many points of history drawn,
+    cache is optional TrajectoryCache, going back to starting point or earlier params reuses its trajectories,
+    profiler is optional profiling.Profiler, it times integration, frames and drawing and adds Stats window,
+    comparisons are extra configurations of Compare window as (label, integrator name, solver params to change)
     """
 
-    def __init__(self, integrators):
+    def __init__(self, integrators, max_points=None, point_budget=None, cache=None, profiler=None,
+                 comparisons=()):
+        # matplotlib is imported only when window is created, importing app stays cheap
+        from matplotlib.animation import FuncAnimation
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from matplotlib.figure import Figure
+        from plotting import LINE_COLOR, MARKER_COLOR, setup_axes
+        from rendering import LevelOfDetailRenderer, BlitAnimation
         tk.Tk.__init__(self)
         self.wm_title("Lorenz equation animation")
         self.begin = np.asarray((1, 1, 1))
         self.integrators = integrators
         self.equation = integrators['Taylor'].lorenz
         self.integ = integrators['Taylor']
-        self.wyniki = []
+        self.comparisons = list(comparisons)
+        self.wyniki = TrajectoryBuffer(max_points)
+        # every drawn point is also binned, so density view covers points dropped from wyniki
+        self.density = DensityGrid()
+        # integration runs in background thread, animation only draws points that are ready
+        self.worker = IntegrationWorker(self.integ, self.begin, cache=cache)
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument_integrators(integrators)
+            profiler.instrument(self, 'animate_one')
+            profiler.instrument(self, 'animate_ten')
+            profiler.instrument(self, 'update_plot')
+            profiler.instrument(self.wyniki, 'extend', 'trajectory extend')
         self.reset_plot()
         self.init_plot()
+        # points are computed while the rest of the window is built
+        self.worker.start()
         #       setting the plot and axes limits,
         #       calling canvas first so that plot manipulation on site is possible
         fig = Figure()
         self.canvas = FigureCanvasTkAgg(fig, master=self)  # A tk.DrawingArea.
+        if profiler is not None:
+            profiler.instrument(self.canvas, 'draw', 'canvas draw')
+            profiler.instrument(self.canvas, 'blit', 'canvas blit')
         self.canvas.draw()
-        self.axes = fig.add_subplot(111, projection='3d')
-        self.axes.autoscale(enable=True)
-        self.axes.set_xlim3d(-25, 25)
-        self.axes.set_ylim3d(-25, 25)
-        self.axes.set_zlim3d(0, 50)
-        self.main_plot_line, = self.axes.plot(self.wyniki[:, 0], self.wyniki[:, 1],
-                                              self.wyniki[:, 2], color="green")
-        self.current_plot_position = self.axes.scatter3D([self.wyniki[-1, 0]],
-                                                         [self.wyniki[-1, 1]],
-                                                         [self.wyniki[-1, 2]], color="red")
-        self.axes.set_axis_off()
+        self.axes = setup_axes(fig)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
         # setting animation
-        self.ani = FuncAnimation(fig, self.animate_one, interval=200)
+        self.frame_function = self.animate_one
+        if point_budget is None:
+            self.renderer = None
+            self.main_plot_line, = self.axes.plot(*self.wyniki.columns(), color=LINE_COLOR)
+            last = self.wyniki.last()
+            self.current_plot_position = self.axes.scatter3D([last[0]], [last[1]], [last[2]], color=MARKER_COLOR)
+            self.ani = FuncAnimation(fig, self.next_frame, interval=200)
+        else:
+            self.renderer = LevelOfDetailRenderer(self.axes, point_budget)
+            self.renderer.update(self.wyniki)
+            self.ani = BlitAnimation(fig, self.next_frame, 200, self.renderer.artists)
         self.paused = False
         # setting matplotlib toolbar, part of features is not working with 3d
         toolbar = NavigationToolbar2Tk(self.canvas, self)
@@ -88,6 +117,17 @@ class Wiz(tk.Tk):
         self.starting_point = tk.Button(master=toolbar2, relief=RAISED,
                                         text="Starting point", command=self.start_set)
         self.starting_point.pack(side=LEFT)
+        density_but = tk.Button(master=toolbar2, relief=FLAT, text="Density", command=self.density_show)
+        density_but.pack(side=LEFT)
+        compare_but = tk.Button(master=toolbar2, relief=FLAT, text="Compare", command=self.compare_show)
+        compare_but.pack(side=LEFT)
+        save_but = tk.Button(master=toolbar2, relief=FLAT, text="Save session", command=self.save_session)
+        save_but.pack(side=LEFT)
+        open_but = tk.Button(master=toolbar2, relief=FLAT, text="Open session", command=self.open_session)
+        open_but.pack(side=LEFT)
+        if profiler is not None:
+            stats_but = tk.Button(master=toolbar2, relief=FLAT, text="Stats", command=self.stats_show)
+            stats_but.pack(side=LEFT)
         # setting 2nd toolbar
         toolbar3 = Frame(master=self, bd=1, relief=RAISED)
         toolbar3.pack(side=TOP, fill=X)
@@ -96,10 +136,21 @@ class Wiz(tk.Tk):
         self.rungeint = tk.Button(master=toolbar3, relief=RAISED,
                                   text="Runge-Kutta 4", command=self.runge)
         self.rungeint.pack(side=LEFT)
+        # other integrators get generic parameter forms built from their solver params
+        self.solver_buttons = []
+        for name in integrators:
+            if name not in ('Taylor', 'Runge-Kutta'):
+                solver_button = tk.Button(master=toolbar3, relief=RAISED, text=name,
+                                          command=lambda name=name: self.solver_form(name))
+                solver_button.pack(side=LEFT)
+                self.solver_buttons.append(solver_button)
         step_ten = tk.Button(master=toolbar3, relief=FLAT, text="Step x10", command=self.step_ten)
         step_ten.pack(side=RIGHT)
         step = tk.Button(master=toolbar3, relief=FLAT, text="Step", command=self.step)
         step.pack(side=RIGHT)
+        if self.renderer is not None:
+            budget = tk.Button(master=toolbar2, relief=FLAT, text="Point budget", command=self.budget_set)
+            budget.pack(side=LEFT)
         self.btn_text = tk.StringVar()
         self.btn_text.set("Pause")
         step_pause = tk.Button(master=toolbar3, relief=FLAT,
@@ -116,43 +167,68 @@ class Wiz(tk.Tk):
         """
         resets plot to blank state
         """
-        self.wyniki = np.asarray([self.begin])
+        self.wyniki.reset([self.begin])
+        self.density = DensityGrid(self.density.bounds, self.density.shape).add([self.begin])
+        self.worker.restart(self.begin)
 
     def init_plot(self):
         """
         initializes plot to starting settings
         """
-        temp = self.integ.step(self.begin)
-        self.wyniki = np.asarray([self.begin, temp])
+        with self.worker.lock:
+            temp = self.integ.step(self.begin)
+        self.wyniki.reset([self.begin, temp])
+        self.density.add([temp])
+        self.worker.restart(temp)
+
+    def update_plot(self):
+        """
+        passes views of stored trajectory to the plot, no copies are made
+        :return: True when whole figure has to be drawn again (level of detail rendering only)
+        """
+        if self.renderer is not None:
+            return self.renderer.update(self.wyniki)
+        x_values, y_values, z_values = self.wyniki.columns()
+        self.main_plot_line.set_data(x_values, y_values)
+        self.main_plot_line.set_3d_properties(z_values)
+        self.current_plot_position._offsets3d = ([x_values[-1]], [y_values[-1]], [z_values[-1]])
+        return False
+
+    def next_frame(self, frame):
+        """
+        animation callback, calls animate_one or animate_ten depending on chosen mode
+        :param frame: frame number
+        :return: True when whole figure has to be drawn again
+        """
+        return self.frame_function(frame)
 
     def animate_one(self, _):
         """
         animates 1 frame
         :param _: not used
         """
-        self.wyniki = np.vstack([self.wyniki, self.integ.step(self.wyniki[-1])])
-        self.main_plot_line.set_data(self.wyniki[:, 0], self.wyniki[:, 1])
-        self.main_plot_line.set_3d_properties(self.wyniki[:, 2])
-        self.current_plot_position._offsets3d = ([self.wyniki[-1, 0]],
-                                                 [self.wyniki[-1, 1]], [self.wyniki[-1, 2]])
+        points = self.worker.take(1)
+        self.wyniki.extend(points)
+        self.density.add(points)
+        return self.update_plot()
 
     def animate_ten(self, _):
         """
         animates 10 frames
         :param _: not used
         """
-        for _ in range(10):
-            self.wyniki = np.vstack([self.wyniki, self.integ.step(self.wyniki[-1])])
-        self.main_plot_line.set_data(self.wyniki[:, 0], self.wyniki[:, 1])
-        self.main_plot_line.set_3d_properties(self.wyniki[:, 2])
-        self.current_plot_position._offsets3d = ([self.wyniki[-1, 0]],
-                                                 [self.wyniki[-1, 1]], [self.wyniki[-1, 2]])
+        points = self.worker.take(10)
+        self.wyniki.extend(points)
+        self.density.add(points)
+        return self.update_plot()
 
     def on_key_press(self, event):
         """
         matplotlib toolbar event handler
         :param event:
         """
+        # Implement the default Matplotlib key bindings.
+        from matplotlib.backend_bases import key_press_handler
         print("you pressed {}".format(event.key))
         key_press_handler(event, self.canvas, self.toolbar)
 
@@ -161,10 +237,65 @@ class Wiz(tk.Tk):
         shuts app down
         :return:
         """
+        self.worker.stop()
         self.quit()  # stops mainloop
         self.destroy()  # this is necessary on Windows to prevent
         # Fatal Python Error: PyEval_RestoreThread: NULL tstate
 
+    def save_session(self, path=None, tail=100000):
+        """
+        writes checkpoint with current integrator, its params, starting point and drawn trajectory
+        :param path: checkpoint file, asked for when None
+        :param tail: last drawn points stored at most
+        """
+        path = path or filedialog.asksaveasfilename(parent=self, defaultextension=".npz")
+        if not path:
+            return
+        name = next(name for name, integrator in self.integrators.items() if integrator is self.integ)
+        points = self.wyniki.view()
+        with self.worker.lock:
+            save_checkpoint(path, self.integ, points[-1], len(points) - 1, points[-tail:],
+                            {'integrator name': name, 'begin': self.begin.tolist()})
+
+    def open_session(self, path=None):
+        """
+        continues session saved by save_session, drawn trajectory is restored
+        and integration goes on from its last point, checkpoints of batch runs open the same way
+        :param path: checkpoint file, asked for when None
+        """
+        path = path or filedialog.askopenfilename(parent=self, filetypes=[("checkpoint", "*.npz")])
+        if not path:
+            return
+        checkpoint = load_checkpoint(path)
+        name = matching_integrator(self.integrators, checkpoint)
+        if name is None:
+            messagebox.showerror("Open session", "{} needs integrator {} missing in this window".format(
+                path, type(checkpoint.integrator).__name__), parent=self)
+            return
+        integrator = self.integrators[name]
+        points = checkpoint.state[None] if checkpoint.tail is None else checkpoint.tail
+        # checkpoints of batch runs have no starting point of drawing, the tail is all there is
+        self.begin = np.asarray(checkpoint.extra.get('begin', points[0]), dtype=float)
+        self.wyniki.reset(points)
+        self.density = DensityGrid(self.density.bounds, self.density.shape).add(points)
+        self.worker.restart(checkpoint.state, apply=lambda: restore_state(integrator, checkpoint),
+                            integrator=integrator)
+        self.integ = integrator
+        if self.renderer is not None:
+            self.renderer.invalidate()
+
+    def change_integrator(self, name, params):
+        """
+        switches to integrator with new solver params,
+        steps computed ahead by the worker with old settings are dropped
+        :param name: key of integrator in integrators dict
+        :param params: dict of solver params
+        """
+        integrator = self.integrators[name]
+        self.worker.restart(self.wyniki.last(), apply=lambda: integrator.set_solver_params(params),
+                            integrator=integrator)
+        self.integ = integrator
+
     def submit_lorenz_para(self, widget, ents):
         """
         changes Lorenz equation parameters on button click
@@ -174,7 +305,7 @@ class Wiz(tk.Tk):
         """
         params = {e: float(ents[e].get()) for e in ents}
         self.button_state(NORMAL)
-        self.equation.set_params(params)
+        self.worker.restart(self.wyniki.last(), apply=lambda: self.equation.set_params(params))
         widget.destroy()
 
     def submit_taylor_para(self, widget, ents):
@@ -187,8 +318,7 @@ class Wiz(tk.Tk):
         params = {e: float(ents[e].get()) for e in ents}
         params['order'] = int(params['order'])
         self.button_state(NORMAL)
-        self.integrators['Taylor'].set_solver_params(params)
-        self.integ = self.integrators['Taylor']
+        self.change_integrator('Taylor', params)
         widget.destroy()
 
     def submit_runge_para(self, widget, ents):
@@ -200,8 +330,32 @@ class Wiz(tk.Tk):
         """
         params = {e: float(ents[e].get()) for e in ents}
         self.button_state(NORMAL)
-        self.integrators['Runge-Kutta'].set_solver_params(params)
-        self.integ = self.integrators['Runge-Kutta']
+        self.change_integrator('Runge-Kutta', params)
+        widget.destroy()
+
+    def submit_solver_para(self, name, widget, ents):
+        """
+        changes parameters of integrator from integrators dict on button click
+        :param name: key of integrator in integrators dict
+        :param widget:
+        :param ents:
+        :return:
+        """
+        params = {e: float(ents[e].get()) for e in ents}
+        self.button_state(NORMAL)
+        self.change_integrator(name, params)
+        widget.destroy()
+
+    def submit_point_budget(self, widget, ents):
+        """
+        changes number of history points drawn in level of detail rendering on button click
+        :param widget:
+        :param ents:
+        :return:
+        """
+        self.button_state(NORMAL)
+        self.renderer.budget = max(int(float(ents['point budget'].get())), 2)
+        self.renderer.invalidate()
         widget.destroy()
 
     def submit_start_point(self, widget, ents):
@@ -237,6 +391,23 @@ class Wiz(tk.Tk):
         params = {'x0': self.begin[0], 'y0': self.begin[1], 'z0': self.begin[2]}
         ents = makeform(start_form, fields, params)
 
+    def budget_set(self):
+        """
+        window with point budget of level of detail rendering
+        :return:
+        """
+        self.button_state(DISABLED)
+        budget_form = tk.Toplevel(self)
+        budget_form.title("Rendering detail")
+        budget_form.geometry("300x120")
+        budget_form_submit = Button(budget_form, text="Submit",
+                                    command=lambda: self.submit_point_budget(budget_form, ents))
+        budget_form_submit.pack(side=tk.BOTTOM)
+        budget_form_cancel = Button(budget_form, text="Cancel",
+                                    command=lambda: self.cancel_window(budget_form))
+        budget_form_cancel.pack(side=tk.TOP)
+        ents = makeform(budget_form, 'point budget', {'point budget': self.renderer.budget})
+
     def cancel_window(self, widget):
         """
         closes form window without updating parameters
@@ -303,19 +474,216 @@ class Wiz(tk.Tk):
         params = dict(self.integrators['Runge-Kutta'].get_solver_params())
         ents = makeform(runge_form, fields, params)
 
+    def solver_form(self, name):
+        """
+        window with parameters of any integrator from integrators dict
+        :param name: key of integrator in integrators dict
+        :return:
+        """
+        self.button_state(DISABLED)
+        solver_form = tk.Toplevel(self)
+        solver_form.title(name + " solver parameters")
+        solver_form.geometry("300x180")
+        solver_form_submit = Button(solver_form, text="Submit",
+                                    command=lambda: self.submit_solver_para(name, solver_form, ents))
+        solver_form_submit.pack(side=tk.BOTTOM)
+        solver_form_cancel = Button(solver_form, text="Cancel",
+                                    command=lambda: self.cancel_window(solver_form))
+        solver_form_cancel.pack(side=tk.TOP)
+        params = dict(self.integrators[name].get_solver_params())
+        ents = makeform(solver_form, tuple(params), params)
+
+    def density_show(self):
+        """
+        window with projection of invariant density, shows density of drawn points
+        or of grid opened from .npy file (ie. computed with density.py), refreshed every second
+        :return:
+        """
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        density_window = tk.Toplevel(self)
+        density_window.title("Invariant density")
+        figure = Figure(figsize=(5, 4))
+        canvas = FigureCanvasTkAgg(figure, master=density_window)
+        axes = figure.add_subplot(111)
+        # projection axis and grid opened from file, None shows density of drawn points
+        view = {'axis': 1, 'grid': None}
+
+        def draw():
+            grid = view['grid'] or self.density
+            kept = [coord for coord in range(3) if coord != view['axis']]
+            axes.clear()
+            axes.imshow(np.log1p(grid.counts.sum(axis=view['axis'])).T, origin='lower', aspect='auto',
+                        extent=grid.bounds[kept].ravel(), cmap='inferno')
+            axes.set_xlabel("xyz"[kept[0]])
+            axes.set_ylabel("xyz"[kept[1]])
+            axes.set_title("{} points, log scale".format(grid.total))
+            canvas.draw_idle()
+
+        def show(**changes):
+            view.update(changes)
+            draw()
+
+        def open_grid():
+            path = filedialog.askopenfilename(parent=density_window, filetypes=[("numpy", "*.npy")])
+            if path:
+                show(grid=DensityGrid.load(path))
+
+        def save_grid():
+            path = filedialog.asksaveasfilename(parent=density_window, defaultextension=".npy")
+            if path:
+                (view['grid'] or self.density).save(path)
+
+        def refresh():
+            if density_window.winfo_exists():
+                draw()
+                density_window.after(1000, refresh)
+
+        toolbar = Frame(master=density_window, bd=1, relief=FLAT)
+        toolbar.pack(side=BOTTOM, fill=X)
+        for axis, text in ((2, "x-y"), (1, "x-z"), (0, "y-z")):
+            tk.Button(master=toolbar, relief=FLAT, text=text, command=lambda axis=axis: show(axis=axis)).pack(side=LEFT)
+        tk.Button(master=toolbar, relief=FLAT, text="Save", command=save_grid).pack(side=RIGHT)
+        tk.Button(master=toolbar, relief=FLAT, text="Open", command=open_grid).pack(side=RIGHT)
+        tk.Button(master=toolbar, relief=FLAT, text="Session", command=lambda: show(grid=None)).pack(side=RIGHT)
+        canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        refresh()
+
+    def comparison_configurations(self):
+        """
+        :return: configurations of Compare window, integrators and then comparisons,
+                 with equation and solver params the integrators have now
+        """
+        configurations = [configuration(name, integrator) for name, integrator in self.integrators.items()]
+        return configurations + [configuration(label, self.integrators[name], params)
+                                 for label, name, params in self.comparisons]
+
+    def compare_show(self):
+        """
+        window advancing all integrators and comparisons side by side from the last drawn point,
+        overlays their trajectories and plots pairwise separations and cpu time per step,
+        integration runs in background (in worker processes when there are more cores), refreshed twice a second
+        :return:
+        """
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from plotting import setup_axes
+        # labels stay, params are taken again by every restart
+        labels = [config['label'] for config in self.comparison_configurations()]
+        compare_window = tk.Toplevel(self)
+        compare_window.title("Comparison")
+        figure = Figure(figsize=(10, 5))
+        canvas = FigureCanvasTkAgg(figure, master=compare_window)
+        overlay = setup_axes(figure, 121)
+        separation_axes = figure.add_subplot(222)
+        cost_axes = figure.add_subplot(224)
+        trajectory_lines = [overlay.plot([], [], [], label=label, linewidth=0.8)[0] for label in labels]
+        overlay.legend(loc='upper left', fontsize='x-small')
+        separation_lines = [separation_axes.semilogy([], [], label="{} - {}".format(first, second), linewidth=0.8)[0]
+                            for first, second in itertools.combinations(labels, 2)]
+        separation_axes.set_ylabel("separation")
+        separation_axes.legend(loc='lower right', fontsize='xx-small', ncol=2, framealpha=0.3)
+        cost_lines = [cost_axes.semilogy([], [], label=label)[0] for label in labels]
+        cost_axes.set_xlabel("time")
+        cost_axes.set_ylabel("cpu us per step")
+        toolbar = Frame(master=compare_window, bd=1, relief=FLAT)
+        toolbar.pack(side=BOTTOM, fill=X)
+        canvas.get_tk_widget().pack(side=TOP, fill=tk.BOTH, expand=1)
+        state = {}
+
+        def restart():
+            worker = state.pop('worker', None)
+            if worker is not None:
+                worker.stop()
+            try:
+                worker = ComparisonWorker(self.comparison_configurations(), self.wyniki.last(), processes=None)
+            except ValueError as error:
+                compare_window.title("Comparison: {}".format(error))
+                return
+            compare_window.title("Comparison")
+            state['history'] = ComparisonHistory(len(labels), worker.interval)
+            state['worker'] = worker
+            worker.start()
+
+        def close():
+            worker = state.get('worker')
+            if worker is not None:
+                worker.stop()
+            compare_window.destroy()
+
+        def refresh():
+            if not compare_window.winfo_exists():
+                return
+            # polls even without worker, so that restart after failed one is drawn
+            worker = state.get('worker')
+            history = state.get('history')
+            if worker is not None:
+                history.add(worker.take(50))
+            if worker is not None and len(history.times):
+                for line, points in zip(trajectory_lines, history.points.transpose(1, 2, 0)):
+                    line.set_data(points[0], points[1])
+                    line.set_3d_properties(points[2])
+                for line, distances in zip(separation_lines, history.separations.T):
+                    line.set_data(history.times, distances)
+                for line, costs in zip(cost_lines, history.costs.T):
+                    line.set_data(history.round_times, 1e6 * costs)
+                for axes in (separation_axes, cost_axes):
+                    axes.relim()
+                    axes.autoscale_view()
+                canvas.draw_idle()
+            compare_window.after(500, refresh)
+
+        tk.Button(master=toolbar, relief=FLAT, text="Restart from drawn point", command=restart).pack(side=LEFT)
+        compare_window.protocol("WM_DELETE_WINDOW", close)
+        restart()
+        refresh()
+
+    def stats_show(self):
+        """
+        window with timings and counters of profiler, refreshed twice a second,
+        timings can be exported as JSON summary or as trace for chrome://tracing
+        :return:
+        """
+        stats_window = tk.Toplevel(self)
+        stats_window.title("Stats")
+        text = tk.StringVar()
+        toolbar = Frame(master=stats_window, bd=1, relief=FLAT)
+        toolbar.pack(side=BOTTOM, fill=X)
+
+        def export(method):
+            path = filedialog.asksaveasfilename(parent=stats_window, defaultextension=".json")
+            if path:
+                method(path)
+
+        tk.Button(master=toolbar, relief=FLAT, text="Export JSON",
+                  command=lambda: export(self.profiler.export_json)).pack(side=LEFT)
+        tk.Button(master=toolbar, relief=FLAT, text="Export trace",
+                  command=lambda: export(self.profiler.export_trace)).pack(side=LEFT)
+        tk.Label(master=stats_window, textvariable=text, font="TkFixedFont", justify=LEFT).pack(side=TOP)
+
+        def refresh():
+            if stats_window.winfo_exists():
+                lines = [self.profiler.report(), "", "durations from 1 us to 10 s, 4 bins per decade"]
+                for label, timer in sorted(self.profiler.timers.items()):
+                    lines.append("{:<28} {}".format(label, sparkline(timer.histogram())))
+                text.set("\n".join(lines))
+                stats_window.after(500, refresh)
+
+        refresh()
+
     def step(self):
         """
         changes visualisation to 1 step animation
         :return:
         """
-        self.ani.__dict__['_func'] = self.animate_one
+        self.frame_function = self.animate_one
 
     def step_ten(self):
         """
         changes visualisation to 10 step animation
         :return:
         """
-        self.ani.__dict__['_func'] = self.animate_ten
+        self.frame_function = self.animate_ten
 
     def step_pause(self):
         """
@@ -342,6 +710,7 @@ class Wiz(tk.Tk):
             self.axes.set_axis_on()
             self.btn_text_axes.set("Axes on")
         self.ax_state = not self.ax_state
+        self.canvas.draw_idle()
 
     def button_state(self, state):
         """
@@ -353,3 +722,5 @@ class Wiz(tk.Tk):
         self.rungeint['state'] = state
         self.taylint['state'] = state
         self.starting_point['state'] = state
+        for solver_button in self.solver_buttons:
+            solver_button['state'] = state
@@ -0,0 +1,306 @@
+"""
+headless driver, integrates Lorenz equation and streams the trajectory to a file in chunks,
+imports only numpy and integrators, so it runs on machines without display
+usage: python batch.py out.npy --integrator taylor --steps 1000000 --order 20 --time-step 0.01
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from cache import TrajectoryCache, trajectory_key
+from checkpoint import CheckpointWriter, load_checkpoint
+from integrators import LorenzEquation, INTEGRATOR_CLASSES
+from trajectory import TrajectoryBuffer
+
+# command line spelling of solver params, keys as in get_solver_params
+SOLVER_OPTIONS = {'time_step': 'time step', 'order': 'order', 'rtol': 'rtol', 'atol': 'atol',
+                  'tolerance': 'tolerance', 'max_step': 'max step'}
+
+
+def cli_name(name):
+    """
+    :param name: integrator name as in INTEGRATOR_CLASSES
+    :return: name used on command line, ie. runge-kutta
+    """
+    return name.lower().replace(' ', '-')
+
+
+def _reopen(path, offset, mode):
+    """
+    opens output of interrupted run and drops everything written after offset
+    :return: file positioned at offset
+    """
+    file = open(path, mode)
+    file.seek(offset)
+    file.truncate()
+    return file
+
+
+class NpyWriter:
+    """
+    writes .npy file of known shape, header first, then rows as they come,
+    with offset set existing file is continued from that byte
+    """
+
+    def __init__(self, path, n_rows, n_columns, offset=None):
+        if offset is not None:
+            self.file = _reopen(path, offset, 'r+b')
+            return
+        self.file = open(path, 'wb')
+        npy_format.write_array_header_1_0(self.file, {'descr': npy_format.dtype_to_descr(np.dtype('<f8')),
+                                                      'fortran_order': False,
+                                                      'shape': (n_rows, n_columns)})
+
+    def write(self, rows):
+        """
+        :param rows: ndarray of shape (N, n_columns)
+        """
+        self.file.write(np.ascontiguousarray(rows, dtype='<f8').tobytes())
+
+    def close(self):
+        """
+        closes the file
+        """
+        self.file.close()
+
+
+class RawWriter(NpyWriter):
+    """
+    writes little endian float64 values without any header
+    """
+
+    def __init__(self, path, n_rows, n_columns, offset=None):
+        self.file = open(path, 'wb') if offset is None else _reopen(path, offset, 'r+b')
+
+
+class CsvWriter(NpyWriter):
+    """
+    writes comma separated values with header line
+    """
+
+    def __init__(self, path, n_rows, n_columns, offset=None):
+        if offset is not None:
+            self.file = _reopen(path, offset, 'r+')
+            return
+        self.file = open(path, 'w')
+        self.file.write(','.join(('t', 'x', 'y', 'z')[-n_columns:]) + '\n')
+
+    def write(self, rows):
+        """
+        :param rows: ndarray of shape (N, n_columns)
+        """
+        np.savetxt(self.file, rows, delimiter=',', fmt='%.17g')
+
+
+WRITERS = {'npy': NpyWriter, 'raw': RawWriter, 'csv': CsvWriter}
+
+
+def sample_steps(time_step, interval):
+    """
+    :param time_step: step of fixed step integrator
+    :param interval: time between samples
+    :return: number of steps between samples
+    :raise ValueError: when time step does not divide interval, it usually comes from user input
+    """
+    steps = int(round(interval / time_step))
+    if steps < 1 or abs(steps * time_step - interval) > 1e-9 * interval:
+        raise ValueError("time step {} does not divide sampling interval {}".format(time_step, interval))
+    return steps
+
+
+def make_integrator(name, lorenz_params, solver_params):
+    """
+    :param name: integrator name as in INTEGRATOR_CLASSES or its command line spelling
+    :param lorenz_params: dictionary of sigma, rho and beta
+    :param solver_params: dictionary of solver params to change, keys as in get_solver_params
+    :return: integrator ready for computation
+    """
+    classes = {cli_name(key): value for key, value in INTEGRATOR_CLASSES.items()}
+    integrator = classes[cli_name(name)](LorenzEquation(**lorenz_params))
+    params = dict(integrator.get_solver_params())
+    params.update({key: value for key, value in solver_params.items() if key in params})
+    integrator.set_solver_params(params)
+    return integrator
+
+
+def stream_chunks(integrator, start, n_steps, chunk_size, with_time=False, done=0):
+    """
+    integrates in chunks reusing one buffer, memory does not depend on n_steps
+    :param integrator: any integrator from integrators module
+    :param start: starting point, it is the first row of the first chunk
+    :param n_steps: number of steps
+    :param chunk_size: number of rows in one chunk
+    :param with_time: prepend time column
+    :param done: steps done before, resumed run continues from start after done steps and does not repeat it,
+           adaptive integrator has to be restored with its time
+    :return: generator of ndarrays of shape (rows, 3) or (rows, 4), valid until next chunk
+    """
+    buffer = np.empty((chunk_size, 4 if with_time else 3))
+    points = np.empty((chunk_size, 3))
+    times = np.empty(chunk_size)
+    adaptive = hasattr(integrator, 'solve')
+    if adaptive and not done:
+        integrator.time = 0.0
+    point = np.asarray(start, dtype=float)
+    buffer[0] = 0.0
+    buffer[0, -3:] = point
+    filled = 0 if done else 1
+    while done < n_steps:
+        size = min(chunk_size - filled, n_steps - done)
+        if adaptive:
+            integrator.integrate(point, size, out=points[:size], times=times[:size])
+        else:
+            integrator.integrate(point, size, out=points[:size])
+            times[:size] = (done + 1 + np.arange(size)) * integrator.get_solver_params()['time step']
+        buffer[filled:filled + size, -3:] = points[:size]
+        if with_time:
+            buffer[filled:filled + size, 0] = times[:size]
+        point = points[size - 1].copy()
+        filled += size
+        done += size
+        yield buffer[:filled]
+        filled = 0
+    if filled:
+        yield buffer[:filled]
+
+
+def cached_chunks(cache, integrator, start, n_steps, chunk_size, with_time=False):
+    """
+    same chunks as stream_chunks, trajectory is taken from cache and only missing steps are computed,
+    whole trajectory is held in memory (or memory mapped from disk tier of cache)
+    :param cache: TrajectoryCache accepting integrator
+    :return: generator of ndarrays of shape (rows, 3) or (rows, 4)
+    """
+    trajectory = cache.get(integrator, start, n_steps)
+    buffer = np.empty((chunk_size, 4))
+    time_step = integrator.get_solver_params()['time step']
+    for first in range(0, n_steps + 1, chunk_size):
+        rows = trajectory[first:first + chunk_size]
+        if not with_time:
+            yield rows
+            continue
+        buffer[:len(rows), 0] = (first + np.arange(len(rows))) * time_step
+        buffer[:len(rows), 1:] = rows
+        yield buffer[:len(rows)]
+
+
+def parse_args(argv):
+    """
+    :param argv: command line arguments without program name
+    :return: argparse namespace
+    """
+    parser = argparse.ArgumentParser(description="integrate Lorenz equation without GUI")
+    parser.add_argument('output', help="output file")
+    parser.add_argument('--format', choices=sorted(WRITERS),
+                        help="output format, guessed from file extension by default")
+    parser.add_argument('--integrator', default='taylor',
+                        choices=[cli_name(name) for name in INTEGRATOR_CLASSES])
+    parser.add_argument('--steps', type=int, default=10000, help="number of steps")
+    parser.add_argument('--start', type=float, nargs=3, default=(1.0, 1.0, 1.0), metavar=('X0', 'Y0', 'Z0'))
+    parser.add_argument('--sigma', type=float, default=10.0)
+    parser.add_argument('--rho', type=float, default=28.0)
+    parser.add_argument('--beta', type=float, default=8 / 3)
+    parser.add_argument('--time-step', type=float)
+    parser.add_argument('--order', type=int)
+    parser.add_argument('--rtol', type=float)
+    parser.add_argument('--atol', type=float)
+    parser.add_argument('--tolerance', type=float)
+    parser.add_argument('--max-step', type=float)
+    parser.add_argument('--chunk', type=int, default=65536, help="rows computed and written at once")
+    parser.add_argument('--with-time', action='store_true', help="write time as the first column")
+    parser.add_argument('--cache', metavar='DIRECTORY',
+                        help="trajectory cache directory, fixed step runs reuse and extend cached trajectories "
+                             "(whole trajectory is then kept in memory)")
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help="checkpoint file, written during the run and removed at its end, "
+                             "when it exists the interrupted run is resumed from it")
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0, help="seconds between checkpoints")
+    parser.add_argument('--checkpoint-tail', type=int, default=0, help="last points stored in checkpoint")
+    args = parser.parse_args(argv)
+    if args.format is None:
+        extension = args.output.rsplit('.', 1)[-1].lower()
+        args.format = extension if extension in WRITERS else 'raw'
+    assert args.chunk > 1, "chunk has to hold at least 2 rows"
+    return args
+
+
+def main(argv=None):
+    """
+    runs batch integration described by command line
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    solver_params = {key: getattr(args, option) for option, key in SOLVER_OPTIONS.items()
+                     if getattr(args, option) is not None}
+    integrator = make_integrator(args.integrator, {'sigma': args.sigma, 'rho': args.rho, 'beta': args.beta},
+                                 solver_params)
+    n_columns = 4 if args.with_time else 3
+    if args.checkpoint is not None:
+        run_checkpointed(args, integrator)
+        return
+    cache = None
+    if args.cache is not None and TrajectoryCache.accepts(integrator):
+        cache = TrajectoryCache(directory=args.cache)
+        chunks = cached_chunks(cache, integrator, args.start, args.steps, args.chunk, args.with_time)
+    else:
+        chunks = stream_chunks(integrator, args.start, args.steps, args.chunk, args.with_time)
+    writer = WRITERS[args.format](args.output, args.steps + 1, n_columns)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    finally:
+        writer.close()
+    if cache is not None:
+        cache.flush()
+
+
+def run_checkpointed(args, integrator):
+    """
+    streams trajectory like main and takes checkpoints with position in output file,
+    output is flushed to disk before every checkpoint, so resumed run truncates it there and appends
+    :param args: parsed command line
+    :param integrator: integrator made from command line
+    """
+    # identifies the run, resuming with different command would mix two trajectories
+    run = {'key': trajectory_key(integrator, args.start), 'steps': args.steps, 'format': args.format,
+           'with time': args.with_time}
+    n_columns = 4 if args.with_time else 3
+    tail = TrajectoryBuffer(args.checkpoint_tail) if args.checkpoint_tail else None
+    if os.path.exists(args.checkpoint):
+        checkpoint = load_checkpoint(args.checkpoint)
+        # window sessions have no run, checked before output file is opened for truncation
+        if checkpoint.extra.get('run') != run:
+            raise ValueError("checkpoint {} belongs to another run".format(args.checkpoint))
+        integrator, done = checkpoint.integrator, checkpoint.steps
+        if tail is not None and checkpoint.tail is not None:
+            tail.extend(checkpoint.tail)
+        chunks = stream_chunks(integrator, checkpoint.state, args.steps, args.chunk, args.with_time, done)
+        writer = WRITERS[args.format](args.output, args.steps + 1, n_columns, checkpoint.extra['output bytes'])
+    else:
+        done = -1
+        chunks = stream_chunks(integrator, args.start, args.steps, args.chunk, args.with_time)
+        writer = WRITERS[args.format](args.output, args.steps + 1, n_columns)
+    checkpoints = CheckpointWriter(args.checkpoint, args.checkpoint_interval)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            done += len(chunk)
+            if tail is not None:
+                tail.extend(chunk[:, -3:])
+            if checkpoints.due() and done < args.steps:
+                writer.file.flush()
+                os.fsync(writer.file.fileno())
+                checkpoints.submit(integrator, chunk[-1, -3:], done, None if tail is None else tail.view(),
+                                   {'run': run, 'output bytes': writer.file.tell()})
+    finally:
+        writer.close()
+        checkpoints.close()
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
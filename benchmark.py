@@ -0,0 +1,165 @@
+"""
+work-precision benchmark of integrators,
+every configuration integrates from (1, 1, 1) to fixed time and records speed, work and error,
+results are written as JSON and can be compared with stored baseline to catch slowdowns
+usage: python benchmark.py results.json --baseline baseline.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from integrators import LorenzEquation, INTEGRATOR_CLASSES
+
+START = (1.0, 1.0, 1.0)
+
+# solver params of every measured configuration, keys as in get_solver_params
+CONFIGURATIONS = (
+    [('Runge-Kutta', {'time step': step}) for step in (0.02, 0.01, 0.005, 0.0025, 0.00125)]
+    + [('Taylor', {'order': order, 'time step': step})
+       for order in (4, 8, 12, 16, 20, 30) for step in (0.04, 0.02, 0.01, 0.005)]
+    + [('Dormand-Prince', {'time step': 0.01, 'rtol': tolerance, 'atol': tolerance * 1e-3})
+       for tolerance in (1e-4, 1e-6, 1e-8, 1e-10)]
+    + [('Adaptive Taylor', {'order': order, 'tolerance': tolerance, 'max step': 0.1})
+       for order in (12, 20, 30) for tolerance in (1e-8, 1e-12, 1e-16)]
+)
+
+
+def reference_point(t_end):
+    """
+    :param t_end: final time
+    :return: point at t_end computed with order 30 Taylor method and small step
+    """
+    integrator = INTEGRATOR_CLASSES['Taylor'](LorenzEquation())
+    integrator.set_solver_params({'order': 30, 'time step': 0.001})
+    return integrator.integrate(START, int(round(t_end / 0.001)))[-1]
+
+
+def measure(name, solver_params, t_end, reference, repeats=3, min_seconds=0.2):
+    """
+    :param name: integrator name from INTEGRATOR_CLASSES
+    :param solver_params: dict of solver params
+    :param t_end: final time, fixed step integrators use t_end / time step steps
+    :param reference: exact point at t_end
+    :param repeats: timing is the best of at least that many runs, first untimed run warms up kernel caches
+    :param min_seconds: runs are repeated until their total time reaches this, so short runs are not noise
+    :return: dict with one row of work-precision table
+    """
+    seconds = []
+    while len(seconds) <= repeats or sum(seconds[1:]) < min_seconds:
+        integrator = INTEGRATOR_CLASSES[name](LorenzEquation())
+        params = dict(integrator.get_solver_params())
+        params.update(solver_params)
+        integrator.set_solver_params(params)
+        begin = time.perf_counter()
+        if hasattr(integrator, 'solve'):
+            _, points = integrator.solve(START, t_end)
+            steps = integrator.statistics['steps']
+        else:
+            steps = int(round(t_end / params['time step']))
+            points = integrator.integrate(START, steps)
+        seconds.append(time.perf_counter() - begin)
+    if name == 'Runge-Kutta':
+        evaluations = 4 * steps
+    elif name == 'Dormand-Prince':
+        evaluations = integrator.statistics['rhs evaluations']
+    else:
+        # Taylor methods compute whole series instead of evaluating right hand side
+        evaluations = None
+    best = min(seconds[1:])
+    return {'integrator': name, 'params': dict(solver_params), 'steps': steps,
+            'rhs evaluations': evaluations, 'seconds': best,
+            'steps per second': steps / best if best > 0 else float('inf'),
+            'error': float(np.max(np.abs(points[-1] - reference)))}
+
+
+def run_benchmark(configurations=CONFIGURATIONS, t_end=2.0, repeats=3, min_seconds=0.2):
+    """
+    :param configurations: sequence of (integrator name, solver params)
+    :param t_end: time at which error is measured
+    :param repeats: timing is the best of at least that many runs
+    :param min_seconds: minimal total time of timed runs of one configuration
+    :return: dict ready for JSON, with metadata and list of results
+    """
+    reference = reference_point(t_end)
+    results = [measure(name, params, t_end, reference, repeats, min_seconds) for name, params in configurations]
+    return {'meta': {'t end': t_end, 'start': START, 'python': platform.python_version(),
+                     'numpy': np.__version__, 'machine': platform.machine()},
+            'results': results}
+
+
+def key(row):
+    """
+    :param row: result row
+    :return: hashable identifier of configuration
+    """
+    return row['integrator'], tuple(sorted(row['params'].items()))
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    finds configurations that got slower than baseline
+    :param results: output of run_benchmark
+    :param baseline: output of run_benchmark stored earlier
+    :param threshold: allowed relative drop of steps per second
+    :return: list of (row, baseline row) pairs with regression
+    """
+    previous = {key(row): row for row in baseline['results']}
+    regressions = []
+    for row in results['results']:
+        old = previous.get(key(row))
+        if old is not None and row['steps per second'] < (1 - threshold) * old['steps per second']:
+            regressions.append((row, old))
+    return regressions
+
+
+def format_table(results):
+    """
+    :param results: output of run_benchmark
+    :return: work-precision table as text
+    """
+    lines = ["{:<16} {:<48} {:>9} {:>11} {:>13} {:>10}".format(
+        'integrator', 'params', 'steps', 'rhs evals', 'steps/s', 'error')]
+    for row in results['results']:
+        params = ', '.join('{}={:g}'.format(name, value) for name, value in row['params'].items())
+        evaluations = '-' if row['rhs evaluations'] is None else row['rhs evaluations']
+        lines.append("{:<16} {:<48} {:>9} {:>11} {:>13.0f} {:>10.2e}".format(
+            row['integrator'], params, row['steps'], evaluations, row['steps per second'], row['error']))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """
+    runs benchmark described by command line
+    :param argv: command line arguments, sys.argv[1:] by default
+    :return: exit code, 1 when regression against baseline was found
+    """
+    parser = argparse.ArgumentParser(description="work-precision benchmark of integrators")
+    parser.add_argument('output', help="JSON file for results")
+    parser.add_argument('--baseline', help="JSON file with earlier results")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative drop of steps per second against baseline")
+    parser.add_argument('--t-end', type=float, default=2.0)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--min-seconds', type=float, default=0.2,
+                        help="minimal total time of timed runs of one configuration")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    results = run_benchmark(t_end=args.t_end, repeats=args.repeats, min_seconds=args.min_seconds)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=1)
+    print(format_table(results))
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.threshold)
+    for row, old in regressions:
+        print("regression: {} {} {:.0f} steps/s, baseline {:.0f}".format(
+            row['integrator'], row['params'], row['steps per second'], old['steps per second']))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
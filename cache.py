@@ -0,0 +1,200 @@
+"""
+content addressed cache of computed trajectories,
+entries are keyed on integrator type, solver params, equation params and starting point,
+kept in memory LRU with byte budget, evicted entries can spill to memory mapped .npy files,
+asking for more steps than cached extends the cached trajectory instead of recomputing it
+"""
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+def trajectory_key(integrator, start):
+    """
+    :param integrator: any integrator from integrators module
+    :param start: starting point
+    :return: hex digest identifying trajectory computed by integrator from start
+    """
+    description = {'integrator': type(integrator).__name__,
+                   'system': getattr(integrator.lorenz, 'signature', type(integrator.lorenz).__name__),
+                   'solver': sorted((key, float(value)) for key, value in integrator.get_solver_params().items()),
+                   'equation': sorted((key, float(value)) for key, value in integrator.get_lorenz_params().items()),
+                   'start': np.asarray(start, dtype='<f8').tobytes().hex()}
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+
+class _Entry:
+    """
+    growable trajectory, rows [0, length) are valid, rows beyond are preallocated capacity
+    """
+
+    def __init__(self, data, length):
+        self.data = data
+        self.length = length
+        # length written to disk tier
+        self.saved = length if isinstance(data, np.memmap) else 0
+        # bytes counted in memory tier, extension in place grows data before it is stored again
+        self.stored = 0
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def extend(self, points):
+        """
+        appends rows, capacity doubles when needed so that repeated extensions stay linear
+        :param points: ndarray of shape (N, 3)
+        """
+        needed = self.length + len(points)
+        if needed > len(self.data):
+            data = np.empty((max(needed, 2 * len(self.data)), 3))
+            data[:self.length] = self.data[:self.length]
+            self.data = data
+        self.data[self.length:needed] = points
+        self.length = needed
+
+
+class TrajectoryCache:
+    """
+    trajectory store shared by GUI and batch runs,
+    only fixed step integrators are cached, adaptive ones carry state between steps
+    and their continuation from a stored point would not be identical
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20, directory=None, max_disk_bytes=None):
+        """
+        :param max_bytes: memory budget of in-memory tier
+        :param directory: directory of on-disk tier, None turns it off
+        :param max_disk_bytes: budget of on-disk tier, None for unlimited
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.statistics = {'hits': 0, 'extensions': 0, 'misses': 0, 'disk hits': 0, 'evictions': 0}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def accepts(integrator):
+        """
+        :param integrator: any integrator from integrators module
+        :return: True if trajectories of integrator can be cached
+        """
+        return not hasattr(integrator, 'solve')
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def _load(self, key):
+        """
+        :return: entry from memory tier, or from disk tier (memory mapped), or None
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        self.statistics['disk hits'] += 1
+        os.utime(self._path(key))
+        data = np.load(self._path(key), mmap_mode='r')
+        return _Entry(data, len(data))
+
+    def fits(self, n_steps):
+        """
+        :param n_steps: number of steps
+        :return: True when trajectory of n_steps steps stays in memory tier, with room for doubling capacity,
+                 longer ones are spilled or dropped at once, so extending them step by step is not worth it
+        """
+        return 2 * (n_steps + 1) * 3 * 8 <= self.max_bytes
+
+    def _store(self, key, entry):
+        """
+        puts entry into memory tier and evicts least recently used entries over budget,
+        entry over budget on its own is evicted as well
+        """
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key).stored
+        entry.stored = entry.nbytes
+        self.entries[key] = entry
+        self.nbytes += entry.stored
+        while self.nbytes > self.max_bytes and self.entries:
+            old_key, old_entry = self.entries.popitem(last=False)
+            self.nbytes -= old_entry.stored
+            self.statistics['evictions'] += 1
+            self._spill(old_key, old_entry)
+
+    def _spill(self, key, entry):
+        """
+        writes entry to disk tier atomically, then trims disk tier to its budget
+        """
+        if self.directory is None or entry.saved == entry.length:
+            return
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as file:
+            np.save(file, entry.data[:entry.length])
+        os.replace(temporary, self._path(key))
+        entry.saved = entry.length
+        if self.max_disk_bytes is None:
+            return
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.npy')]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in files)
+        for path in files[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def get(self, integrator, start, n_steps):
+        """
+        trajectory of n_steps steps from start, computed only where the cache does not have it
+        :param integrator: any integrator from integrators module
+        :param start: starting point
+        :param n_steps: number of steps
+        :return: read-only ndarray of shape (n_steps + 1, 3), first row is start
+        """
+        if not self.accepts(integrator):
+            trajectory = np.vstack([np.asarray(start, dtype=float), integrator.integrate(start, n_steps)])
+            trajectory.flags.writeable = False
+            return trajectory
+        key = trajectory_key(integrator, start)
+        entry = self._load(key)
+        if entry is None:
+            self.statistics['misses'] += 1
+            entry = _Entry(np.empty((n_steps + 1, 3)), 1)
+            entry.data[0] = start
+        elif entry.length > n_steps:
+            self.statistics['hits'] += 1
+        else:
+            self.statistics['extensions'] += 1
+        if entry.length <= n_steps:
+            if isinstance(entry.data, np.memmap):
+                saved = entry.saved
+                entry = _Entry(np.array(entry.data), entry.length)
+                entry.saved = saved
+            entry.extend(integrator.integrate(entry.data[entry.length - 1], n_steps + 1 - entry.length))
+            self._store(key, entry)
+        result = entry.data[:n_steps + 1].view()
+        result.flags.writeable = False
+        return result
+
+    def flush(self):
+        """
+        writes entries of in-memory tier that changed since they were last written to disk tier
+        """
+        for key, entry in self.entries.items():
+            if entry.saved != entry.length:
+                self._spill(key, entry)
+
+    def clear(self):
+        """
+        empties in-memory tier, on-disk tier is left alone
+        """
+        self.entries.clear()
+        self.nbytes = 0
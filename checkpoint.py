@@ -0,0 +1,245 @@
+"""
+checkpoints of running integrations, so that long runs survive crashes and windows can reopen sessions,
+checkpoint is one .npz file with JSON header (format version, integrator, equation and solver params,
+step count, solver internals) and arrays with the current point and optional trajectory tail,
+files are replaced atomically and can be written in background thread while integration goes on,
+resumed integration continues bit for bit as if it was never stopped
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from integrators import LorenzEquation, INTEGRATOR_CLASSES
+
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """
+    integrator: integrator with saved params and internals, ready to continue from state
+    state: ndarray of shape (3,), point after steps steps
+    tail: ndarray of shape (N, 3) with last points of trajectory (state included) or None
+    extra: dict of values stored by caller, ie. position in output file
+    """
+
+    def __init__(self, integrator, state, steps, tail=None, extra=None, version=CHECKPOINT_VERSION):
+        self.integrator = integrator
+        self.state = state
+        self.steps = steps
+        self.tail = tail
+        self.extra = extra or {}
+        self.version = version
+
+
+def _integrator_name(integrator):
+    """
+    :return: key of integrator class in INTEGRATOR_CLASSES
+    """
+    return next(name for name, integrator_class in INTEGRATOR_CLASSES.items()
+                if type(integrator) is integrator_class)
+
+
+def _equation_header(equation):
+    """
+    :return: JSON description of equation, polynomial systems keep their source
+    """
+    if isinstance(equation, LorenzEquation):
+        return {'type': 'lorenz', 'params': equation.get_params()}
+    return {'type': 'polynomial', 'name': equation.name, 'equations': list(equation.equations),
+            'variables': list(equation.variables), 'params': equation.get_params()}
+
+
+def _make_equation(header):
+    """
+    :param header: output of _equation_header
+    :return: new equation
+    """
+    if header['type'] == 'lorenz':
+        return LorenzEquation(**header['params'])
+    from systems import PolynomialSystem
+    return PolynomialSystem(header['name'], header['equations'], header['params'], header['variables'])
+
+
+def snapshot(integrator, state, steps, tail=None, extra=None):
+    """
+    copies everything checkpoint needs, cheap enough to call from integration loop
+    :param integrator: any integrator from integrators module
+    :param state: current point
+    :param steps: number of steps done
+    :param tail: optional last points of trajectory
+    :param extra: optional dict ready for JSON
+    :return: tuple of header dict and dict of arrays
+    """
+    header = {'version': CHECKPOINT_VERSION, 'integrator': _integrator_name(integrator),
+              'equation': _equation_header(integrator.lorenz),
+              'solver params': {key: float(value) for key, value in integrator.get_solver_params().items()},
+              'steps': int(steps), 'extra': dict(extra or {})}
+    arrays = {'state': np.array(state, dtype=float)}
+    if tail is not None:
+        arrays['tail'] = np.array(tail, dtype=float).reshape(-1, 3)
+    if hasattr(integrator, 'solve'):
+        header['time'] = integrator.time
+        header['statistics'] = dict(integrator.statistics)
+        # first stage of the next Dormand-Prince step, recomputing it could differ in the last bit
+        derivative = getattr(integrator, '_last_derivative', None)
+        if derivative is not None:
+            arrays['derivative'] = np.array(derivative)
+    return header, arrays
+
+
+def write(path, header, arrays):
+    """
+    writes snapshot to temporary file next to path and renames it, so path always holds whole checkpoint
+    :param path: checkpoint file, .npz
+    :param header: header from snapshot
+    :param arrays: arrays from snapshot
+    """
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            np.savez(file, header=np.array(json.dumps(header)), **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def save_checkpoint(path, integrator, state, steps, tail=None, extra=None):
+    """
+    writes checkpoint at once, see snapshot for params
+    """
+    write(path, *snapshot(integrator, state, steps, tail, extra))
+
+
+def restore_state(integrator, checkpoint):
+    """
+    sets params and internals of existing integrator of the same type to those of checkpoint,
+    equation shared with other integrators gets checkpoint params as well
+    :param integrator: integrator to change
+    :param checkpoint: Checkpoint
+    """
+    saved = checkpoint.integrator
+    assert type(integrator) is type(saved)
+    integrator.set_lorenz_params(saved.get_lorenz_params())
+    integrator.set_solver_params(saved.get_solver_params())
+    if hasattr(saved, 'solve'):
+        integrator.time = saved.time
+        integrator.statistics.update(saved.statistics)
+        if hasattr(saved, '_last_derivative'):
+            integrator._last_derivative = saved._last_derivative
+
+
+def matching_integrator(integrators, checkpoint):
+    """
+    :param integrators: dict of integrators by name, ie. those of the window
+    :param checkpoint: Checkpoint of window session or of batch run
+    :return: name of integrator saved by window session, or of the first one with the type and equation type
+             of checkpoint integrator, None when there is none
+    """
+    name = checkpoint.extra.get('integrator name')
+    if name in integrators:
+        return name
+    saved = checkpoint.integrator
+    return next((name for name, integrator in integrators.items() if type(integrator) is type(saved)
+                 and type(integrator.lorenz) is type(saved.lorenz)), None)
+
+
+def load_checkpoint(path):
+    """
+    :param path: checkpoint file
+    :return: Checkpoint with new integrator
+    """
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        assert header['version'] <= CHECKPOINT_VERSION, "checkpoint from newer version"
+        arrays = {name: data[name] for name in data.files if name != 'header'}
+    integrator = INTEGRATOR_CLASSES[header['integrator']](_make_equation(header['equation']))
+    params = dict(integrator.get_solver_params())
+    params.update(header['solver params'])
+    integrator.set_solver_params(params)
+    if 'time' in header:
+        integrator.time = header['time']
+        integrator.statistics.update(header['statistics'])
+    if 'derivative' in arrays:
+        integrator._last_derivative = (arrays['derivative'][0], arrays['derivative'][1])
+    return Checkpoint(integrator, arrays['state'], header['steps'], arrays.get('tail'), header['extra'],
+                      header['version'])
+
+
+class CheckpointWriter(threading.Thread):
+    """
+    writes checkpoints in background, integration loop only takes snapshots,
+    when snapshots come faster than files are written only the newest one is kept,
+    failed write stops the thread and its exception is raised by the next submit or by close
+    """
+
+    def __init__(self, path, interval=60.0):
+        """
+        :param path: checkpoint file
+        :param interval: seconds between checkpoints, see due
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.path = path
+        self.interval = interval
+        self.last = time.perf_counter()
+        self.pending = None
+        self.condition = threading.Condition()
+        self.running = True
+        self.statistics = {'written': 0, 'dropped': 0, 'seconds': 0.0}
+        self.error = None
+        self.start()
+
+    def due(self):
+        """
+        :return: True when interval passed since the last submitted snapshot
+        """
+        return time.perf_counter() - self.last >= self.interval
+
+    def submit(self, integrator, state, steps, tail=None, extra=None):
+        """
+        takes snapshot and returns at once, see snapshot for params
+        :raise: exception of failed write of earlier snapshot
+        """
+        if self.error is not None:
+            raise self.error
+        taken = snapshot(integrator, state, steps, tail, extra)
+        with self.condition:
+            if self.pending is not None:
+                self.statistics['dropped'] += 1
+            self.pending = taken
+            self.condition.notify()
+        self.last = time.perf_counter()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or not self.running)
+                if self.pending is None:
+                    return
+                taken, self.pending = self.pending, None
+            begin = time.perf_counter()
+            try:
+                write(self.path, *taken)
+            except Exception as error:
+                self.error = error
+                return
+            self.statistics['written'] += 1
+            self.statistics['seconds'] += time.perf_counter() - begin
+
+    def close(self):
+        """
+        writes pending snapshot and stops the thread
+        :raise: exception of failed write, so that run without working checkpoints does not end quietly
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.join()
+        if self.error is not None:
+            raise self.error
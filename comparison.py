@@ -0,0 +1,198 @@
+"""
+comparison of several integrators advanced side by side from the same point,
+all of them are sampled at common times (fixed step ones every few steps, adaptive ones by dense output),
+so that their separations are measured at equal times, rounds of samples are computed ahead
+in background thread, optionally with every configuration in its own worker process
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import make_integrator, sample_steps
+from integrators import INTEGRATOR_CLASSES
+
+
+def configuration(label, integrator, solver_params=None):
+    """
+    :param label: name shown in legend
+    :param integrator: integrator from integrators module with LorenzEquation, its type and params are copied
+    :param solver_params: solver params to change, ie. {'order': 8}
+    :return: picklable dictionary describing integrator
+    """
+    name = next(name for name, integrator_class in INTEGRATOR_CLASSES.items() if type(integrator) is integrator_class)
+    params = {key: float(value) for key, value in integrator.get_solver_params().items()}
+    params.update(solver_params or {})
+    return {'label': label, 'integrator': name, 'lorenz params': dict(integrator.get_lorenz_params()),
+            'solver params': params}
+
+
+def _fixed_step(config):
+    """
+    :return: True for configuration of fixed step integrator
+    """
+    return not hasattr(INTEGRATOR_CLASSES[config['integrator']], 'solve')
+
+
+def sampling_interval(configurations):
+    """
+    :param configurations: list of configuration dictionaries
+    :return: the largest time step of fixed step integrators, 0.01 when all are adaptive
+    """
+    steps = [config['solver params']['time step'] for config in configurations if _fixed_step(config)]
+    return max(steps) if steps else 0.01
+
+
+def advance(config, point, n_samples, interval):
+    """
+    :param config: configuration dictionary
+    :param point: starting point
+    :param n_samples: number of samples
+    :param interval: time between samples
+    :return: tuple of ndarray of shape (n_samples, 3), cpu seconds, number of steps and solver params after the run
+    """
+    integrator = make_integrator(config['integrator'], config['lorenz params'], config['solver params'])
+    begin = time.thread_time()
+    if hasattr(integrator, 'solve'):
+        _, points = integrator.solve(point, n_samples * interval, interval * np.arange(1, n_samples + 1))
+        steps = integrator.statistics['steps']
+    else:
+        every = sample_steps(integrator.get_solver_params()['time step'], interval)
+        points = integrator.integrate(point, n_samples * every)[every - 1::every]
+        steps = n_samples * every
+    params = {key: float(value) for key, value in integrator.get_solver_params().items()}
+    return points, time.thread_time() - begin, steps, params
+
+
+def separations(points):
+    """
+    :param points: ndarray of shape (N, K, 3), samples of K integrators
+    :return: ndarray of shape (N, K * (K - 1) / 2) with distances of pairs in order of itertools.combinations
+    """
+    first, second = np.array(list(itertools.combinations(range(points.shape[1]), 2)), dtype=int).reshape(-1, 2).T
+    return np.linalg.norm(points[:, first] - points[:, second], axis=2)
+
+
+class ComparisonWorker(threading.Thread):
+    """
+    computes rounds of samples of all configurations ahead, bounded queue blocks it when nobody takes them,
+    round is dict with 'points' (n, K, 3), 'cpu' (K,) seconds and 'steps' (K,)
+    """
+
+    def __init__(self, configurations, start, interval=None, n_samples=20, processes=1, max_rounds=20):
+        """
+        :param configurations: list of configuration dictionaries
+        :param start: common starting point
+        :param interval: time between samples, sampling_interval by default
+        :param n_samples: samples in one round
+        :param processes: number of worker processes, None gives one per configuration up to cpu count,
+               1 computes in this thread
+        :param max_rounds: rounds computed ahead at most
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.configurations = [dict(config, **{'solver params': dict(config['solver params'])})
+                               for config in configurations]
+        self.interval = interval or sampling_interval(configurations)
+        for config in self.configurations:
+            if _fixed_step(config):
+                sample_steps(config['solver params']['time step'], self.interval)
+        self.points = np.tile(np.asarray(start, dtype=float), (len(configurations), 1))
+        self.n_samples = n_samples
+        self.processes = processes or min(len(configurations), os.cpu_count())
+        self.rounds = queue.Queue(maxsize=max_rounds)
+        self.stopped = threading.Event()
+
+    @property
+    def labels(self):
+        """
+        :return: list of labels of configurations
+        """
+        return [config['label'] for config in self.configurations]
+
+    def run(self):
+        """
+        producer loop
+        """
+        pool = ProcessPoolExecutor(self.processes) if self.processes > 1 else None
+        try:
+            while not self.stopped.is_set():
+                jobs = [(config, point, self.n_samples, self.interval)
+                        for config, point in zip(self.configurations, self.points)]
+                results = list(pool.map(advance, *zip(*jobs)) if pool else itertools.starmap(advance, jobs))
+                samples = np.stack([points for points, _, _, _ in results], axis=1)
+                for config, (_, _, _, params) in zip(self.configurations, results):
+                    config['solver params'] = params
+                self.points = samples[-1]
+                computed = {'points': samples, 'cpu': np.array([cpu for _, cpu, _, _ in results]),
+                            'steps': np.array([steps for _, _, steps, _ in results])}
+                while not self.stopped.is_set():
+                    try:
+                        self.rounds.put(computed, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def take(self, max_rounds):
+        """
+        :param max_rounds: rounds taken at most
+        :return: list of ready rounds, possibly empty
+        """
+        rounds = []
+        while len(rounds) < max_rounds:
+            try:
+                rounds.append(self.rounds.get_nowait())
+            except queue.Empty:
+                break
+        return rounds
+
+    def stop(self):
+        """
+        stops the producer loop
+        """
+        self.stopped.set()
+
+
+class ComparisonHistory:
+    """
+    last keep samples of compared trajectories with their separations, and cpu time per step of every round,
+    times count from the common starting point
+    """
+
+    def __init__(self, n_configurations, interval, keep=1000):
+        """
+        :param n_configurations: number of compared integrators
+        :param interval: time between samples
+        :param keep: samples kept, older ones are dropped
+        """
+        self.interval = interval
+        self.keep = keep
+        self.count = 0
+        self.times = np.empty(0)
+        self.points = np.empty((0, n_configurations, 3))
+        self.separations = np.empty((0, n_configurations * (n_configurations - 1) // 2))
+        self.round_times = np.empty(0)
+        self.costs = np.empty((0, n_configurations))
+
+    def add(self, rounds):
+        """
+        :param rounds: rounds taken from ComparisonWorker
+        """
+        if not rounds:
+            return
+        points = np.concatenate([computed['points'] for computed in rounds])
+        ends = self.count + np.cumsum([len(computed['points']) for computed in rounds])
+        times = (self.count + 1 + np.arange(len(points))) * self.interval
+        self.count += len(points)
+        self.times = np.concatenate([self.times, times])[-self.keep:]
+        self.points = np.concatenate([self.points, points])[-self.keep:]
+        self.separations = np.concatenate([self.separations, separations(points)])[-self.keep:]
+        costs = [computed['cpu'] / np.maximum(computed['steps'], 1) for computed in rounds]
+        self.round_times = np.concatenate([self.round_times, ends * self.interval])[-self.keep:]
+        self.costs = np.concatenate([self.costs, costs])[-self.keep:]
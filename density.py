@@ -0,0 +1,241 @@
+"""
+streaming estimate of invariant density (natural measure) on a fixed 3d voxel grid,
+chunks of trajectory are binned and dropped, so memory does not depend on the number of steps,
+partial grids of parallel workers are merged by adding counts
+usage: python density.py density.npy --steps 100000000 --processes 4
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import SOLVER_OPTIONS, cli_name, make_integrator
+from integrators import INTEGRATOR_CLASSES
+
+DEFAULT_BOUNDS = ((-25.0, 25.0), (-30.0, 30.0), (0.0, 55.0))
+
+
+class DensityGrid:
+    """
+    histogram of visited points on regular grid covering bounds,
+    counts[i, j, k] is the number of points in voxel (i, j, k), points outside bounds are only counted
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS, shape=(100, 100, 100)):
+        """
+        :param bounds: (low, high) for every coordinate
+        :param shape: number of voxels along every coordinate
+        """
+        self.bounds = np.asarray(bounds, dtype=float).reshape(3, 2)
+        assert np.all(self.bounds[:, 1] > self.bounds[:, 0])
+        self.shape = tuple(int(size) for size in shape)
+        self.counts = np.zeros(self.shape, dtype=np.int64)
+        self.outside = 0
+
+    @property
+    def voxel_size(self):
+        """
+        :return: ndarray of edge lengths of one voxel
+        """
+        return (self.bounds[:, 1] - self.bounds[:, 0]) / self.shape
+
+    @property
+    def total(self):
+        """
+        :return: number of all added points, including those outside
+        """
+        return int(self.counts.sum()) + self.outside
+
+    def add(self, points):
+        """
+        bins points, chunks much smaller than grid are counted by sorting, others by bincount over whole grid
+        :param points: ndarray of shape (N, 3)
+        :return: self
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        indices = np.floor((points - self.bounds[:, 0]) * (1 / self.voxel_size)).astype(np.intp)
+        # negative indices become huge when seen as unsigned, so one comparison checks both ends
+        inside = np.all(indices.view(np.uintp) < np.array(self.shape, dtype=np.uintp), axis=1)
+        flat = indices[inside] @ np.array([self.shape[1] * self.shape[2], self.shape[2], 1], dtype=np.intp)
+        self.outside += len(points) - len(flat)
+        counts = self.counts.reshape(-1)
+        if len(flat) * 64 < counts.size:
+            voxels, occurrences = np.unique(flat, return_counts=True)
+            counts[voxels] += occurrences
+        else:
+            counts += np.bincount(flat, minlength=counts.size)
+        return self
+
+    def merge(self, other):
+        """
+        adds counts of grid with the same bounds and shape
+        :param other: DensityGrid
+        :return: self
+        """
+        assert np.array_equal(self.bounds, other.bounds) and self.shape == other.shape
+        self.counts += other.counts
+        self.outside += other.outside
+        return self
+
+    def density(self):
+        """
+        :return: ndarray of probability densities in voxels, integrates to the fraction of points inside
+        """
+        return self.counts / (max(self.total, 1) * np.prod(self.voxel_size))
+
+    def projection(self, axis):
+        """
+        :param axis: coordinate summed out, ie. 1 gives density in x-z plane
+        :return: 2d ndarray of fractions of points
+        """
+        return self.counts.sum(axis=axis) / max(self.total, 1)
+
+    def save(self, path):
+        """
+        saves grid as one record in .npy file, counts in smallest unsigned type that holds them
+        :param path: file path
+        """
+        largest = int(self.counts.max()) if self.counts.size else 0
+        count_type = next(dtype for dtype in (np.uint8, np.uint16, np.uint32, np.uint64)
+                          if largest <= np.iinfo(dtype).max)
+        record = np.zeros((), dtype=[('bounds', 'f8', (3, 2)), ('outside', 'i8'),
+                                     ('counts', count_type, self.shape)])
+        record['bounds'] = self.bounds
+        record['outside'] = self.outside
+        record['counts'] = self.counts
+        np.save(path, record)
+
+    @staticmethod
+    def load(path):
+        """
+        :param path: file written by save
+        :return: DensityGrid
+        """
+        record = np.load(path)
+        grid = DensityGrid(record['bounds'], record['counts'].shape)
+        grid.counts[...] = record['counts']
+        grid.outside = int(record['outside'])
+        return grid
+
+
+def accumulate(integrator, initial_values, n_steps, grid, chunk_size=65536, transient=0):
+    """
+    integrates in chunks reusing one buffer and bins every computed point
+    :param integrator: fixed step integrator, so that points sample the trajectory uniformly in time
+    :param initial_values: starting point
+    :param n_steps: number of binned steps
+    :param grid: DensityGrid
+    :param chunk_size: steps computed at once
+    :param transient: steps computed and not binned, to reach the attractor
+    :return: last point
+    """
+    assert not hasattr(integrator, 'solve'), "adaptive steps would weight points by step size"
+    point = np.asarray(initial_values, dtype=float)
+    if transient:
+        point = integrator.integrate(point, transient)[-1]
+    points = np.empty((chunk_size, 3))
+    done = 0
+    while done < n_steps:
+        size = min(chunk_size, n_steps - done)
+        integrator.integrate(point, size, out=points[:size])
+        grid.add(points[:size])
+        point = points[size - 1].copy()
+        done += size
+    return point
+
+
+def accumulate_ensemble(integrator, initial_points, n_steps, grid, transient=0):
+    """
+    advances whole ensemble with step_batch and bins all points after every step
+    :param integrator: TaylorIntegrator or RungeKutta4th
+    :param initial_points: ndarray of shape (N, 3)
+    :return: ndarray of shape (N, 3) with last points
+    """
+    points = np.asarray(initial_points, dtype=float)
+    for _ in range(transient):
+        points = integrator.step_batch(points)
+    for _ in range(n_steps):
+        points = integrator.step_batch(points)
+        grid.add(points)
+    return points
+
+
+def _density_worker(job):
+    """
+    accumulates grid of one trajectory in worker process
+    :param job: dictionary with integrator configuration, starting point and grid layout
+    :return: DensityGrid
+    """
+    integrator = make_integrator(job['integrator'], job['lorenz params'], job['solver params'])
+    grid = DensityGrid(job['bounds'], job['shape'])
+    accumulate(integrator, job['start'], job['steps'], grid, job['chunk'], job['transient'])
+    return grid
+
+
+def parallel_density(integrator='Taylor', lorenz_params=None, solver_params=None, initial_points=((1.0, 1.0, 1.0),),
+                     n_steps=1000000, transient=1000, bounds=DEFAULT_BOUNDS, shape=(100, 100, 100),
+                     processes=None, chunk_size=65536):
+    """
+    every initial point gets n_steps steps in its own job, partial grids are merged
+    :param integrator: name from INTEGRATOR_CLASSES
+    :param lorenz_params: dictionary of sigma, rho and beta, defaults of LorenzEquation if None
+    :param solver_params: solver params to change, ie. {'order': 10}
+    :param initial_points: array like of shape (M, 3)
+    :param processes: number of worker processes, os.cpu_count() by default, 1 runs in this process
+    :return: DensityGrid
+    """
+    lorenz_params = lorenz_params or {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3}
+    jobs = [{'integrator': integrator, 'lorenz params': lorenz_params, 'solver params': dict(solver_params or {}),
+             'start': point, 'steps': n_steps, 'transient': transient, 'bounds': bounds, 'shape': shape,
+             'chunk': chunk_size} for point in np.asarray(initial_points, dtype=float).reshape(-1, 3)]
+    grid = DensityGrid(bounds, shape)
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        partial = map(_density_worker, jobs)
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            partial = list(pool.map(_density_worker, jobs))
+    for part in partial:
+        grid.merge(part)
+    return grid
+
+
+def main(argv=None):
+    """
+    computes density described by command line and saves it
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    parser = argparse.ArgumentParser(description="invariant density of Lorenz equation on voxel grid")
+    parser.add_argument('output', help=".npy file for the grid")
+    parser.add_argument('--integrator', default='taylor',
+                        choices=[cli_name(name) for name, integrator in INTEGRATOR_CLASSES.items()
+                                 if not hasattr(integrator, 'solve')])
+    parser.add_argument('--steps', type=int, default=1000000, help="binned steps of every trajectory")
+    parser.add_argument('--transient', type=int, default=1000)
+    parser.add_argument('--trajectories', type=int, default=1,
+                        help="number of trajectories, started near --start, run as separate jobs")
+    parser.add_argument('--start', type=float, nargs=3, default=(1.0, 1.0, 1.0), metavar=('X0', 'Y0', 'Z0'))
+    parser.add_argument('--sigma', type=float, default=10.0)
+    parser.add_argument('--rho', type=float, default=28.0)
+    parser.add_argument('--beta', type=float, default=8 / 3)
+    parser.add_argument('--time-step', type=float)
+    parser.add_argument('--order', type=int)
+    parser.add_argument('--shape', type=int, nargs=3, default=(100, 100, 100), metavar=('NX', 'NY', 'NZ'))
+    parser.add_argument('--bounds', type=float, nargs=6, default=np.ravel(DEFAULT_BOUNDS),
+                        metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX', 'ZMIN', 'ZMAX'))
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--chunk', type=int, default=65536, help="steps computed and binned at once")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    solver_params = {key: getattr(args, option) for option, key in SOLVER_OPTIONS.items()
+                     if getattr(args, option, None) is not None}
+    starts = np.asarray(args.start) + 1e-3 * np.arange(args.trajectories)[:, None]
+    grid = parallel_density(args.integrator, {'sigma': args.sigma, 'rho': args.rho, 'beta': args.beta},
+                            solver_params, starts, args.steps, args.transient,
+                            np.reshape(args.bounds, (3, 2)), args.shape, args.processes, args.chunk)
+    grid.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
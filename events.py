@@ -0,0 +1,159 @@
+"""
+event detection (Poincare sections, local extrema) for fixed step integrators,
+trajectory is integrated in chunks into one reused buffer, steps with sign change of event function
+get local polynomial (Taylor series of the step or cubic Hermite interpolant for Runge Kutta)
+and the crossing is found on it, only event records leave the chunk loop, so memory does not depend on n_steps
+"""
+import numpy as np
+
+from integrators import TaylorIntegrator, RungeKutta4th
+
+
+class Event:
+    """
+    zero of state[coordinate] - value, or of time derivative of state[coordinate] when derivative is True,
+    direction 1 takes only crossings from below, -1 from above, 0 both
+    """
+
+    def __init__(self, coordinate, value=0.0, direction=0, derivative=False):
+        assert coordinate in (0, 1, 2) and direction in (-1, 0, 1)
+        self.coordinate = coordinate
+        self.value = value
+        self.direction = direction
+        self.derivative = derivative
+
+    def values(self, equation, points):
+        """
+        :param equation: equation of integrated system
+        :param points: ndarray of shape (N, 3)
+        :return: event function at points as ndarray of shape (N,)
+        """
+        if self.derivative:
+            return equation.eval_batch(points)[:, self.coordinate] - self.value
+        return points[:, self.coordinate] - self.value
+
+    def polynomial(self, coefficients, time_step):
+        """
+        :param coefficients: ndarray of shape (K, 3, M), local polynomials of state in theta = (t - t_k) / time_step
+        :param time_step: time step
+        :return: ndarray of shape (K, M), event function as polynomials in theta
+        """
+        polynomial = np.array(coefficients[:, self.coordinate])
+        if self.derivative:
+            polynomial[:-1] = polynomial[1:] * np.arange(1, len(polynomial))[:, None] / time_step
+            polynomial[-1] = 0.0
+        polynomial[0] -= self.value
+        return polynomial
+
+
+def plane(coordinate, value, direction=0):
+    """
+    :return: Event of crossing plane state[coordinate] = value
+    """
+    return Event(coordinate, value, direction)
+
+
+def maxima(coordinate):
+    """
+    :return: Event of local maximum of state[coordinate]
+    """
+    return Event(coordinate, 0.0, -1, derivative=True)
+
+
+def _horner(polynomial, theta):
+    """
+    :return: values and derivatives of polynomials of shape (K, M) at theta of shape (M,)
+    """
+    value, slope = polynomial[-1].copy(), np.zeros_like(theta)
+    for k in range(len(polynomial) - 2, -1, -1):
+        slope = slope * theta + value
+        value = value * theta + polynomial[k]
+    return value, slope
+
+
+def _roots(polynomial, iterations=60):
+    """
+    Newton iteration kept inside bracket by bisection, for all polynomials at once
+    :param polynomial: ndarray of shape (K, M) with polynomials changing sign on [0, 1]
+    :return: ndarray of shape (M,) with roots in [0, 1]
+    """
+    low, high = np.zeros(polynomial.shape[1]), np.ones(polynomial.shape[1])
+    low_sign = np.sign(polynomial[0])
+    theta = np.full(polynomial.shape[1], 0.5)
+    for _ in range(iterations):
+        value, slope = _horner(polynomial, theta)
+        below = np.sign(value) == low_sign
+        low, high = np.where(below, theta, low), np.where(below, high, theta)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = theta - value / slope
+        bisection = 0.5 * (low + high)
+        inside = np.isfinite(newton) & (newton > low) & (newton < high)
+        new_theta = np.where(value == 0, theta, np.where(inside, newton, bisection))
+        if np.all(np.abs(new_theta - theta) <= 4 * np.finfo(float).eps):
+            return new_theta
+        theta = new_theta
+    return theta
+
+
+def local_polynomials(integrator, starts, ends):
+    """
+    :param integrator: TaylorIntegrator or RungeKutta4th
+    :param starts: ndarray of shape (M, 3), points at the beginning of steps
+    :param ends: ndarray of shape (M, 3), points at the end of steps
+    :return: ndarray of shape (K, 3, M), state over the step as polynomials in theta
+    """
+    time_step = integrator.get_solver_params()['time step']
+    if isinstance(integrator, TaylorIntegrator):
+        coefficients = integrator.coefficients_batch(starts)
+        return coefficients * (time_step ** np.arange(len(coefficients)))[:, None, None]
+    first = time_step * integrator.lorenz.eval_batch(starts).T
+    last = time_step * integrator.lorenz.eval_batch(ends).T
+    starts, ends = starts.T, ends.T
+    return np.array([starts, first, 3 * (ends - starts) - 2 * first - last, 2 * (starts - ends) + first + last])
+
+
+def detect_events(integrator, initial_values, n_steps, event, chunk_size=4096, t_start=0.0):
+    """
+    streams events of trajectory, an even number of crossings inside one step is not seen
+    :param integrator: TaylorIntegrator or RungeKutta4th
+    :param initial_values: starting point at time t_start
+    :param n_steps: number of steps
+    :param event: Event
+    :param chunk_size: steps integrated at once
+    :param t_start: time of initial_values
+    :return: generator of tuples (times, states, directions) with ndarrays of shapes (M,), (M, 3), (M,),
+             one tuple for every chunk with events
+    """
+    assert isinstance(integrator, (TaylorIntegrator, RungeKutta4th)), "events need fixed step integrator"
+    time_step = integrator.get_solver_params()['time step']
+    points = np.empty((chunk_size + 1, 3))
+    points[0] = initial_values
+    done = 0
+    while done < n_steps:
+        size = min(chunk_size, n_steps - done)
+        integrator.integrate(points[0], size, out=points[1:size + 1])
+        values = event.values(integrator.lorenz, points[:size + 1])
+        before, after = values[:-1], values[1:]
+        rising = (before < 0) & (after >= 0)
+        falling = (before > 0) & (after <= 0)
+        crossing = rising if event.direction == 1 else falling if event.direction == -1 else rising | falling
+        steps = np.flatnonzero(crossing)
+        if len(steps):
+            polynomial = local_polynomials(integrator, points[steps], points[steps + 1])
+            theta = _roots(event.polynomial(polynomial, time_step))
+            states = np.empty((len(steps), 3))
+            for coordinate in range(3):
+                states[:, coordinate] = _horner(polynomial[:, coordinate], theta)[0]
+            yield t_start + (done + steps + theta) * time_step, states, np.where(rising[steps], 1, -1)
+        points[0] = points[size]
+        done += size
+
+
+def lorenz_map(integrator, initial_values, n_steps, coordinate=2, chunk_size=4096):
+    """
+    successive local maxima of one coordinate, z_{n+1} against z_n gives the Lorenz map
+    :return: ndarray with values of maxima in order
+    """
+    parts = [states[:, coordinate] for _, states, _ in
+             detect_events(integrator, initial_values, n_steps, maxima(coordinate), chunk_size)]
+    return np.concatenate(parts) if parts else np.empty(0)
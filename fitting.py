@@ -0,0 +1,328 @@
+"""
+estimation of Lorenz params (sigma, rho, beta) from observed trajectory by multiple shooting,
+samples are cut into segments, every segment starts from its own fitted point (node)
+and all segments are integrated together as one batch, sensitivities to nodes and params come from
+variational equations integrated next to the state, Levenberg-Marquardt minimizes misfit of samples
+plus weighted gaps between end of every segment and the next node,
+normal equations are block tridiagonal in nodes bordered by params, they are accumulated sample by sample
+and solved by block cyclic reduction and Schur complement, so time and memory grow linearly with samples
+usage: python fitting.py observed.npy --interval 0.01 --segment 50
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from batch import cli_name, make_integrator, sample_steps
+from integrators import TaylorIntegrator, RungeKutta4th
+from lyapunov import runge_kutta_tangent_step, taylor_tangent_step
+
+PARAM_NAMES = ('sigma', 'rho', 'beta')
+
+
+class FitResult:
+    """
+    params: dict of fitted sigma, rho and beta
+    errors: dict of their standard errors estimated from residuals
+    nodes: ndarray of shape (segments, 3), fitted starting points of segments
+    history: sum of squared residuals before the first and after every accepted iteration
+    rms: root mean square of misfit of samples
+    gap: largest distance between end of segment and the next node
+    """
+
+    def __init__(self, params, errors, nodes, history, iterations, converged, fit_time, rms, gap, samples):
+        self.params = params
+        self.errors = errors
+        self.nodes = nodes
+        self.history = history
+        self.iterations = iterations
+        self.converged = converged
+        self.fit_time = fit_time
+        self.rms = rms
+        self.gap = gap
+        self.samples = samples
+
+    def report(self):
+        """
+        :return: dict ready for JSON
+        """
+        return {'params': dict(self.params), 'errors': dict(self.errors), 'samples': self.samples,
+                'segments': len(self.nodes), 'iterations': self.iterations, 'converged': self.converged,
+                'fit time': self.fit_time, 'rms': self.rms, 'gap': self.gap, 'history': list(self.history)}
+
+
+def parameter_forcing(points):
+    """
+    derivative of right hand side of Lorenz equation by its params, linear in the point
+    :param points: ndarray of shape (N, 3)
+    :return: ndarray of shape (N, 3, 6), three zero columns for node sensitivities, then sigma, rho and beta
+    """
+    result = np.zeros(points.shape + (6,))
+    result[:, 0, 3] = points[:, 1] - points[:, 0]
+    result[:, 1, 4] = points[:, 0]
+    result[:, 2, 5] = -points[:, 2]
+    return result
+
+
+def shoot(integrator, nodes, n_samples, every):
+    """
+    integrates all segments as one batch together with their sensitivities
+    :param integrator: TaylorIntegrator or RungeKutta4th with equation of current params
+    :param nodes: ndarray of shape (segments, 3), starting points
+    :param n_samples: samples computed after the node
+    :param every: steps between samples
+    :return: generator of points of shape (segments, 3) and sensitivities of shape (segments, 3, 6)
+             of samples 1..n_samples, columns are derivatives by coordinates of node and by sigma, rho, beta
+    """
+    step = taylor_tangent_step if isinstance(integrator, TaylorIntegrator) else runge_kutta_tangent_step
+    points = nodes
+    sensitivities = np.zeros((len(nodes), 3, 6))
+    sensitivities[:, :, :3] = np.eye(3)
+    for _ in range(n_samples):
+        for _ in range(every):
+            points, sensitivities = step(integrator, points, sensitivities, parameter_forcing)
+        yield points, sensitivities
+
+
+class NormalEquations:
+    """
+    blocks of J^T J and J^T r of multiple shooting,
+    diagonal: (segments, 3, 3) node blocks, upper: (segments, 3, 3) blocks coupling node i with node i + 1,
+    border: (segments, 3, 3) blocks coupling nodes with params, params: (3, 3),
+    node_gradient: (segments, 3), param_gradient: (3,), cost: sum of squared residuals
+    """
+
+    def __init__(self, n_segments):
+        self.diagonal = np.zeros((n_segments, 3, 3))
+        self.upper = np.zeros((n_segments, 3, 3))
+        self.border = np.zeros((n_segments, 3, 3))
+        self.params = np.zeros((3, 3))
+        self.node_gradient = np.zeros((n_segments, 3))
+        self.param_gradient = np.zeros(3)
+        self.cost = 0.0
+        self.misfit = 0.0
+        self.gap = 0.0
+
+    def add_samples(self, residuals, sensitivities, rows=slice(None)):
+        """
+        adds misfit of samples, one for every segment in rows
+        :param residuals: ndarray of shape (n, 3), model minus observation
+        :param sensitivities: ndarray of shape (n, 3, 6) from shoot
+        """
+        node, param = sensitivities[:, :, :3], sensitivities[:, :, 3:]
+        node_t = node.transpose(0, 2, 1)
+        self.diagonal[rows] += node_t @ node
+        self.border[rows] += node_t @ param
+        self.params += np.einsum('nki,nkj->ij', param, param)
+        self.node_gradient[rows] += np.einsum('nki,nk->ni', node, residuals)
+        self.param_gradient += np.einsum('nki,nk->i', param, residuals)
+        squares = float(np.sum(residuals ** 2))
+        self.cost += squares
+        self.misfit += squares
+
+    def add_gaps(self, gaps, sensitivities, weight):
+        """
+        adds continuity residuals weight * (end of segment i - node i + 1) of all but the last segment
+        :param gaps: ndarray of shape (segments - 1, 3)
+        :param sensitivities: ndarray of shape (segments - 1, 3, 6) at ends of segments
+        """
+        node, param = weight * sensitivities[:, :, :3], weight * sensitivities[:, :, 3:]
+        residuals = weight * gaps
+        node_t = node.transpose(0, 2, 1)
+        self.diagonal[:-1] += node_t @ node
+        self.diagonal[1:] += weight ** 2 * np.eye(3)
+        self.upper[:-1] -= weight * node_t
+        self.border[:-1] += node_t @ param
+        self.border[1:] -= weight * param
+        self.params += np.einsum('nki,nkj->ij', param, param)
+        self.node_gradient[:-1] += np.einsum('nki,nk->ni', node, residuals)
+        self.node_gradient[1:] -= weight * residuals
+        self.param_gradient += np.einsum('nki,nk->i', param, residuals)
+        self.cost += float(np.sum(residuals ** 2))
+        self.gap = float(np.max(np.linalg.norm(gaps, axis=1), initial=0.0))
+
+    def solve(self, damping=0.0):
+        """
+        solves (J^T J + damping * diag(J^T J)) step = -J^T r
+        :return: tuple of steps of nodes (segments, 3) and params (3,), and Schur complement of params
+        """
+        diagonal = self.diagonal + damping * self.diagonal * np.eye(3)
+        params = self.params + damping * np.diag(np.diag(self.params))
+        right = np.concatenate([self.border, -self.node_gradient[:, :, None]], axis=2)
+        lower = np.zeros_like(self.upper)
+        lower[1:] = self.upper[:-1].transpose(0, 2, 1)
+        solved = solve_block_tridiagonal(lower, diagonal, self.upper, right)
+        coupled, free = solved[:, :, :3], solved[:, :, 3]
+        border_t = self.border.transpose(0, 2, 1)
+        schur = params - np.sum(border_t @ coupled, axis=0)
+        param_step = np.linalg.solve(schur, -self.param_gradient - np.einsum('nji,nj->i', self.border, free))
+        return free - coupled @ param_step, param_step, schur
+
+
+def solve_block_tridiagonal(lower, diagonal, upper, right):
+    """
+    block cyclic reduction, every level eliminates odd blocks at once, so there is no loop over blocks
+    :param lower: ndarray of shape (n, 3, 3), lower[i] multiplies x[i - 1], lower[0] is ignored
+    :param diagonal: ndarray of shape (n, 3, 3)
+    :param upper: ndarray of shape (n, 3, 3), upper[i] multiplies x[i + 1], upper[-1] is ignored
+    :param right: ndarray of shape (n, 3, k)
+    :return: ndarray of shape (n, 3, k)
+    """
+    size = len(diagonal)
+    if size == 1:
+        return np.linalg.solve(diagonal, right)
+    if size == 2:
+        matrix = np.block([[diagonal[0], upper[0]], [lower[1], diagonal[1]]])
+        return np.linalg.solve(matrix, right.reshape(6, -1)).reshape(right.shape)
+    lower, upper = lower.copy(), upper.copy()
+    lower[0] = 0.0
+    upper[-1] = 0.0
+    if size % 2 == 0:
+        # identity block at the end, so that both neighbours of every odd block exist
+        lower = np.concatenate([lower, np.zeros((1, 3, 3))])
+        diagonal = np.concatenate([diagonal, np.eye(3)[None]])
+        upper = np.concatenate([upper, np.zeros((1, 3, 3))])
+        right = np.concatenate([right, np.zeros((1,) + right.shape[1:])])
+    odd = np.linalg.solve(diagonal[1::2], np.concatenate([lower[1::2], upper[1::2], right[1::2]], axis=2))
+    odd_lower, odd_upper, odd_right = odd[:, :, :3], odd[:, :, 3:6], odd[:, :, 6:]
+    reduced_lower = np.zeros_like(lower[::2])
+    reduced_diagonal = diagonal[::2].copy()
+    reduced_upper = np.zeros_like(upper[::2])
+    reduced_right = right[::2].copy()
+    # even block i takes x[i + 1] from the odd block after it and x[i - 1] from the one before it
+    after, before = upper[:-1:2], lower[2::2]
+    reduced_diagonal[:-1] -= after @ odd_lower
+    reduced_upper[:-1] = -after @ odd_upper
+    reduced_right[:-1] -= after @ odd_right
+    reduced_diagonal[1:] -= before @ odd_upper
+    reduced_lower[1:] = -before @ odd_lower
+    reduced_right[1:] -= before @ odd_right
+    even = solve_block_tridiagonal(reduced_lower, reduced_diagonal, reduced_upper, reduced_right)
+    result = np.empty_like(right)
+    result[::2] = even
+    result[1::2] = odd_right - odd_lower @ even[:-1] - odd_upper @ even[1:]
+    return result[:size]
+
+
+def linearize(integrator, observed, nodes, length, every, continuity):
+    """
+    integrates all segments and accumulates normal equations without storing their trajectories
+    :param observed: ndarray of shape (segments * length + 1, 3)
+    :param nodes: ndarray of shape (segments, 3)
+    :param length: samples in one segment, node included
+    :param every: steps between samples
+    :param continuity: weight of gaps between segments
+    :return: NormalEquations
+    """
+    system = NormalEquations(len(nodes))
+    system.add_samples(nodes - observed[:-1:length], np.broadcast_to(np.eye(3, 6), (len(nodes), 3, 6)))
+    for k, (points, sensitivities) in enumerate(shoot(integrator, nodes, length, every), 1):
+        if k < length:
+            system.add_samples(points - observed[k::length], sensitivities)
+        else:
+            system.add_samples(points[-1:] - observed[-1:], sensitivities[-1:], slice(-1, None))
+            system.add_gaps(points[:-1] - nodes[1:], sensitivities[:-1], continuity)
+    return system
+
+
+def fit(observed, interval, initial_params=None, integrator='Runge-Kutta', solver_params=None, length=50,
+        continuity=1.0, max_iterations=50, tolerance=1e-10, damping=1e-3):
+    """
+    fits Lorenz params to trajectory sampled at equal times
+    :param observed: ndarray of shape (N, 3), samples of trajectory, the last N - 1 mod length samples are unused
+    :param interval: time between samples
+    :param initial_params: dict of starting sigma, rho and beta, classic values by default
+    :param integrator: name of fixed step integrator, Runge-Kutta or Taylor
+    :param solver_params: its params, time step has to divide interval, it is interval by default
+    :param length: samples in one segment, short segments keep chaotic trajectories close to the data
+    :param continuity: weight of gaps between segments against misfit of samples
+    :param max_iterations: Levenberg-Marquardt iterations at most
+    :param tolerance: relative change of residuals or of params and nodes which ends the fit
+    :param damping: starting damping of Levenberg-Marquardt
+    :return: FitResult
+    """
+    begin = time.perf_counter()
+    observed = np.asarray(observed, dtype=float)
+    n_segments = (len(observed) - 1) // length
+    assert observed.ndim == 2 and observed.shape[1] == 3, "observed has to be ndarray of shape (N, 3)"
+    assert n_segments >= 1, "observed trajectory shorter than one segment"
+    observed = observed[:n_segments * length + 1]
+    params = dict(initial_params or {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3})
+    solver_params = dict({'time step': interval}, **(solver_params or {}))
+    model = make_integrator(integrator, params, solver_params)
+    assert isinstance(model, (TaylorIntegrator, RungeKutta4th)), "only fixed step integrators can be fitted"
+    every = sample_steps(model.get_solver_params()['time step'], interval)
+    values = np.array([params[name] for name in PARAM_NAMES], dtype=float)
+    nodes = observed[:-1:length].copy()
+    system = linearize(model, observed, nodes, length, every, continuity)
+    history = [system.cost]
+    converged = False
+    iterations = 0
+    while iterations < max_iterations and not converged:
+        iterations += 1
+        node_step, param_step, _ = system.solve(damping)
+        trial_values = values + param_step
+        model.set_lorenz_params(dict(zip(PARAM_NAMES, trial_values)))
+        trial = linearize(model, observed, nodes + node_step, length, every, continuity)
+        if not trial.cost < system.cost:
+            damping *= 10
+            model.set_lorenz_params(dict(zip(PARAM_NAMES, values)))
+            converged = damping > 1e12
+            continue
+        change = max(np.max(np.abs(param_step) / (1 + np.abs(values))),
+                     np.max(np.abs(node_step)) / (1 + np.max(np.abs(nodes))))
+        converged = system.cost - trial.cost <= tolerance * system.cost or change <= tolerance
+        values, nodes, system = trial_values, nodes + node_step, trial
+        damping = max(damping / 10, 1e-12)
+        history.append(system.cost)
+    _, _, schur = system.solve()
+    n_residuals = 3 * len(observed) + 3 * (n_segments - 1)
+    variance = system.cost / max(n_residuals - 3 * n_segments - 3, 1)
+    errors = np.sqrt(np.abs(np.diag(np.linalg.inv(schur))) * variance)
+    return FitResult(dict(zip(PARAM_NAMES, values.tolist())), dict(zip(PARAM_NAMES, errors.tolist())), nodes,
+                     history, iterations, converged, time.perf_counter() - begin,
+                     float(np.sqrt(system.misfit / (3 * len(observed)))), system.gap, len(observed))
+
+
+def main(argv=None):
+    """
+    fits params to trajectory saved by batch.py and prints report
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    parser = argparse.ArgumentParser(description="fit of Lorenz params to observed trajectory")
+    parser.add_argument('observed', help=".npy file with samples as rows x, y, z or t, x, y, z")
+    parser.add_argument('--interval', type=float, help="time between samples, taken from t column when present")
+    parser.add_argument('--sigma', type=float, default=10.0, help="starting value")
+    parser.add_argument('--rho', type=float, default=28.0, help="starting value")
+    parser.add_argument('--beta', type=float, default=8 / 3, help="starting value")
+    parser.add_argument('--integrator', default='runge-kutta',
+                        choices=[cli_name('Runge-Kutta'), cli_name('Taylor')])
+    parser.add_argument('--time-step', type=float, help="time step dividing interval, interval by default")
+    parser.add_argument('--order', type=int, help="order of Taylor integrator")
+    parser.add_argument('--segment', type=int, default=50, help="samples in one shooting segment")
+    parser.add_argument('--continuity', type=float, default=1.0, help="weight of gaps between segments")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--tolerance', type=float, default=1e-10)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    observed = np.load(args.observed)
+    interval = args.interval
+    if observed.shape[1] == 4:
+        interval = interval or float(observed[1, 0] - observed[0, 0])
+        observed = observed[:, 1:]
+    assert interval, "--interval is needed for samples without t column"
+    solver_params = {key: value for key, value in (('time step', args.time_step), ('order', args.order))
+                     if value is not None}
+    result = fit(observed, interval, {'sigma': args.sigma, 'rho': args.rho, 'beta': args.beta}, args.integrator,
+                 solver_params, args.segment, args.continuity, args.iterations, args.tolerance)
+    for name in PARAM_NAMES:
+        print("{} = {:.10g} +- {:.2g}".format(name, result.params[name], result.errors[name]))
+    print("{} samples in {} segments, {} iterations{}, fit {:.3f} s".format(
+        result.samples, len(result.nodes), result.iterations, "" if result.converged else " (not converged)",
+        result.fit_time))
+    print("rms misfit {:.3e}, largest gap {:.3e}, residuals {}".format(
+        result.rms, result.gap, ' '.join('{:.2e}'.format(cost) for cost in result.history)))
+
+
+if __name__ == '__main__':
+    main()
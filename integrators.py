@@ -2,7 +2,87 @@
 module with several solvers for Lorenz equation implemented
 """
 import numpy as np
-from numpy.core._multiarray_umath import ndarray
+
+_TAYLOR_KERNELS = {}
+
+
+def _taylor_recurrence(order):
+    """
+    source lines computing Taylor coefficients x0..x{order-1}, y.., z.. from x0, y0, z0,
+    Cauchy products of the recurrence are unrolled into straight-line code on local floats
+    :param order: order of Taylor method as in TaylorIntegrator.params
+    :return: list of lines without indentation
+    """
+    lines = []
+    if order > 1:
+        lines += ["x1 = sigma * (y0 - x0)",
+                  "y1 = x0 * (rho - z0) - y0",
+                  "z1 = x0 * y0 - beta * z0"]
+    for i in range(1, order - 1):
+        product_xz = " + ".join("x{} * z{}".format(i - j, j) for j in range(i, -1, -1))
+        product_xy = " + ".join("x{} * y{}".format(i - j, j) for j in range(i, -1, -1))
+        lines += ["x{0} = sigma * (y{1} - x{1}) / {0}".format(i + 1, i),
+                  "y{0} = (rho * x{1} - y{1} - ({2})) / {0}".format(i + 1, i, product_xz),
+                  "z{0} = ({2} - beta * z{1}) / {0}".format(i + 1, i, product_xy)]
+    return lines
+
+
+def _compile_kernel(lines, label):
+    """
+    :param lines: source lines defining function named kernel
+    :param label: description used as file name in tracebacks
+    :return: compiled function
+    """
+    namespace = {}
+    exec(compile("\n".join(lines), "<{}>".format(label), "exec"), namespace)
+    return namespace["kernel"]
+
+
+def _taylor_kernel(order):
+    """
+    builds function integrating many Taylor steps of given order,
+    parameters and coefficients stay in local variables, so the loop over steps allocates nothing,
+    kernels are cached per order
+    :param order: order of Taylor method as in TaylorIntegrator.params
+    :return: function (x, y, z, sigma, rho, beta, time_step, n_steps, out),
+             out is flat buffer of doubles with room for 3 * n_steps values
+    """
+    if ('steps', order) in _TAYLOR_KERNELS:
+        return _TAYLOR_KERNELS[('steps', order)]
+    lines = ["def kernel(x0, y0, z0, sigma, rho, beta, time_step, n_steps, out):",
+             "    for k in range(n_steps):"]
+    lines += ["        " + line for line in _taylor_recurrence(order)]
+    last = max(order - 1, 0)
+    for coord in "xyz":
+        lines.append("        {0}_next = {0}{1}".format(coord, last))
+        lines += ["        {0}_next = {0}_next * time_step + {0}{1}".format(coord, i)
+                  for i in range(last - 1, -1, -1)]
+    lines += ["        x0 = x_next",
+              "        y0 = y_next",
+              "        z0 = z_next",
+              "        out[3 * k] = x0",
+              "        out[3 * k + 1] = y0",
+              "        out[3 * k + 2] = z0"]
+    kernel = _compile_kernel(lines, "taylor steps order {}".format(order))
+    _TAYLOR_KERNELS[('steps', order)] = kernel
+    return kernel
+
+
+def _taylor_coefficients_kernel(order):
+    """
+    builds function returning Taylor coefficients of given order, cached per order
+    :param order: order of Taylor method as in TaylorIntegrator.params
+    :return: function (x, y, z, sigma, rho, beta) -> list of 3 lists with order coefficients
+    """
+    if ('coefficients', order) in _TAYLOR_KERNELS:
+        return _TAYLOR_KERNELS[('coefficients', order)]
+    lines = ["def kernel(x0, y0, z0, sigma, rho, beta):"]
+    lines += ["    " + line for line in _taylor_recurrence(order)]
+    lines.append("    return [{}]".format(", ".join(
+        "[{}]".format(", ".join("{}{}".format(coord, i) for i in range(order))) for coord in "xyz")))
+    kernel = _compile_kernel(lines, "taylor coefficients order {}".format(order))
+    _TAYLOR_KERNELS[('coefficients', order)] = kernel
+    return kernel
 
 
 class LorenzEquation:
@@ -29,6 +109,21 @@ class LorenzEquation:
         value_z = point[0] * point[1] - self.beta * point[2]
         return np.asarray([value_x, value_y, value_z])
 
+    def eval_batch(self, points):
+        """
+        evaluation for whole ensemble of points at once,
+        parameters may be floats or ndarrays of shape (N,) (one set per point)
+        :param points: ndarray of shape (N, 3)
+        :return: evaluation of lorentz equation for every point as ndarray of shape (N, 3)
+        """
+        points = np.asarray(points, dtype=float)
+        assert points.ndim == 2 and points.shape[1] == 3
+        values = np.empty_like(points)
+        values[:, 0] = self.sigma * (points[:, 1] - points[:, 0])
+        values[:, 1] = points[:, 0] * (self.rho - points[:, 2]) - points[:, 1]
+        values[:, 2] = points[:, 0] * points[:, 1] - self.beta * points[:, 2]
+        return values
+
     def get_params(self):
         """
         :return: dictonary of equation parameters
@@ -54,16 +149,19 @@ class TaylorIntegrator:
         self.lorenz = lorenz
         self.params = {'order': 4, 'time step': 0.01}
 
-    def step(self, initial_values):
+    def coefficients(self, initial_values):
         """
-        computes one step with Taylor method
+        computes Taylor coefficients of the solution passing through point
         initial_values: possible ndarray, point in 3d
-        return: point in 3d after one step in ndarray
+        return: ndarray of shape (3, order), column k is k-th derivative divided by k!
         """
         assert len(initial_values) == 3
+        if not isinstance(self.lorenz, LorenzEquation):
+            # polynomial systems bring their own generated recurrence, see systems.py
+            return self.lorenz.taylor_coefficients(initial_values, self.params['order'])
         fx0, fy0, fz0 = self.lorenz.eval(initial_values)
         vector_of_values = np.zeros((3, self.params['order']+1))
-        vector_of_derivatives: ndarray = np.zeros((3, self.params['order']))
+        vector_of_derivatives: np.ndarray = np.zeros((3, self.params['order']))
         vector_of_values[:, 0] = initial_values
         vector_of_derivatives[:, 0] = [fx0, fy0, fz0]
         vector_of_values[:, 1] = vector_of_derivatives[:, 0]
@@ -73,15 +171,89 @@ class TaylorIntegrator:
                                            l_params['rho'] * vector_of_values[0, i] - vector_of_values[1, i],
                                            (-1) * l_params['beta'] * vector_of_values[2, i]]
             for j in range(i, -1, -1):
-                vector_of_derivatives[1, i] -= 2 * vector_of_values[0, i - j] * vector_of_values[2, j]
-                vector_of_derivatives[2, i] += 2 * vector_of_values[0, i - j] * vector_of_values[1, j]
+                vector_of_derivatives[1, i] -= vector_of_values[0, i - j] * vector_of_values[2, j]
+                vector_of_derivatives[2, i] += vector_of_values[0, i - j] * vector_of_values[1, j]
 
             vector_of_values[:, i + 1] = vector_of_derivatives[:, i] / (i + 1)
+        return vector_of_values[:, :self.params['order']]
+
+    def step(self, initial_values):
+        """
+        computes one step with Taylor method
+        initial_values: possible ndarray, point in 3d
+        return: point in 3d after one step in ndarray
+        """
+        vector_of_values = self.coefficients(initial_values)
         result = vector_of_values[:, self.params['order']-1]
         for i in range(self.params['order'] - 2, -1, -1):
             result = result * self.params['time step'] + vector_of_values[:, i]
         return result
 
+    def coefficients_batch(self, initial_values):
+        """
+        computes Taylor coefficients for whole ensemble of points,
+        recurrence is the same as in coefficients, but every order is computed for all points at once
+        initial_values: ndarray of shape (N, 3)
+        return: ndarray of shape (order, 3, N), [k, :, n] is k-th coefficient for n-th point
+        """
+        points = np.asarray(initial_values, dtype=float)
+        assert points.ndim == 2 and points.shape[1] == 3
+        order = self.params['order']
+        if not isinstance(self.lorenz, LorenzEquation):
+            return self.lorenz.taylor_coefficients_batch(points, order)
+        # coefficients are kept as (order, coordinate, point) so Cauchy products run over axis 0
+        vector_of_values = np.zeros((order + 1, 3, len(points)))
+        vector_of_values[0] = points.T
+        vector_of_values[1] = self.lorenz.eval_batch(points).T
+        sigma, rho, beta = self.lorenz.sigma, self.lorenz.rho, self.lorenz.beta
+        for i in range(1, order - 1):
+            x_rev = vector_of_values[i::-1, 0]
+            derivative_x = sigma * (vector_of_values[i, 1] - vector_of_values[i, 0])
+            derivative_y = (rho * vector_of_values[i, 0] - vector_of_values[i, 1]
+                            - np.sum(x_rev * vector_of_values[:i + 1, 2], axis=0))
+            derivative_z = (np.sum(x_rev * vector_of_values[:i + 1, 1], axis=0)
+                            - beta * vector_of_values[i, 2])
+            vector_of_values[i + 1, 0] = derivative_x / (i + 1)
+            vector_of_values[i + 1, 1] = derivative_y / (i + 1)
+            vector_of_values[i + 1, 2] = derivative_z / (i + 1)
+        return vector_of_values[:order]
+
+    def step_batch(self, initial_values):
+        """
+        computes one step with Taylor method for whole ensemble of points
+        initial_values: ndarray of shape (N, 3)
+        return: ndarray of shape (N, 3) with points after one step
+        """
+        vector_of_values = self.coefficients_batch(initial_values)
+        result = vector_of_values[-1]
+        for i in range(self.params['order'] - 2, -1, -1):
+            result = result * self.params['time step'] + vector_of_values[i]
+        return result.T.copy()
+
+    def integrate(self, initial_values, n_steps, out=None):
+        """
+        computes n_steps consecutive steps with Taylor method,
+        same recurrence as in step, but with generated kernel that keeps parameters
+        and coefficients in local variables across steps
+        :param initial_values: point in 3d
+        :param n_steps: number of steps
+        :param out: optional ndarray of shape (n_steps, 3) for the results
+        :return: ndarray of shape (n_steps, 3), row k is the point after k + 1 steps
+        """
+        assert len(initial_values) == 3
+        if out is None:
+            out = np.empty((n_steps, 3))
+        assert out.shape == (n_steps, 3) and out.dtype == np.float64 and out.flags['C_CONTIGUOUS']
+        if not isinstance(self.lorenz, LorenzEquation):
+            self.lorenz.taylor_steps(initial_values, self.params['order'], self.params['time step'], n_steps,
+                                     memoryview(out).cast('B').cast('d'))
+            return out
+        x_value, y_value, z_value = (float(value) for value in initial_values)
+        kernel = _taylor_kernel(self.params['order'])
+        kernel(x_value, y_value, z_value, self.lorenz.sigma, self.lorenz.rho, self.lorenz.beta,
+               self.params['time step'], n_steps, memoryview(out).cast('B').cast('d'))
+        return out
+
     def get_lorenz_params(self):
         """
         :return: dictionary of parameters of Lorenz equation
@@ -132,6 +304,64 @@ class RungeKutta4th:
         result = init + self.params['time step'] * (first + 2 * second + 2 * third + fourth) / 6
         return result
 
+    def step_batch(self, initial_values):
+        """
+        :param initial_values: ndarray of shape (N, 3), ensemble of 3d coords
+        :return: ndarray of shape (N, 3) with coords after 1 step
+        """
+        init = np.asarray(initial_values, dtype=float)
+        assert init.ndim == 2 and init.shape[1] == 3
+        time_step = self.params['time step']
+        first = self.lorenz.eval_batch(init)
+        second = self.lorenz.eval_batch(init + 0.5 * time_step * first)
+        third = self.lorenz.eval_batch(init + 0.5 * time_step * second)
+        fourth = self.lorenz.eval_batch(init + time_step * third)
+        return init + time_step * (first + 2 * second + 2 * third + fourth) / 6
+
+    def integrate(self, initial_values, n_steps, out=None):
+        """
+        computes n_steps consecutive steps on plain floats, without temporary arrays
+        :param initial_values: 3d coord
+        :param n_steps: number of steps
+        :param out: optional ndarray of shape (n_steps, 3) for the results
+        :return: ndarray of shape (n_steps, 3), row k is the point after k + 1 steps
+        """
+        assert len(initial_values) == 3
+        if out is None:
+            out = np.empty((n_steps, 3))
+        assert out.shape == (n_steps, 3) and out.dtype == np.float64 and out.flags['C_CONTIGUOUS']
+        flat = memoryview(out).cast('B').cast('d')
+        time_step = self.params['time step']
+        if not isinstance(self.lorenz, LorenzEquation):
+            self.lorenz.runge_kutta_steps(initial_values, time_step, n_steps, flat)
+            return out
+        sigma, rho, beta = self.lorenz.sigma, self.lorenz.rho, self.lorenz.beta
+        half = 0.5 * time_step
+        x, y, z = (float(value) for value in initial_values)
+        for k in range(n_steps):
+            dx1 = sigma * (y - x)
+            dy1 = x * (rho - z) - y
+            dz1 = x * y - beta * z
+            x2, y2, z2 = x + half * dx1, y + half * dy1, z + half * dz1
+            dx2 = sigma * (y2 - x2)
+            dy2 = x2 * (rho - z2) - y2
+            dz2 = x2 * y2 - beta * z2
+            x3, y3, z3 = x + half * dx2, y + half * dy2, z + half * dz2
+            dx3 = sigma * (y3 - x3)
+            dy3 = x3 * (rho - z3) - y3
+            dz3 = x3 * y3 - beta * z3
+            x4, y4, z4 = x + time_step * dx3, y + time_step * dy3, z + time_step * dz3
+            dx4 = sigma * (y4 - x4)
+            dy4 = x4 * (rho - z4) - y4
+            dz4 = x4 * y4 - beta * z4
+            x = x + time_step * (dx1 + 2 * dx2 + 2 * dx3 + dx4) / 6
+            y = y + time_step * (dy1 + 2 * dy2 + 2 * dy3 + dy4) / 6
+            z = z + time_step * (dz1 + 2 * dz2 + 2 * dz3 + dz4) / 6
+            flat[3 * k] = x
+            flat[3 * k + 1] = y
+            flat[3 * k + 2] = z
+        return out
+
     def get_lorenz_params(self):
         """
         :return: dictionary of parameters
@@ -156,3 +386,260 @@ class RungeKutta4th:
         :param params: dict of time step and order
         """
         self.params['time step'] = params['time step']
+
+
+class DenseSegment:
+    """
+    polynomial interpolant of the solution over one accepted step,
+    y(t_start + theta * time_step) = sum of coefficients[:, k] * theta ** k for theta in [0, 1]
+    """
+
+    def __init__(self, t_start, time_step, coefficients):
+        self.t_start = t_start
+        self.time_step = time_step
+        self.coefficients = coefficients
+
+    @property
+    def t_end(self):
+        """
+        :return: time at the end of the step
+        """
+        return self.t_start + self.time_step
+
+    def __call__(self, times):
+        """
+        :param times: float or ndarray of times inside the step
+        :return: point in 3d as ndarray of shape (3,) or (N, 3) for ndarray of times
+        """
+        theta = (np.asarray(times, dtype=float) - self.t_start) / self.time_step
+        result = self.coefficients[:, -1:] * np.ones_like(theta)
+        for k in range(self.coefficients.shape[1] - 2, -1, -1):
+            result = result * theta + self.coefficients[:, k:k + 1]
+        return result.T if theta.ndim else result[:, 0]
+
+
+class AdaptiveSolver:
+    """
+    common part of solvers that choose their own time step,
+    subclasses implement adaptive_step(point, max_step) -> (point, time step, theta coefficients)
+    """
+
+    def __init__(self, lorenz: LorenzEquation):
+        self.lorenz = lorenz
+        self.time = 0.0
+        self.last_segment = None
+
+    def step(self, initial_values):
+        """
+        computes one accepted step, step size is chosen by the solver
+        :param initial_values: 3d coord
+        :return: 3d coord after 1 step as ndarray
+        """
+        assert len(initial_values) == 3
+        point, time_step, coefficients = self.adaptive_step(np.asarray(initial_values, dtype=float), None)
+        self.last_segment = DenseSegment(self.time, time_step, coefficients)
+        self.time += time_step
+        return point
+
+    def integrate(self, initial_values, n_steps, out=None, times=None):
+        """
+        computes n_steps consecutive accepted steps
+        :param initial_values: 3d coord
+        :param n_steps: number of steps
+        :param out: optional ndarray of shape (n_steps, 3) for the results
+        :param times: optional ndarray of shape (n_steps,) filled with time after every step
+        :return: ndarray of shape (n_steps, 3), row k is the point after k + 1 steps
+        """
+        if out is None:
+            out = np.empty((n_steps, 3))
+        assert out.shape == (n_steps, 3)
+        point = initial_values
+        for k in range(n_steps):
+            point = out[k] = self.step(point)
+            if times is not None:
+                times[k] = self.time
+        return out
+
+    def solve(self, initial_values, t_end, t_eval=None):
+        """
+        integrates from time 0 to t_end, last step is shortened to hit t_end exactly
+        :param initial_values: 3d coord at time 0
+        :param t_end: final time
+        :param t_eval: optional sorted times in [0, t_end], solution is evaluated there with dense output
+        :return: tuple of times and ndarray of shape (N, 3) with points at those times,
+                 accepted step ends for t_eval None, otherwise t_eval
+        """
+        point = np.asarray(initial_values, dtype=float)
+        assert len(point) == 3
+        self.time = 0.0
+        if t_eval is None:
+            times, points = [0.0], [point]
+        else:
+            times = np.asarray(t_eval, dtype=float)
+            points = np.empty((len(times), 3))
+            done = np.searchsorted(times, 0.0, side='right')
+            points[:done] = point
+        while self.time < t_end:
+            remaining = t_end - self.time
+            point, time_step, coefficients = self.adaptive_step(point, remaining)
+            self.last_segment = DenseSegment(self.time, time_step, coefficients)
+            self.time = t_end if time_step >= remaining else self.time + time_step
+            if t_eval is None:
+                times.append(self.time)
+                points.append(point)
+            else:
+                stop = np.searchsorted(times, self.time, side='right')
+                points[done:stop] = self.last_segment(times[done:stop])
+                done = stop
+        if t_eval is None:
+            return np.asarray(times), np.asarray(points)
+        return times, points
+
+    def get_lorenz_params(self):
+        """
+        :return: dictionary of parameters of Lorenz equation
+        """
+        return self.lorenz.get_params()
+
+    def set_lorenz_params(self, params):
+        """
+        :param params: dictionary of parameters for Lorentz equation
+        """
+        self.lorenz.set_params(params)
+
+    def get_solver_params(self):
+        """
+        :return: dict of params
+        """
+        return self.params
+
+
+class DormandPrince54(AdaptiveSolver):
+    """
+    embedded Runge Kutta 5(4) solver of Dormand and Prince with error control,
+    'time step' is the step that will be tried next and is updated after every step
+    """
+    NODES = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+    MATRIX = [np.array([]),
+              np.array([1 / 5]),
+              np.array([3 / 40, 9 / 40]),
+              np.array([44 / 45, -56 / 15, 32 / 9]),
+              np.array([19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729]),
+              np.array([9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656]),
+              np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])]
+    WEIGHTS = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0])
+    ERROR_WEIGHTS = WEIGHTS - np.array([5179 / 57600, 0, 7571 / 16695, 393 / 640,
+                                        -92097 / 339200, 187 / 2100, 1 / 40])
+    # coefficients of the 4th order continuous extension, columns multiply theta, ..., theta ** 4
+    DENSE = np.array([
+        [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+        [0, 0, 0, 0],
+        [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+        [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+        [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+        [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+        [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423]])
+
+    def __init__(self, lorenz: LorenzEquation):
+        AdaptiveSolver.__init__(self, lorenz)
+        self.params = {'time step': 0.01, 'rtol': 1e-6, 'atol': 1e-9}
+        self.statistics = {'steps': 0, 'rejected': 0, 'rhs evaluations': 0}
+        # derivative at the end of last step, reused as first stage of the next one
+        self._last_derivative = None
+
+    def adaptive_step(self, point, max_step):
+        """
+        tries steps until local error estimate is within tolerances
+        :param point: 3d coord as ndarray
+        :param max_step: upper bound for the step or None
+        :return: point after the step, used time step, coefficients of dense output in theta
+        """
+        stages = np.empty((7, 3))
+        if self._last_derivative is not None and np.array_equal(self._last_derivative[0], point):
+            stages[0] = self._last_derivative[1]
+        else:
+            stages[0] = self.lorenz.eval(point)
+            self.statistics['rhs evaluations'] += 1
+        time_step = self.params['time step']
+        rejected = False
+        while True:
+            if max_step is not None:
+                time_step = min(time_step, max_step)
+            for i in range(1, 7):
+                stages[i] = self.lorenz.eval(point + time_step * self.MATRIX[i] @ stages[:i])
+            self.statistics['rhs evaluations'] += 6
+            result = point + time_step * self.WEIGHTS @ stages
+            scale = self.params['atol'] + self.params['rtol'] * np.maximum(np.abs(point), np.abs(result))
+            error = np.sqrt(np.mean((time_step * self.ERROR_WEIGHTS @ stages / scale) ** 2))
+            if error <= 1:
+                break
+            self.statistics['rejected'] += 1
+            rejected = True
+            time_step *= max(0.2, 0.9 * error ** -0.2)
+            assert time_step > 1e-14 * max(1.0, abs(self.time)), "step size underflow"
+        factor = 5.0 if error == 0 else min(5.0, 0.9 * error ** -0.2)
+        self.params['time step'] = time_step * (min(1.0, factor) if rejected else factor)
+        self.statistics['steps'] += 1
+        self._last_derivative = (result, stages[6].copy())
+        coefficients = np.column_stack([point, time_step * stages.T @ self.DENSE])
+        return result, time_step, coefficients
+
+    def set_solver_params(self, params):
+        """
+        :param params: dict of time step, rtol and atol
+        """
+        self.params['time step'] = params['time step']
+        self.params['rtol'] = params['rtol']
+        self.params['atol'] = params['atol']
+
+
+class AdaptiveTaylorIntegrator(AdaptiveSolver):
+    """
+    Taylor method with step size chosen from decay of the last two Taylor coefficients,
+    so that the truncation error of every step stays near the tolerance
+    """
+
+    def __init__(self, lorenz: LorenzEquation):
+        AdaptiveSolver.__init__(self, lorenz)
+        self.params = {'order': 20, 'tolerance': 1e-12, 'max step': 0.1}
+        self.statistics = {'steps': 0}
+
+    def adaptive_step(self, point, max_step):
+        """
+        :param point: 3d coord as ndarray
+        :param max_step: upper bound for the step or None
+        :return: point after the step, used time step, coefficients of dense output in theta
+        """
+        order = self.params['order']
+        assert order >= 3
+        if isinstance(self.lorenz, LorenzEquation):
+            coefficients = np.asarray(_taylor_coefficients_kernel(order)(
+                point[0], point[1], point[2], self.lorenz.sigma, self.lorenz.rho, self.lorenz.beta))
+        else:
+            coefficients = self.lorenz.taylor_coefficients(point, order)
+        degree = order - 1
+        tolerance = self.params['tolerance'] * max(1.0, np.max(np.abs(point)))
+        time_step = self.params['max step']
+        for power in (degree - 1, degree):
+            norm = np.max(np.abs(coefficients[:, power]))
+            if norm > 0:
+                time_step = min(time_step, (tolerance / norm) ** (1 / power))
+        time_step *= np.exp(-0.7 / (degree - 1))
+        if max_step is not None:
+            time_step = min(time_step, max_step)
+        coefficients = coefficients * time_step ** np.arange(order)
+        self.statistics['steps'] += 1
+        return coefficients.sum(axis=1), time_step, coefficients
+
+    def set_solver_params(self, params):
+        """
+        :param params: dict of order, tolerance and max step
+        """
+        self.params['order'] = int(params['order'])
+        self.params['tolerance'] = params['tolerance']
+        self.params['max step'] = params['max step']
+
+
+# integrators by the names used in integ_dict of main.py
+INTEGRATOR_CLASSES = {'Taylor': TaylorIntegrator, 'Runge-Kutta': RungeKutta4th,
+                      'Dormand-Prince': DormandPrince54, 'Adaptive Taylor': AdaptiveTaylorIntegrator}
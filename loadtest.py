@@ -0,0 +1,89 @@
+"""
+load test of trajectory server, many clients ask for a few distinct trajectories at the same time,
+reports latency of the first chunk, completion times and throughput,
+server runs in this process on loopback unless --port of running server is given
+usage: python loadtest.py --clients 48 --distinct 4 --steps 100000
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from server import TrajectoryServer, fetch
+
+
+async def _client(host, port, n_steps, start, begin):
+    """
+    :return: tuple of seconds to first chunk, seconds to last chunk and number of rows
+    """
+    times = []
+    points, _ = await fetch(host, port, n_steps, start=start, on_chunk=lambda first, rows: times.append(
+        time.perf_counter()))
+    return times[0] - begin, times[-1] - begin, len(points)
+
+
+async def load_test(clients=32, distinct=4, n_steps=100000, host='127.0.0.1', port=None, processes=1,
+                    chunk_size=4096):
+    """
+    :param clients: number of simultaneous clients
+    :param distinct: number of distinct trajectories, client i asks for trajectory i % distinct
+    :param n_steps: steps of every trajectory
+    :param port: port of running server, None starts server on free loopback port
+    :param processes: worker processes of started server
+    :param chunk_size: rows per chunk of started server
+    :return: dict with latencies in seconds, throughput and server statistics
+    """
+    server = None
+    if port is None:
+        server = TrajectoryServer(processes, chunk_size)
+        port = await server.start(host)
+    try:
+        begin = time.perf_counter()
+        results = await asyncio.gather(*[_client(host, port, n_steps, (1.0, 1.0, 1.0 + 1e-3 * (client % distinct)),
+                                                 begin) for client in range(clients)])
+        wall = time.perf_counter() - begin
+    finally:
+        if server is not None:
+            await server.close()
+    first, last, rows = (np.array(values) for values in zip(*results))
+    report = {'clients': clients, 'distinct': distinct, 'steps': n_steps, 'wall time': wall,
+              'rows per second': rows.sum() / wall, 'megabytes per second': rows.sum() * 24 / wall / 1e6,
+              'first chunk p50': float(np.percentile(first, 50)), 'first chunk p90': float(np.percentile(first, 90)),
+              'first chunk max': float(first.max()), 'completion p50': float(np.percentile(last, 50)),
+              'completion max': float(last.max())}
+    if server is not None:
+        report['server'] = dict(server.statistics)
+    return report
+
+
+def main(argv=None):
+    """
+    runs load test described by command line and prints report
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    parser = argparse.ArgumentParser(description="load test of trajectory server")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--distinct', type=int, default=4, help="number of distinct trajectories")
+    parser.add_argument('--steps', type=int, default=100000)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="port of running server, by default one is started here")
+    parser.add_argument('--processes', type=int, default=1, help="worker processes of started server")
+    parser.add_argument('--chunk', type=int, default=4096, help="rows per chunk of started server")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    report = asyncio.run(load_test(args.clients, args.distinct, args.steps, args.host, args.port, args.processes,
+                                   args.chunk))
+    print("{} clients, {} distinct trajectories of {} steps in {:.3f} s".format(
+        report['clients'], report['distinct'], report['steps'], report['wall time']))
+    print("throughput {:.0f} rows/s, {:.1f} MB/s".format(report['rows per second'], report['megabytes per second']))
+    print("first chunk p50 {:.1f} ms, p90 {:.1f} ms, max {:.1f} ms".format(
+        1e3 * report['first chunk p50'], 1e3 * report['first chunk p90'], 1e3 * report['first chunk max']))
+    print("completion p50 {:.1f} ms, max {:.1f} ms".format(
+        1e3 * report['completion p50'], 1e3 * report['completion max']))
+    if 'server' in report:
+        print("server: " + ", ".join("{} {}".format(name, value) for name, value in report['server'].items()))
+
+
+if __name__ == '__main__':
+    main()
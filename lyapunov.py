@@ -0,0 +1,174 @@
+"""
+Lyapunov spectrum of Lorenz equation,
+tangent linear (variational) equations dV/dt = J(x) V are integrated next to the state
+with the scheme of TaylorIntegrator or RungeKutta4th, tangent vectors are kept orthonormal by QR
+everything works on ensembles, lorenz params may be ndarrays of shape (N,) (one set per point)
+"""
+import numpy as np
+
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th
+
+
+class LyapunovResult:
+    """
+    exponents: ndarray of shape (N, 3), spectrum sorted from the largest exponent
+    times: ndarray of times of running estimates
+    history: ndarray of shape (len(times), N, 3) with running estimates of the spectrum
+    """
+
+    def __init__(self, exponents, times, history):
+        self.exponents = exponents
+        self.times = times
+        self.history = history
+
+    @property
+    def maximal(self):
+        """
+        :return: ndarray of shape (N,) with the largest exponent
+        """
+        return self.exponents[:, 0]
+
+
+def _column(value):
+    """
+    :param value: parameter of equation, float or ndarray of shape (N,)
+    :return: value broadcastable against arrays of shape (N, 3)
+    """
+    return np.asarray(value, dtype=float)[..., None]
+
+
+def tangent_eval(lorenz: LorenzEquation, points, tangents):
+    """
+    right hand side of variational equation
+    :param lorenz: equation
+    :param points: ndarray of shape (N, 3)
+    :param tangents: ndarray of shape (N, 3, 3), columns are tangent vectors
+    :return: J(points) @ tangents as ndarray of shape (N, 3, 3)
+    """
+    x_value, y_value, z_value = (points[:, i, None] for i in range(3))
+    result = np.empty_like(tangents)
+    result[:, 0] = _column(lorenz.sigma) * (tangents[:, 1] - tangents[:, 0])
+    result[:, 1] = (_column(lorenz.rho) - z_value) * tangents[:, 0] - tangents[:, 1] - x_value * tangents[:, 2]
+    result[:, 2] = y_value * tangents[:, 0] + x_value * tangents[:, 1] - _column(lorenz.beta) * tangents[:, 2]
+    return result
+
+
+def _tangent_rhs(lorenz, points, tangents, forcing):
+    """
+    :return: tangent_eval plus forcing(points) when forcing is given
+    """
+    result = tangent_eval(lorenz, points, tangents)
+    return result if forcing is None else result + forcing(points)
+
+
+def runge_kutta_tangent_step(integrator: RungeKutta4th, points, tangents, forcing=None):
+    """
+    one RK4 step of state and tangent vectors together
+    :param forcing: optional function of points added to right hand side of tangents,
+           ie. derivative of equation by its params for parameter sensitivities
+    :return: tuple of new points and tangents
+    """
+    lorenz = integrator.lorenz
+    time_step = integrator.params['time step']
+    first = lorenz.eval_batch(points), _tangent_rhs(lorenz, points, tangents, forcing)
+    middle = points + 0.5 * time_step * first[0]
+    second = lorenz.eval_batch(middle), _tangent_rhs(lorenz, middle, tangents + 0.5 * time_step * first[1], forcing)
+    middle = points + 0.5 * time_step * second[0]
+    third = lorenz.eval_batch(middle), _tangent_rhs(lorenz, middle, tangents + 0.5 * time_step * second[1], forcing)
+    end = points + time_step * third[0]
+    fourth = lorenz.eval_batch(end), _tangent_rhs(lorenz, end, tangents + time_step * third[1], forcing)
+    return tuple(start + time_step * (a + 2 * b + 2 * c + d) / 6
+                 for start, a, b, c, d in zip((points, tangents), first, second, third, fourth))
+
+
+def taylor_tangent_step(integrator: TaylorIntegrator, points, tangents, forcing=None):
+    """
+    one Taylor step of state and tangent vectors together,
+    tangent coefficients follow (k + 1) V_{k+1} = sum_j J_j V_{k-j} with J_j from state coefficients
+    :param forcing: optional function of points added to right hand side of tangents, it has to be linear
+           in the point, so that its k-th coefficient is forcing of k-th state coefficient
+    :return: tuple of new points and tangents
+    """
+    lorenz = integrator.lorenz
+    order = integrator.params['order']
+    # state coefficients as (order, point, coordinate) to match tangents
+    state = np.moveaxis(integrator.coefficients_batch(points), 2, 1)
+    coefficients = np.zeros((order,) + tangents.shape)
+    coefficients[0] = tangents
+    sigma, rho, beta = _column(lorenz.sigma), _column(lorenz.rho), _column(lorenz.beta)
+    for k in range(order - 1):
+        x_values = state[k::-1, :, 0, None]
+        y_values = state[k::-1, :, 1, None]
+        z_values = state[k::-1, :, 2, None]
+        previous = coefficients[:k + 1]
+        coefficients[k + 1, :, 0] = sigma * (previous[k, :, 1] - previous[k, :, 0])
+        coefficients[k + 1, :, 1] = (rho * previous[k, :, 0] - previous[k, :, 1]
+                                     - np.sum(z_values * previous[:, :, 0] + x_values * previous[:, :, 2], axis=0))
+        coefficients[k + 1, :, 2] = (np.sum(y_values * previous[:, :, 0] + x_values * previous[:, :, 1], axis=0)
+                                     - beta * previous[k, :, 2])
+        if forcing is not None:
+            coefficients[k + 1] += forcing(state[k])
+        coefficients[k + 1] /= k + 1
+    time_step = integrator.params['time step']
+    new_points, new_tangents = state[-1], coefficients[-1]
+    for k in range(order - 2, -1, -1):
+        new_points = new_points * time_step + state[k]
+        new_tangents = new_tangents * time_step + coefficients[k]
+    return new_points, new_tangents
+
+
+def lyapunov_spectrum(integrator, initial_points, n_steps, transient=0, reorthonormalize=10, record_every=1):
+    """
+    computes Lyapunov spectrum with periodic QR re-orthonormalization of tangent vectors
+    :param integrator: TaylorIntegrator or RungeKutta4th, its time step, order and equation are used
+    :param initial_points: ndarray of shape (N, 3) or one point used for all parameter sets
+    :param n_steps: steps over which exponents are averaged
+    :param transient: steps integrated before averaging, to reach the attractor
+    :param reorthonormalize: steps between QR decompositions
+    :param record_every: QR decompositions between running estimates in history
+    :return: LyapunovResult
+    """
+    assert isinstance(integrator, (TaylorIntegrator, RungeKutta4th))
+    lorenz = integrator.lorenz
+    size = max(np.size(lorenz.sigma), np.size(lorenz.rho), np.size(lorenz.beta), 1)
+    points = np.array(np.broadcast_to(np.asarray(initial_points, dtype=float).reshape(-1, 3), (size, 3)))
+    for _ in range(transient):
+        points = integrator.step_batch(points)
+    step = taylor_tangent_step if isinstance(integrator, TaylorIntegrator) else runge_kutta_tangent_step
+    time_step = integrator.params['time step']
+    tangents = np.array(np.broadcast_to(np.eye(3), (len(points), 3, 3)))
+    sums = np.zeros((len(points), 3))
+    times, history = [], []
+    n_blocks = n_steps // reorthonormalize
+    assert n_blocks > 0, "n_steps has to cover at least one re-orthonormalization"
+    for block in range(1, n_blocks + 1):
+        for _ in range(reorthonormalize):
+            points, tangents = step(integrator, points, tangents)
+        tangents, triangular = np.linalg.qr(tangents)
+        diagonal = np.diagonal(triangular, axis1=1, axis2=2)
+        # keep orientation of tangent vectors, so that they change continuously
+        tangents = tangents * np.sign(diagonal)[:, None, :]
+        sums += np.log(np.abs(diagonal))
+        if block % record_every == 0 or block == n_blocks:
+            times.append(block * reorthonormalize * time_step)
+            history.append(sums / times[-1])
+    return LyapunovResult(history[-1], np.asarray(times), np.asarray(history))
+
+
+def maximal_exponent_map(integrator, sigma_values, rho_values, beta=8 / 3, initial_point=(1.0, 1.0, 1.0),
+                         n_steps=10000, transient=1000, reorthonormalize=10):
+    """
+    largest Lyapunov exponent over (rho, sigma) plane, all grid points are integrated as one batch
+    :param integrator: TaylorIntegrator or RungeKutta4th, its parameters of equation are overwritten
+    :param sigma_values: values of sigma, columns of the map
+    :param rho_values: values of rho, rows of the map
+    :param beta: value of beta
+    :param initial_point: starting point of every trajectory
+    :return: ndarray of shape (len(rho_values), len(sigma_values))
+    """
+    sigma_grid, rho_grid = np.meshgrid(np.asarray(sigma_values, dtype=float), np.asarray(rho_values, dtype=float))
+    integrator.set_lorenz_params({'sigma': sigma_grid.ravel(), 'rho': rho_grid.ravel(),
+                                  'beta': np.full(sigma_grid.size, float(beta))})
+    result = lyapunov_spectrum(integrator, initial_point, n_steps, transient, reorthonormalize,
+                               record_every=n_steps)
+    return result.maximal.reshape(sigma_grid.shape)
@@ -1,11 +1,51 @@
 """driver for the app"""
-import tkinter as tk
-from app import Wiz
-from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th
-
-lor_eq = LorenzEquation()
-integ_dict = {'Taylor': TaylorIntegrator(lor_eq), "Runge-Kutta": RungeKutta4th(lor_eq)}
-app = Wiz(integ_dict)
-tk.mainloop()
+import sys
+from cache import TrajectoryCache
+from profiling import Profiler
+from integrators import (LorenzEquation, TaylorIntegrator, RungeKutta4th,
+                         DormandPrince54, AdaptiveTaylorIntegrator)
+
+
+# variants shown next to the integrators in Compare window, params change those of the named integrator
+COMPARISONS = [('Taylor order 12', 'Taylor', {'order': 12}),
+               ('Runge-Kutta half step', 'Runge-Kutta', {'time step': 0.005})]
+
+
+def make_integrators():
+    """
+    :return: dict of integrators by name sharing one Lorenz equation
+    """
+    lor_eq = LorenzEquation()
+    return {'Taylor': TaylorIntegrator(lor_eq), "Runge-Kutta": RungeKutta4th(lor_eq),
+            "Dormand-Prince": DormandPrince54(lor_eq), "Adaptive Taylor": AdaptiveTaylorIntegrator(lor_eq)}
+
+
+def create_window(argv):
+    """
+    imports GUI and creates main window, importing main itself loads only numpy and solvers
+    :param argv: command line arguments, python main.py --profile adds Stats window
+           with timings of integration and drawing
+    :return: Wiz
+    """
+    from app import Wiz
+    profiler = Profiler() if '--profile' in argv else None
+    window = Wiz(make_integrators(), point_budget=20000, cache=TrajectoryCache(), profiler=profiler,
+                 comparisons=COMPARISONS)
+    # python main.py --session saved.npz continues session saved from the window
+    if '--session' in argv:
+        window.open_session(argv[argv.index('--session') + 1])
+    return window
+
+
+def main(argv=None):
+    """
+    opens window and runs its main loop
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    create_window(sys.argv[1:] if argv is None else argv).mainloop()
+
+
+if __name__ == '__main__':
+    main()
 
 # note to self you can zoom by moving mouse while the right mouse button is pressed
@@ -0,0 +1,162 @@
+"""
+offline rendering of trajectory animation without display,
+trajectory is computed once into shared memory, ranges of frames are drawn on Agg canvases
+in a process pool with the look of the main window, frames are written as PNG files
+or encoded into one video with ffmpeg
+usage: python offline.py frames/ --steps 100000 --steps-per-frame 10
+       python offline.py lorenz.mp4 --steps 100000 --fps 60
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from batch import SOLVER_OPTIONS, cli_name, make_integrator
+from integrators import INTEGRATOR_CLASSES
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.avi', '.mov', '.gif')
+FRAME_NAME = "frame_{:06d}.png"
+
+
+def frame_ends(n_points, steps_per_frame):
+    """
+    :param n_points: number of points of trajectory, starting point included
+    :param steps_per_frame: steps added in every frame
+    :return: ndarray with number of points shown in every frame, first frame shows only starting point
+    """
+    return np.minimum(1 + steps_per_frame * np.arange((n_points - 2) // steps_per_frame + 2), n_points)
+
+
+def _render_worker(job):
+    """
+    draws a range of frames in worker process,
+    frames of one job are consecutive, so level of detail renderer only extends its tail between them
+    :param job: dictionary with shared memory name and shape, frame range and look of frames
+    :return: number of written frames
+    """
+    # only workers draw, the parent process integrates and encodes without matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from plotting import setup_axes
+    from rendering import LevelOfDetailRenderer
+    from trajectory import TrajectoryBuffer
+
+    memory = shared_memory.SharedMemory(name=job['memory'])
+    try:
+        points = np.ndarray(job['shape'], dtype=float, buffer=memory.buf)
+        figure = Figure(figsize=job['size'], dpi=job['dpi'])
+        FigureCanvasAgg(figure)
+        axes = setup_axes(figure)
+        renderer = LevelOfDetailRenderer(axes, job['budget'])
+        trajectory = TrajectoryBuffer()
+        for frame in range(job['first'], job['stop']):
+            trajectory.extend(points[len(trajectory):job['ends'][frame]])
+            if job['rotation']:
+                axes.view_init(elev=axes.elev, azim=job['azimuth'] + job['rotation'] * frame)
+                renderer.invalidate()
+            renderer.update(trajectory)
+            figure.savefig(os.path.join(job['directory'], FRAME_NAME.format(frame)))
+        del points
+        return job['stop'] - job['first']
+    finally:
+        memory.close()
+
+
+def render(points, output, steps_per_frame=10, processes=None, fps=30, size=(6.4, 4.8), dpi=100,
+           budget=20000, rotation=0.0):
+    """
+    renders animation in which every frame adds steps_per_frame points of trajectory
+    :param points: ndarray of shape (N, 3), whole trajectory
+    :param output: directory for PNG frames, or video file (extension from VIDEO_EXTENSIONS, needs ffmpeg)
+    :param steps_per_frame: points added in every frame
+    :param processes: number of worker processes, os.cpu_count() by default, 1 runs in this process
+    :param fps: frames per second of video
+    :param size: size of frame in inches
+    :param dpi: pixels per inch
+    :param budget: points of history line at most, as in level of detail rendering of the main window
+    :param rotation: change of azimuth in degrees per frame
+    :return: number of frames
+    """
+    video = output.lower().endswith(VIDEO_EXTENSIONS)
+    assert not video or shutil.which('ffmpeg') is not None, "video output needs ffmpeg on PATH"
+    points = np.asarray(points, dtype=float)
+    ends = frame_ends(len(points), steps_per_frame)
+    processes = processes or os.cpu_count()
+    directory = tempfile.mkdtemp() if video else output
+    os.makedirs(directory, exist_ok=True)
+    memory = shared_memory.SharedMemory(create=True, size=max(points.nbytes, 1))
+    try:
+        shared = np.ndarray(points.shape, dtype=float, buffer=memory.buf)
+        shared[...] = points
+        del shared
+        # later frames show longer trajectories and take longer to draw, with about four ranges per process
+        # the last ranges are short compared to the whole run and processes done early take the ones left
+        bounds = np.linspace(0, len(ends), min(len(ends), processes * 4) + 1).astype(int)
+        jobs = [{'memory': memory.name, 'shape': points.shape, 'ends': ends, 'first': int(first),
+                 'stop': int(stop), 'directory': directory, 'size': size, 'dpi': dpi, 'budget': budget,
+                 'rotation': rotation, 'azimuth': -60.0} for first, stop in zip(bounds[:-1], bounds[1:])]
+        if processes == 1:
+            done = sum(_render_worker(job) for job in jobs)
+        else:
+            with ProcessPoolExecutor(processes) as pool:
+                done = sum(pool.map(_render_worker, jobs))
+        assert done == len(ends)
+        if video:
+            subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-framerate', str(fps),
+                            '-i', os.path.join(directory, FRAME_NAME.replace('{:06d}', '%06d')),
+                            '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', output], check=True)
+    finally:
+        memory.close()
+        memory.unlink()
+        if video:
+            shutil.rmtree(directory, ignore_errors=True)
+    return len(ends)
+
+
+def main(argv=None):
+    """
+    integrates and renders animation described by command line
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    parser = argparse.ArgumentParser(description="render animation of Lorenz equation without display")
+    parser.add_argument('output', help="directory for PNG frames or video file ({})".format(
+        ', '.join(VIDEO_EXTENSIONS)))
+    parser.add_argument('--integrator', default='taylor', choices=[cli_name(name) for name in INTEGRATOR_CLASSES])
+    parser.add_argument('--steps', type=int, default=10000, help="number of steps")
+    parser.add_argument('--steps-per-frame', type=int, default=10)
+    parser.add_argument('--start', type=float, nargs=3, default=(1.0, 1.0, 1.0), metavar=('X0', 'Y0', 'Z0'))
+    parser.add_argument('--sigma', type=float, default=10.0)
+    parser.add_argument('--rho', type=float, default=28.0)
+    parser.add_argument('--beta', type=float, default=8 / 3)
+    parser.add_argument('--time-step', type=float)
+    parser.add_argument('--order', type=int)
+    parser.add_argument('--rtol', type=float)
+    parser.add_argument('--atol', type=float)
+    parser.add_argument('--tolerance', type=float)
+    parser.add_argument('--max-step', type=float)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--size', type=float, nargs=2, default=(6.4, 4.8), metavar=('WIDTH', 'HEIGHT'),
+                        help="frame size in inches")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--budget', type=int, default=20000, help="points of history line drawn at most")
+    parser.add_argument('--rotation', type=float, default=0.0, help="degrees of azimuth per frame")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    solver_params = {key: getattr(args, option) for option, key in SOLVER_OPTIONS.items()
+                     if getattr(args, option) is not None}
+    integrator = make_integrator(args.integrator, {'sigma': args.sigma, 'rho': args.rho, 'beta': args.beta},
+                                 solver_params)
+    points = np.vstack([args.start, integrator.integrate(args.start, args.steps)])
+    render(points, args.output, args.steps_per_frame, args.processes, args.fps, tuple(args.size), args.dpi,
+           args.budget, args.rotation)
+
+
+if __name__ == '__main__':
+    main()
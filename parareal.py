@@ -0,0 +1,219 @@
+"""
+parallel-in-time integration of one long trajectory (Parareal),
+time is cut into slices, cheap coarse propagator (ie. Runge-Kutta with large step) predicts starts of slices
+serially, accurate fine propagator (ie. Taylor) runs over all slices at once in a process pool
+and the starts are corrected until they stop changing,
+the first unconverged slice always starts exactly, so at most one iteration per slice is needed
+usage: python parareal.py out.npy --slices 16 --steps-per-slice 50 --processes 16
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from batch import cli_name, make_integrator
+from integrators import INTEGRATOR_CLASSES
+
+# fine propagator of worker process and trajectory in shared memory, set by _init_worker
+_WORKER = {}
+
+
+class PararealResult:
+    """
+    points: ndarray of shape (slices * steps_per_slice + 1, 3), fine trajectory
+    corrections: largest change of slice starts in every iteration, relative to 1 + |start|
+    wall_time: seconds of whole run
+    fine_time: seconds of all fine slices of the first iteration, cost of serial fine integration
+    coarse_time: seconds spent in coarse propagator
+    """
+
+    def __init__(self, points, corrections, wall_time, fine_time, coarse_time, slices):
+        self.points = points
+        self.corrections = corrections
+        self.wall_time = wall_time
+        self.fine_time = fine_time
+        self.coarse_time = coarse_time
+        self.slices = slices
+
+    @property
+    def iterations(self):
+        """
+        :return: number of parallel fine passes
+        """
+        return len(self.corrections)
+
+    @property
+    def speedup(self):
+        """
+        :return: estimated serial fine time over wall time
+        """
+        return self.fine_time / self.wall_time
+
+    @property
+    def bound(self):
+        """
+        :return: speedup with free coarse propagator and one process per slice, slices / iterations
+        """
+        return self.slices / self.iterations
+
+    def report(self):
+        """
+        :return: dict ready for JSON
+        """
+        return {'slices': self.slices, 'iterations': self.iterations, 'corrections': list(self.corrections),
+                'wall time': self.wall_time, 'fine time': self.fine_time, 'coarse time': self.coarse_time,
+                'speedup': self.speedup, 'bound': self.bound}
+
+
+def _fine_slice(integrator, points, index, start, n_steps):
+    """
+    integrates one slice straight into its rows of trajectory
+    :return: tuple of last point and duration in seconds
+    """
+    begin = time.perf_counter()
+    rows = points[index * n_steps + 1:(index + 1) * n_steps + 1]
+    integrator.integrate(start, n_steps, out=rows)
+    return rows[-1].copy(), time.perf_counter() - begin
+
+
+def _init_worker(name, lorenz_params, solver_params, memory, shape):
+    """
+    creates fine propagator once per worker process and maps trajectory
+    """
+    _WORKER['integrator'] = make_integrator(name, lorenz_params, solver_params)
+    _WORKER['memory'] = shared_memory.SharedMemory(name=memory)
+    _WORKER['points'] = np.ndarray(shape, dtype=float, buffer=_WORKER['memory'].buf)
+
+
+def _worker_slice(job):
+    """
+    :param job: tuple of slice index, its start and number of fine steps
+    :return: tuple of last point and duration in seconds
+    """
+    return _fine_slice(_WORKER['integrator'], _WORKER['points'], *job)
+
+
+def parareal(initial_values, n_slices, steps_per_slice, lorenz_params=None, fine='Taylor', fine_params=None,
+             coarse='Runge-Kutta', coarse_steps=None, tolerance=1e-10, processes=None):
+    """
+    :param initial_values: starting point
+    :param n_slices: number of time slices, as many fine jobs run in parallel
+    :param steps_per_slice: fine steps in one slice
+    :param lorenz_params: dictionary of sigma, rho and beta, defaults of LorenzEquation if None
+    :param fine: name of fixed step integrator from INTEGRATOR_CLASSES
+    :param fine_params: solver params of fine integrator to change, ie. {'order': 20}
+    :param coarse: name of fixed step integrator, its time step is slice length / coarse_steps
+    :param coarse_steps: coarse steps in one slice, steps_per_slice // 5 by default
+    :param tolerance: iterations stop when no slice start changes by more than tolerance * (1 + |start|),
+           0 runs until all slices are exact and reproduces serial fine integration
+    :param processes: number of worker processes, os.cpu_count() by default, 1 runs in this process
+    :return: PararealResult
+    """
+    begin = time.perf_counter()
+    lorenz_params = lorenz_params or {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3}
+    fine_params = dict(fine_params or {})
+    fine_integrator = make_integrator(fine, lorenz_params, fine_params)
+    assert not hasattr(fine_integrator, 'solve'), "slices need fixed time step"
+    coarse_steps = coarse_steps or max(1, steps_per_slice // 5)
+    slice_time = steps_per_slice * fine_integrator.get_solver_params()['time step']
+    coarse_integrator = make_integrator(coarse, lorenz_params, {'time step': slice_time / coarse_steps})
+    assert not hasattr(coarse_integrator, 'solve'), "slices need fixed time step"
+    processes = processes or os.cpu_count()
+    coarse_time = 0.0
+
+    def propagate(point):
+        nonlocal coarse_time
+        start = time.perf_counter()
+        end = coarse_integrator.integrate(point, coarse_steps)[-1]
+        coarse_time += time.perf_counter() - start
+        return end
+
+    shape = (n_slices * steps_per_slice + 1, 3)
+    memory = shared_memory.SharedMemory(create=True, size=8 * shape[0] * shape[1])
+    pool = None
+    try:
+        points = np.ndarray(shape, dtype=float, buffer=memory.buf)
+        points[0] = initial_values
+        starts = np.empty((n_slices + 1, 3))
+        starts[0] = initial_values
+        predicted = np.empty((n_slices, 3))
+        for index in range(n_slices):
+            starts[index + 1] = predicted[index] = propagate(starts[index])
+        if processes == 1:
+            run = lambda jobs: [_fine_slice(fine_integrator, points, *job) for job in jobs]
+        else:
+            pool = ProcessPoolExecutor(processes, initializer=_init_worker,
+                                       initargs=(fine, lorenz_params, fine_params, memory.name, shape))
+            run = lambda jobs: list(pool.map(_worker_slice, jobs))
+        corrections = []
+        fine_time = None
+        exact = 0
+        while exact < n_slices:
+            results = run([(index, starts[index], steps_per_slice) for index in range(exact, n_slices)])
+            ends = np.array([end for end, _ in results])
+            if fine_time is None:
+                fine_time = sum(duration for _, duration in results)
+            corrected = starts.copy()
+            # slice exact was started from exact point, so its fine end is exact as well
+            corrected[exact + 1] = ends[0]
+            for index in range(exact + 1, n_slices):
+                prediction = propagate(corrected[index])
+                corrected[index + 1] = prediction + ends[index - exact] - predicted[index]
+                predicted[index] = prediction
+            change = np.abs(corrected - starts).max(axis=1) / (1 + np.abs(starts).max(axis=1))
+            corrections.append(float(change.max()))
+            starts = corrected
+            exact += 1
+            if corrections[-1] <= tolerance:
+                break
+        del points
+        result = np.array(np.ndarray(shape, dtype=float, buffer=memory.buf))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        memory.close()
+        memory.unlink()
+    return PararealResult(result, corrections, time.perf_counter() - begin, fine_time, coarse_time, n_slices)
+
+
+def main(argv=None):
+    """
+    runs Parareal integration described by command line, saves trajectory and prints report
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    fixed_step = [cli_name(name) for name, integrator in INTEGRATOR_CLASSES.items()
+                  if not hasattr(integrator, 'solve')]
+    parser = argparse.ArgumentParser(description="parallel-in-time integration of Lorenz equation")
+    parser.add_argument('output', help=".npy file for trajectory")
+    parser.add_argument('--slices', type=int, default=16)
+    parser.add_argument('--steps-per-slice', type=int, default=50)
+    parser.add_argument('--start', type=float, nargs=3, default=(1.0, 1.0, 1.0), metavar=('X0', 'Y0', 'Z0'))
+    parser.add_argument('--sigma', type=float, default=10.0)
+    parser.add_argument('--rho', type=float, default=28.0)
+    parser.add_argument('--beta', type=float, default=8 / 3)
+    parser.add_argument('--fine', default='taylor', choices=fixed_step)
+    parser.add_argument('--time-step', type=float, help="time step of fine integrator")
+    parser.add_argument('--order', type=int, help="order of fine Taylor integrator")
+    parser.add_argument('--coarse', default='runge-kutta', choices=fixed_step)
+    parser.add_argument('--coarse-steps', type=int, help="coarse steps in one slice")
+    parser.add_argument('--tolerance', type=float, default=1e-10)
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    fine_params = {key: value for key, value in (('time step', args.time_step), ('order', args.order))
+                   if value is not None}
+    result = parareal(args.start, args.slices, args.steps_per_slice,
+                      {'sigma': args.sigma, 'rho': args.rho, 'beta': args.beta}, args.fine, fine_params,
+                      args.coarse, args.coarse_steps, args.tolerance, args.processes)
+    np.save(args.output, result.points)
+    print("iterations {} of {} slices, largest corrections {}".format(
+        result.iterations, result.slices, ' '.join('{:.1e}'.format(change) for change in result.corrections)))
+    print("wall {:.3f} s, serial fine {:.3f} s, coarse {:.3f} s, speedup {:.2f} (at most {:.2f})".format(
+        result.wall_time, result.fine_time, result.coarse_time, result.speedup, result.bound))
+
+
+if __name__ == '__main__':
+    main()
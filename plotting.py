@@ -0,0 +1,22 @@
+"""
+look of the trajectory plot shared by the interactive window and offline rendering
+"""
+LINE_COLOR = "green"
+MARKER_COLOR = "red"
+LIMITS = ((-25, 25), (-25, 25), (0, 50))
+
+
+def setup_axes(figure, position=111):
+    """
+    adds 3d axes with fixed limits and hidden axis lines, as in the main window
+    :param figure: matplotlib Figure
+    :param position: subplot position, whole figure by default
+    :return: 3d axes
+    """
+    axes = figure.add_subplot(position, projection='3d')
+    axes.autoscale(enable=True)
+    axes.set_xlim3d(*LIMITS[0])
+    axes.set_ylim3d(*LIMITS[1])
+    axes.set_zlim3d(*LIMITS[2])
+    axes.set_axis_off()
+    return axes
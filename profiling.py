@@ -0,0 +1,229 @@
+"""
+optional instrumentation of integrators and of the GUI,
+chosen methods of chosen objects are wrapped per instance, timings go to rolling histograms
+and counters (steps, rhs evaluations, Taylor work), nothing is wrapped when profiling is off,
+so instrumented code pays nothing then
+"""
+import collections
+import json
+import threading
+import time
+
+import numpy as np
+
+from integrators import TaylorIntegrator, AdaptiveSolver
+
+# edges of histogram bins in seconds, 4 bins per decade from 1 microsecond to 10 seconds
+BIN_EDGES = 10.0 ** np.arange(-6, 1.01, 0.25)
+
+
+def sparkline(counts):
+    """
+    :param counts: histogram counts
+    :return: one line text picture of histogram
+    """
+    levels = " ▁▂▃▄▅▆▇█"
+    largest = max(int(np.max(counts)), 1)
+    return "".join(levels[int(np.ceil(count / largest * (len(levels) - 1)))] for count in counts)
+
+
+def _cauchy_terms(order):
+    """
+    :param order: order of Taylor method
+    :return: products summed in Cauchy products of Lorenz recurrence during one step,
+             loop bounds are those of integrators._taylor_recurrence, two products of i + 1 terms for every i
+    """
+    return sum(2 * (i + 1) for i in range(1, order - 1))
+
+
+class RollingHistogram:
+    """
+    keeps last size durations, older ones only count to total count and total time
+    """
+
+    def __init__(self, size=1000):
+        self.values = np.zeros(size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        """
+        :param value: duration in seconds
+        """
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.total += value
+
+    def recent(self):
+        """
+        :return: ndarray of kept durations, order is not preserved
+        """
+        return self.values[:min(self.count, len(self.values))]
+
+    def histogram(self):
+        """
+        :return: ndarray of counts of kept durations in bins given by BIN_EDGES
+        """
+        return np.histogram(np.clip(self.recent(), BIN_EDGES[0], BIN_EDGES[-1]), BIN_EDGES)[0]
+
+    def summary(self):
+        """
+        :return: dict with count, total and statistics of kept durations in seconds
+        """
+        recent = self.recent()
+        result = {'count': self.count, 'total': self.total}
+        if len(recent):
+            result.update({'mean': float(recent.mean()), 'p50': float(np.percentile(recent, 50)),
+                           'p90': float(np.percentile(recent, 90)), 'p99': float(np.percentile(recent, 99)),
+                           'max': float(recent.max())})
+        return result
+
+
+class Profiler:
+    """
+    collects timings of wrapped methods and counters,
+    methods may run in several threads (ie. integration worker and GUI)
+    """
+
+    def __init__(self, size=1000, trace_length=100000):
+        """
+        :param size: durations kept in every rolling histogram
+        :param trace_length: last calls kept for trace export
+        """
+        self.size = size
+        self.timers = {}
+        self.counters = collections.Counter()
+        self.trace = collections.deque(maxlen=trace_length)
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self._wrapped = []
+
+    def record(self, label, start, duration):
+        """
+        :param label: name of timed operation
+        :param start: perf_counter at start
+        :param duration: duration in seconds
+        """
+        with self.lock:
+            if label not in self.timers:
+                self.timers[label] = RollingHistogram(self.size)
+            self.timers[label].add(duration)
+            self.trace.append((label, start, duration, threading.get_ident()))
+
+    def count(self, counts):
+        """
+        :param counts: dict of counter names and increments
+        """
+        with self.lock:
+            self.counters.update(counts)
+
+    def instrument(self, target, method, label=None, count=None):
+        """
+        replaces method of target object (not of its class) by timed wrapper
+        :param target: any object
+        :param method: name of method
+        :param label: name of timer, method by default
+        :param count: optional function taking the same arguments as method and returning dict of counter increments
+        """
+        original = getattr(target, method)
+        label = label or method
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(label, start, clock() - start)
+                if count is not None:
+                    self.count(count(*args, **kwargs))
+
+        self._wrapped.append((target, method, vars(target).get(method)))
+        setattr(target, method, wrapper)
+
+    def restore(self):
+        """
+        removes all wrappers
+        """
+        for target, method, previous in reversed(self._wrapped):
+            if previous is None:
+                delattr(target, method)
+            else:
+                setattr(target, method, previous)
+        self._wrapped = []
+
+    def instrument_integrators(self, integrators):
+        """
+        times step and integrate of every integrator and counts steps, rhs evaluations and Taylor work,
+        Taylor work is number of terms of Cauchy products in computed recurrences
+        :param integrators: dict of integrators by name, as in main.py
+        """
+        equations = []
+        for name, integrator in integrators.items():
+            if all(integrator.lorenz is not equation for equation in equations):
+                equations.append(integrator.lorenz)
+                self.instrument(integrator.lorenz, 'eval', 'rhs eval', lambda point: {'rhs evaluations': 1})
+                self.instrument(integrator.lorenz, 'eval_batch', 'rhs eval batch',
+                                lambda points: {'rhs evaluations': len(points)})
+            if isinstance(integrator, AdaptiveSolver):
+                # steps are counted where they are accepted, rhs evaluations by wrapped equation
+                self.instrument(integrator, 'adaptive_step', name + ' adaptive step', lambda *_: {'steps': 1})
+                self.instrument(integrator, 'step', name + ' step')
+                self.instrument(integrator, 'integrate', name + ' integrate')
+                continue
+            if isinstance(integrator, TaylorIntegrator):
+                def step_work(point, integrator=integrator):
+                    return {'steps': 1, 'cauchy terms': _cauchy_terms(integrator.params['order'])}
+
+                def integrate_work(point, n_steps, out=None, integrator=integrator):
+                    return {'steps': n_steps, 'cauchy terms': _cauchy_terms(integrator.params['order']) * n_steps}
+            else:
+                # step evaluates rhs through wrapped equation, integrate has it inlined
+                def step_work(point):
+                    return {'steps': 1}
+
+                def integrate_work(point, n_steps, out=None):
+                    return {'steps': n_steps, 'rhs evaluations': 4 * n_steps}
+            self.instrument(integrator, 'step', name + ' step', step_work)
+            self.instrument(integrator, 'integrate', name + ' integrate', integrate_work)
+
+    def summary(self):
+        """
+        :return: dict ready for JSON with timers and counters
+        """
+        with self.lock:
+            timers = {label: dict(timer.summary(), histogram=timer.histogram().tolist())
+                      for label, timer in self.timers.items()}
+            return {'timers': timers, 'counters': dict(self.counters), 'bin edges': BIN_EDGES.tolist()}
+
+    def export_json(self, path):
+        """
+        :param path: file for summary
+        """
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=1)
+
+    def export_trace(self, path):
+        """
+        writes recent calls in trace event format, readable by chrome://tracing and Perfetto
+        :param path: file for trace
+        """
+        with self.lock:
+            events = [{'name': label, 'ph': 'X', 'pid': 0, 'tid': thread,
+                       'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6}
+                      for label, start, duration, thread in self.trace]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    def report(self):
+        """
+        :return: text table of timers and counters
+        """
+        summary = self.summary()
+        lines = ["{:<28} {:>8} {:>9} {:>9} {:>9} {:>9}".format('timer', 'calls', 'mean ms', 'p50 ms', 'p99 ms', 'max ms')]
+        for label, timer in sorted(summary['timers'].items()):
+            lines.append("{:<28} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+                label, timer['count'], 1e3 * timer['mean'], 1e3 * timer['p50'], 1e3 * timer['p99'],
+                1e3 * timer['max']))
+        lines += ["{:<28} {:>8}".format(name, value) for name, value in sorted(summary['counters'].items())]
+        return '\n'.join(lines)
@@ -0,0 +1,201 @@
+"""
+level of detail rendering of long trajectories on 3d axes,
+history of trajectory is simplified in screen space to a point budget and kept in cached background,
+only the newly added tail and current position are blitted every frame
+"""
+import numpy as np
+from mpl_toolkits.mplot3d import proj3d
+
+from plotting import LINE_COLOR, MARKER_COLOR
+
+
+def screen_coordinates(axes, points):
+    """
+    :param axes: 3d axes
+    :param points: ndarray of shape (N, 3) in data coordinates
+    :return: ndarray of shape (N, 2) in display pixels for current view
+    """
+    x_values, y_values, _ = proj3d.proj_transform(points[:, 0], points[:, 1], points[:, 2], axes.get_proj())
+    return axes.transData.transform(np.column_stack([x_values, y_values]))
+
+
+def _simplify(screen, budget, cell):
+    """
+    see simplify
+    :return: tuple of ndarray of indices of kept points and cell size that fits budget
+    """
+    assert budget >= 2
+    if len(screen) <= 2:
+        return np.arange(len(screen)), cell
+    while True:
+        cells = np.floor(screen / cell).astype(np.int64)
+        keep = np.empty(len(screen), dtype=bool)
+        keep[0] = keep[-1] = True
+        keep[1:-1] = np.any(cells[1:-1] != cells[:-2], axis=1)
+        indices = np.flatnonzero(keep)
+        if len(indices) <= budget:
+            return indices, cell
+        cell *= 2
+
+
+def simplify(screen, budget, cell=1.0):
+    """
+    drops consecutive points falling into the same screen cell, cells grow until result fits budget,
+    first and last point are always kept
+    :param screen: ndarray of shape (N, 2) with display coordinates
+    :param budget: maximal number of kept points
+    :param cell: initial cell size in pixels
+    :return: ndarray of indices of kept points
+    """
+    return _simplify(screen, budget, cell)[0]
+
+
+class LevelOfDetailRenderer:
+    """
+    draws trajectory as simplified static history line and animated tail,
+    tail longer than tail_length is folded into history, only the tail is projected and simplified
+    on the cell grid of history then, so the cost of a fold does not grow with the trajectory,
+    whole trajectory is projected again only when the view changes or the trajectory is replaced
+    """
+
+    def __init__(self, axes, budget=20000, tail_length=1000, color=LINE_COLOR, marker_color=MARKER_COLOR):
+        """
+        :param axes: 3d axes to draw on
+        :param budget: points of history line at most
+        :param tail_length: points drawn incrementally before they are folded into history
+        """
+        self.axes = axes
+        self.budget = budget
+        self.tail_length = tail_length
+        self.history_line, = axes.plot([], [], [], color=color)
+        self.tail_line, = axes.plot([], [], [], color=color)
+        self.marker = axes.scatter3D([0], [0], [0], color=marker_color)
+        # index (counted from the start of the run) of the first point not covered by history, and that point
+        self.folded = 0
+        self.folded_point = None
+        # kept points of history with their indices counted from the start of the run, display coordinates
+        # in the view they were simplified in and the cell size of simplification
+        self.history = np.empty((0, 3))
+        self.history_indices = np.empty(0, dtype=np.int64)
+        self.history_screen = np.empty((0, 2))
+        self.cell = 1.0
+        self.dirty = True
+        # rotating and zooming change the projection, history has to be simplified again
+        axes.figure.canvas.mpl_connect('button_release_event', self.invalidate)
+
+    @property
+    def artists(self):
+        """
+        :return: artists redrawn every frame
+        """
+        return self.tail_line, self.marker
+
+    def invalidate(self, _=None):
+        """
+        marks history for rebuilding with the next update
+        """
+        self.dirty = True
+
+    def _rebuild(self, points, first_index):
+        """
+        projects and simplifies all points
+        """
+        screen = screen_coordinates(self.axes, points)
+        indices, self.cell = _simplify(screen, self.budget, 1.0)
+        self.history = points[indices]
+        self.history_indices = first_index + indices
+        self.history_screen = screen[indices]
+
+    def _fold(self, points, first_index, tail_start):
+        """
+        appends tail to history, points[tail_start] is the last point of history,
+        when history outgrows budget only its kept points are simplified again with larger cells
+        """
+        alive = self.history_indices >= first_index
+        tail = points[tail_start:]
+        screen = screen_coordinates(self.axes, tail)
+        cells = np.floor(screen / self.cell).astype(np.int64)
+        keep = np.any(cells[1:] != cells[:-1], axis=1)
+        keep[-1] = True
+        new = 1 + np.flatnonzero(keep)
+        self.history = np.concatenate([self.history[alive], tail[new]])
+        self.history_indices = np.concatenate([self.history_indices[alive], first_index + tail_start + new])
+        self.history_screen = np.concatenate([self.history_screen[alive], screen[new]])
+        if len(self.history) > self.budget:
+            indices, self.cell = _simplify(self.history_screen, self.budget, 2 * self.cell)
+            self.history = self.history[indices]
+            self.history_indices = self.history_indices[indices]
+            self.history_screen = self.history_screen[indices]
+
+    def update(self, trajectory):
+        """
+        :param trajectory: TrajectoryBuffer with all points
+        :return: True if history changed and the background has to be drawn again
+        """
+        points = trajectory.view()
+        first_index = trajectory.count - len(points)
+        tail_start = self.folded - first_index
+        # reset or replaced trajectory does not continue through the last folded point
+        continued = 0 <= tail_start < len(points) and np.array_equal(points[tail_start], self.folded_point)
+        refold = self.dirty or not continued or len(points) - tail_start > self.tail_length
+        if refold:
+            if self.dirty or not continued:
+                self._rebuild(points, first_index)
+            else:
+                self._fold(points, first_index, tail_start)
+            self.history_line.set_data(self.history[:, 0], self.history[:, 1])
+            self.history_line.set_3d_properties(self.history[:, 2])
+            self.folded = trajectory.count - 1
+            self.folded_point = points[-1].copy()
+            tail_start = len(points) - 1
+            self.dirty = False
+        tail = points[tail_start:]
+        self.tail_line.set_data(tail[:, 0], tail[:, 1])
+        self.tail_line.set_3d_properties(tail[:, 2])
+        self.marker._offsets3d = ([points[-1, 0]], [points[-1, 1]], [points[-1, 2]])
+        return refold
+
+
+class BlitAnimation:
+    """
+    timer driven animation that restores cached background and redraws only animated artists,
+    background is captured after every full draw, func returning True requests full draw,
+    event_source can be started and stopped as in matplotlib animations
+    """
+
+    def __init__(self, figure, func, interval, artists):
+        self.canvas = figure.canvas
+        self.func = func
+        self.artists = artists
+        self.background = None
+        self.frame = 0
+        for artist in artists:
+            artist.set_animated(True)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.event_source = self.canvas.new_timer(interval=interval)
+        self.event_source.add_callback(self._step)
+        self.event_source.start()
+
+    def _on_draw(self, _):
+        """
+        stores fresh background and puts animated artists on top of it
+        """
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.artists:
+            self.canvas.figure.draw_artist(artist)
+
+    def _step(self):
+        """
+        computes and shows one frame
+        """
+        full_draw = self.func(self.frame)
+        self.frame += 1
+        if full_draw or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_animated()
+        self.canvas.blit(self.canvas.figure.bbox)
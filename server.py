@@ -0,0 +1,295 @@
+"""
+local trajectory server on asyncio, so that many viewers share one integration,
+client sends one JSON line describing the job and gets back JSON header line and binary chunks of trajectory,
+identical jobs running at the same time are computed once, late subscribers get computed chunks replayed
+and then follow the live ones, chunks are computed in a process pool off the event loop
+usage: python server.py --port 8765 --processes 4
+"""
+import argparse
+import asyncio
+import json
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from batch import make_integrator
+from cache import trajectory_key
+
+# first row and number of rows of a chunk, rows follow as little endian float64 triples,
+# chunk with 0 rows ends the stream, its first row is the number of rows sent,
+# when that is fewer than announced, JSON line {"error": message} follows
+CHUNK_HEADER = struct.Struct('<QI')
+ROW_BYTES = 24
+
+
+def _compute_chunk(name, lorenz_params, solver_params, point, n_steps):
+    """
+    fixed step integration continues exactly from the last point, so chunks need no integrator state
+    :return: bytes of n_steps rows following point
+    """
+    integrator = make_integrator(name, lorenz_params, solver_params)
+    return integrator.integrate(point, n_steps).astype('<f8').tobytes()
+
+
+class Job:
+    """
+    trajectory computed for all its subscribers, chunks are bytes of consecutive rows starting with starting point,
+    they are kept for late subscribers until the job is done and the last subscriber is served
+    """
+
+    def __init__(self, key, n_steps):
+        self.key = key
+        self.n_steps = n_steps
+        self.chunks = []
+        self.subscribers = 0
+        self.released = False
+        self.done = False
+        self.error = None
+        self.condition = asyncio.Condition()
+
+    async def chunk(self, index):
+        """
+        :param index: chunk number
+        :return: bytes of chunk, None when job ended before computing it
+        """
+        async with self.condition:
+            await self.condition.wait_for(lambda: index < len(self.chunks) or self.done)
+        return self.chunks[index] if index < len(self.chunks) else None
+
+
+class TrajectoryServer:
+    """
+    requests: {"integrator": "taylor", "lorenz params": {...}, "solver params": {...},
+    "start": [x, y, z], "steps": n}, only fixed step integrators are served,
+    answer header: {"rows": n + 1, "shared": true when job was already running} or {"error": message},
+    failure of computation after the header is sent as error line after the end of stream
+    """
+
+    def __init__(self, processes=1, chunk_size=4096, max_steps=10 ** 7, max_rows=2 * 10 ** 7):
+        """
+        :param processes: number of worker processes, 1 computes in one thread of this process
+        :param chunk_size: rows computed and sent at once
+        :param max_steps: longest accepted job
+        :param max_rows: rows of all jobs kept in memory at once, 24 bytes each, new jobs over it are refused
+        """
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.max_steps = max_steps
+        self.max_rows = max_rows
+        # rows reserved by jobs whose chunks are still kept
+        self.buffered = 0
+        self.jobs = {}
+        self.tasks = set()
+        self.statistics = {'requests': 0, 'jobs': 0, 'shared': 0, 'errors': 0, 'bytes sent': 0}
+        self.server = None
+        self.executor = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        :param host: address to listen on, loopback by default
+        :param port: port, 0 picks free one
+        :return: port listened on
+        """
+        self.executor = ProcessPoolExecutor(self.processes) if self.processes != 1 else ThreadPoolExecutor(1)
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        stops listening, waits for running jobs and shuts pool down
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        if self.tasks:
+            await asyncio.wait(self.tasks)
+        self.executor.shutdown()
+
+    def subscribe(self, request):
+        """
+        finds running job computing at least requested steps of the same trajectory or starts new one
+        :param request: dict decoded from request line
+        :raise ValueError: for request that cannot be served
+        :return: tuple of job and flag telling whether it was already running
+        """
+        if not isinstance(request, dict):
+            raise ValueError("request has to be JSON object")
+        name = request.get('integrator', 'taylor')
+        lorenz_params = dict(request.get('lorenz params') or {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3})
+        solver_params = dict(request.get('solver params') or {})
+        start = np.asarray(request.get('start', (1.0, 1.0, 1.0)), dtype=float)
+        n_steps = int(request['steps'])
+        if start.shape != (3,):
+            raise ValueError("start has to be one point")
+        if not 0 < n_steps <= self.max_steps:
+            raise ValueError("steps have to be in 1..{}".format(self.max_steps))
+        integrator = make_integrator(name, lorenz_params, solver_params)
+        if hasattr(integrator, 'solve'):
+            raise ValueError("only fixed step integrators are served")
+        key = trajectory_key(integrator, start)
+        job = self.jobs.get(key)
+        if job is not None and job.n_steps >= n_steps:
+            self.statistics['shared'] += 1
+            job.subscribers += 1
+            return job, True
+        if self.buffered + n_steps + 1 > self.max_rows:
+            raise ValueError("server keeps {} of {} rows, no room for {} more".format(
+                self.buffered, self.max_rows, n_steps + 1))
+        self.buffered += n_steps + 1
+        job = self.jobs[key] = Job(key, n_steps)
+        job.subscribers += 1
+        self.statistics['jobs'] += 1
+        task = asyncio.get_running_loop().create_task(
+            self._run(job, name, lorenz_params, integrator.get_solver_params(), start))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return job, False
+
+    async def _run(self, job, name, lorenz_params, solver_params, start):
+        """
+        computes chunks of job and wakes its subscribers after every one
+        """
+        loop = asyncio.get_running_loop()
+        point, done = start, 0
+        try:
+            while done < job.n_steps:
+                size = min(self.chunk_size, job.n_steps - done)
+                data = await loop.run_in_executor(self.executor, _compute_chunk, name, lorenz_params, solver_params,
+                                                  point, size)
+                if not done:
+                    data = start.astype('<f8').tobytes() + data
+                point = np.frombuffer(data[-ROW_BYTES:], dtype='<f8').copy()
+                done += size
+                async with job.condition:
+                    job.chunks.append(data)
+                    job.condition.notify_all()
+        except Exception as error:
+            job.error = repr(error)
+        finally:
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+            async with job.condition:
+                job.done = True
+                job.condition.notify_all()
+            self._release(job)
+
+    def _release(self, job):
+        """
+        frees chunks of done job without subscribers
+        """
+        if job.done and not job.subscribers and not job.released:
+            job.released = True
+            job.chunks = []
+            self.buffered -= job.n_steps + 1
+
+    async def handle(self, reader, writer):
+        """
+        serves one connection, one job per connection
+        """
+        self.statistics['requests'] += 1
+        job = None
+        try:
+            try:
+                request = json.loads(await reader.readline())
+                job, shared = self.subscribe(request)
+                n_rows = int(request['steps']) + 1
+            except (ValueError, KeyError, TypeError, AssertionError) as error:
+                self.statistics['errors'] += 1
+                writer.write(json.dumps({'error': repr(error)}).encode() + b'\n')
+                await writer.drain()
+                return
+            writer.write(json.dumps({'rows': n_rows, 'shared': shared}).encode() + b'\n')
+            sent, index = 0, 0
+            while sent < n_rows:
+                data = await job.chunk(index)
+                if data is None:
+                    break
+                rows = min(len(data) // ROW_BYTES, n_rows - sent)
+                writer.write(CHUNK_HEADER.pack(sent, rows))
+                writer.write(data[:rows * ROW_BYTES])
+                await writer.drain()
+                self.statistics['bytes sent'] += CHUNK_HEADER.size + rows * ROW_BYTES
+                sent += rows
+                index += 1
+            writer.write(CHUNK_HEADER.pack(sent, 0))
+            if sent < n_rows:
+                writer.write(json.dumps({'error': job.error or "job ended early"}).encode() + b'\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            if job is not None:
+                job.subscribers -= 1
+                self._release(job)
+
+
+async def fetch(host, port, n_steps, integrator='taylor', lorenz_params=None, solver_params=None,
+                start=(1.0, 1.0, 1.0), on_chunk=None):
+    """
+    client, requests trajectory and collects its chunks
+    :raise ValueError: with message of server when request is refused or computation fails
+    :param on_chunk: optional function called with first row and number of rows of every received chunk
+    :return: tuple of ndarray of shape (n_steps + 1, 3) and header dict
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        request = {'integrator': integrator, 'lorenz params': lorenz_params, 'solver params': solver_params,
+                   'start': [float(value) for value in start], 'steps': n_steps}
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        header = json.loads(await reader.readline())
+        if 'error' in header:
+            raise ValueError(header['error'])
+        points = np.empty((header['rows'], 3))
+        while True:
+            first, rows = CHUNK_HEADER.unpack(await reader.readexactly(CHUNK_HEADER.size))
+            if not rows:
+                break
+            points[first:first + rows] = np.frombuffer(await reader.readexactly(rows * ROW_BYTES),
+                                                       dtype='<f8').reshape(rows, 3)
+            if on_chunk is not None:
+                on_chunk(first, rows)
+        if first != header['rows']:
+            error = json.loads(await reader.readline() or b'{}').get('error', "no reason given")
+            raise ValueError("stream ended after {} of {} rows: {}".format(first, header['rows'], error))
+        return points, header
+    finally:
+        writer.close()
+
+
+async def serve(host, port, processes, chunk_size, max_rows):
+    """
+    runs server until cancelled
+    """
+    server = TrajectoryServer(processes, chunk_size, max_rows=max_rows)
+    port = await server.start(host, port)
+    print("serving on {}:{}".format(host, port))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    """
+    runs server described by command line
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    parser = argparse.ArgumentParser(description="local server streaming trajectories of Lorenz equation")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--processes', type=int, default=1, help="worker processes, 1 computes in one thread")
+    parser.add_argument('--chunk', type=int, default=4096, help="rows computed and sent at once")
+    parser.add_argument('--max-rows', type=int, default=2 * 10 ** 7,
+                        help="rows of running jobs kept in memory at most, 24 bytes each")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.processes, args.chunk, args.max_rows))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
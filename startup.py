@@ -0,0 +1,205 @@
+"""
+startup benchmark, every measurement runs in fresh interpreter,
+records import time of modules (and which GUI libraries they pull in) and latency of the first frame,
+first frame is taken from real window when display is available, otherwise from the same drawing on Agg canvas,
+results are written as JSON and can be compared with stored baseline like in benchmark.py
+usage: python startup.py startup.json --baseline old.json
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# solver core has to load with numpy alone, main only when window is created
+MODULES = ('integrators', 'batch', 'main', 'app')
+HEAVY_MODULES = ('matplotlib', 'tkinter', 'mpl_toolkits.mplot3d')
+
+IMPORT_SCRIPT = """
+import sys, time
+begin = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - begin
+print(repr((seconds, [name for name in {heavy} if name in sys.modules])))
+"""
+
+WINDOW_SCRIPT = """
+import time
+begin = time.perf_counter()
+import main
+from app import Wiz
+imported = time.perf_counter()
+window = main.create_window([])
+created = time.perf_counter()
+times = []
+
+def on_draw(_):
+    if not times:
+        times.append(time.perf_counter())
+        window.after_idle(window._quit)
+
+window.canvas.mpl_connect('draw_event', on_draw)
+window.mainloop()
+print(repr({'imports': imported - begin, 'window': created - begin, 'first frame': times[0] - begin}))
+"""
+
+# headless run does what Wiz does up to its first blitted frame
+HEADLESS_SCRIPT = """
+import time
+begin = time.perf_counter()
+import numpy as np
+import main
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from plotting import setup_axes
+from rendering import LevelOfDetailRenderer
+from trajectory import TrajectoryBuffer
+from worker import IntegrationWorker
+imported = time.perf_counter()
+integrator = main.make_integrators()['Taylor']
+start = np.ones(3)
+trajectory = TrajectoryBuffer()
+trajectory.reset([start, integrator.step(start)])
+worker = IntegrationWorker(integrator, trajectory.last())
+worker.start()
+figure = Figure()
+FigureCanvasAgg(figure)
+axes = setup_axes(figure)
+renderer = LevelOfDetailRenderer(axes, 20000)
+renderer.update(trajectory)
+created = time.perf_counter()
+trajectory.extend(worker.take(1))
+renderer.update(trajectory)
+figure.canvas.draw()
+drawn = time.perf_counter()
+worker.stop()
+print(repr({'imports': imported - begin, 'window': created - begin, 'first frame': drawn - begin}))
+"""
+
+
+def run_script(script):
+    """
+    :param script: python code printing repr of its result as the last line
+    :return: tuple of result and wall time of whole process in seconds, interpreter start included
+    """
+    begin = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - begin
+    return ast.literal_eval(completed.stdout.strip().splitlines()[-1]), wall
+
+
+def has_display():
+    """
+    :return: True when Tk window can be opened
+    """
+    try:
+        subprocess.run([sys.executable, '-c', 'import tkinter; tkinter.Tk().destroy()'], capture_output=True,
+                       check=True, timeout=30)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return False
+    return True
+
+
+def measure_import(module, repeats=3):
+    """
+    :param module: module name
+    :param repeats: timing is the best of that many fresh interpreters
+    :return: dict with one row of results
+    """
+    runs = [run_script(IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)) for _ in range(repeats)]
+    return {'name': 'import ' + module, 'seconds': min(seconds for (seconds, _), _ in runs),
+            'process': min(wall for _, wall in runs), 'loaded': runs[0][0][1]}
+
+
+def measure_first_frame(window, repeats=3):
+    """
+    :param window: open real window, otherwise draw on Agg canvas
+    :param repeats: timing is the best of that many fresh interpreters
+    :return: dict with one row of results, seconds are counted from the first import
+    """
+    runs = [run_script(WINDOW_SCRIPT if window else HEADLESS_SCRIPT) for _ in range(repeats)]
+    best = min(runs, key=lambda run: run[0]['first frame'])[0]
+    return {'name': 'first frame ' + ('window' if window else 'headless'), 'seconds': best['first frame'],
+            'process': min(wall for _, wall in runs), 'imports': best['imports'], 'window': best['window']}
+
+
+def run_benchmark(modules=MODULES, window=None, repeats=3):
+    """
+    :param modules: names of modules whose import is timed
+    :param window: measure first frame in real window, None decides by availability of display
+    :param repeats: every timing is the best of that many fresh interpreters
+    :return: dict ready for JSON, with metadata and list of results
+    """
+    window = has_display() if window is None else window
+    results = [measure_import(module, repeats) for module in modules]
+    results.append(measure_first_frame(window, repeats))
+    return {'meta': {'python': platform.python_version(), 'numpy': np.__version__,
+                     'machine': platform.machine()},
+            'results': results}
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    finds measurements that got slower than baseline
+    :param results: output of run_benchmark
+    :param baseline: output of run_benchmark stored earlier
+    :param threshold: allowed relative growth of seconds
+    :return: list of (row, baseline row) pairs with regression
+    """
+    previous = {row['name']: row for row in baseline['results']}
+    regressions = []
+    for row in results['results']:
+        old = previous.get(row['name'])
+        if old is not None and row['seconds'] > (1 + threshold) * old['seconds']:
+            regressions.append((row, old))
+    return regressions
+
+
+def format_table(results):
+    """
+    :param results: output of run_benchmark
+    :return: table of startup times as text
+    """
+    lines = ["{:<24} {:>10} {:>11}  {}".format('measurement', 'ms', 'process ms', 'GUI modules loaded')]
+    for row in results['results']:
+        lines.append("{:<24} {:>10.1f} {:>11.1f}  {}".format(
+            row['name'], 1e3 * row['seconds'], 1e3 * row['process'], ', '.join(row.get('loaded', ['-'])) or '-'))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    """
+    runs startup benchmark described by command line
+    :param argv: command line arguments, sys.argv[1:] by default
+    :return: exit code, 1 when regression against baseline was found
+    """
+    parser = argparse.ArgumentParser(description="import time and first frame latency of the app")
+    parser.add_argument('output', help="JSON file for results")
+    parser.add_argument('--baseline', help="JSON file with earlier results")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative growth of startup times against baseline")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--headless', action='store_true', help="draw first frame on Agg even with display")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    results = run_benchmark(window=False if args.headless else None, repeats=args.repeats)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=1)
+    print(format_table(results))
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as file:
+        regressions = compare(results, json.load(file), args.threshold)
+    for row, old in regressions:
+        print("regression: {} {:.1f} ms, baseline {:.1f} ms".format(
+            row['name'], 1e3 * row['seconds'], 1e3 * old['seconds']))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
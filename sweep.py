@@ -0,0 +1,179 @@
+"""
+parameter sweeps of Lorenz equation on a process pool,
+every worker reduces its trajectories to short summaries (ie. z maxima for bifurcation diagrams)
+and writes them straight into shared memory, so no trajectory is ever pickled
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from integrators import LorenzEquation, INTEGRATOR_CLASSES
+
+
+def parameter_grid(sigma=(10.0,), rho=(28.0,), beta=(8 / 3,)):
+    """
+    :param sigma: values of sigma
+    :param rho: values of rho
+    :param beta: values of beta
+    :return: list of parameter dictionaries, cartesian product of given values
+    """
+    return [{'sigma': float(s), 'rho': float(r), 'beta': float(b)}
+            for s, r, b in itertools.product(np.atleast_1d(sigma), np.atleast_1d(rho), np.atleast_1d(beta))]
+
+
+def z_maxima(trajectory):
+    """
+    summary for bifurcation diagrams
+    :param trajectory: ndarray of shape (N, 3)
+    :return: values of z at its local maxima
+    """
+    z_values = trajectory[:, 2]
+    peaks = (z_values[1:-1] > z_values[:-2]) & (z_values[1:-1] >= z_values[2:])
+    return z_values[1:-1][peaks]
+
+
+class SweepResult:
+    """
+    summaries of all trajectories of a sweep,
+    values[i, j, :counts[i, j]] is summary for params[i] and initial_points[j]
+    """
+
+    def __init__(self, params, initial_points, values, counts):
+        self.params = params
+        self.initial_points = initial_points
+        self.values = values
+        self.counts = counts
+
+    def summary(self, param_index, point_index):
+        """
+        :return: summary of one trajectory as ndarray
+        """
+        return self.values[param_index, point_index, :self.counts[param_index, point_index]]
+
+    def bifurcation_points(self, key='rho'):
+        """
+        flattens summaries for scatter plot of bifurcation diagram
+        :param key: parameter on horizontal axis
+        :return: tuple of ndarrays with parameter values and summary values
+        """
+        valid = ~np.isnan(self.values)
+        abscissa = np.array([params[key] for params in self.params])
+        abscissa = np.broadcast_to(abscissa[:, None, None], self.values.shape)
+        return abscissa[valid], self.values[valid]
+
+
+def _integrate_tasks(integrator, params, points, n_steps, transient):
+    """
+    integrates group of tasks together with step_batch
+    :return: ndarray of shape (n_steps, N, 3)
+    """
+    integrator.set_lorenz_params({key: np.array([p[key] for p in params]) for key in ('sigma', 'rho', 'beta')})
+    points = np.array(points, dtype=float)
+    for _ in range(transient):
+        points = integrator.step_batch(points)
+    trajectories = np.empty((n_steps, len(points), 3))
+    for k in range(n_steps):
+        points = trajectories[k] = integrator.step_batch(points)
+    return trajectories
+
+
+def _sweep_worker(job):
+    """
+    runs part of the sweep in worker process
+    :param job: dictionary with shared memory name and shape, tasks and configuration
+    :return: number of finished tasks
+    """
+    memory = shared_memory.SharedMemory(name=job['memory'])
+    try:
+        results = np.ndarray(job['shape'], dtype=float, buffer=memory.buf)
+        integrator = INTEGRATOR_CLASSES[job['integrator']](LorenzEquation())
+        params = dict(integrator.get_solver_params())
+        params.update(job['solver params'])
+        integrator.set_solver_params(params)
+        tasks = job['tasks']
+        for start in range(0, len(tasks), job['batch size']):
+            group = tasks[start:start + job['batch size']]
+            if job['batch size'] > 1:
+                trajectories = _integrate_tasks(integrator, [task[1] for task in group],
+                                                [task[2] for task in group], job['steps'], job['transient'])
+            else:
+                integrator.set_lorenz_params(group[0][1])
+                point = group[0][2]
+                if job['transient']:
+                    point = integrator.integrate(point, job['transient'])[-1]
+                trajectories = integrator.integrate(point, job['steps'])[:, None, :]
+            for position, (index, _, _) in enumerate(group):
+                summary = job['summary'](trajectories[:, position])[:job['shape'][1] - 1]
+                results[index, 0] = len(summary)
+                results[index, 1:1 + len(summary)] = summary
+        del results
+        return len(tasks)
+    finally:
+        memory.close()
+
+
+class ParameterSweep:
+    """
+    integrates every initial point for every parameter set and keeps only summaries,
+    batch_size > 1 makes workers advance that many trajectories at once with step_batch
+    """
+
+    def __init__(self, integrator='Taylor', solver_params=None, n_steps=10000, transient=1000,
+                 summary=z_maxima, max_values=1000, processes=None, batch_size=1):
+        """
+        :param integrator: name from INTEGRATOR_CLASSES
+        :param solver_params: solver params to change, ie. {'order': 10}
+        :param n_steps: steps passed to summary
+        :param transient: steps discarded before summary
+        :param summary: picklable function taking ndarray of shape (n_steps, 3), returning 1d ndarray
+        :param max_values: longest summary kept, longer ones are cut
+        :param processes: number of worker processes, os.cpu_count() by default, 1 runs in this process
+        :param batch_size: trajectories integrated together by a worker
+        """
+        assert integrator in INTEGRATOR_CLASSES
+        assert batch_size == 1 or hasattr(INTEGRATOR_CLASSES[integrator], 'step_batch')
+        self.integrator = integrator
+        self.solver_params = dict(solver_params or {})
+        self.n_steps = n_steps
+        self.transient = transient
+        self.summary = summary
+        self.max_values = max_values
+        self.processes = processes or os.cpu_count()
+        self.batch_size = batch_size
+
+    def run(self, params, initial_points=((1.0, 1.0, 1.0),)):
+        """
+        :param params: list of parameter dictionaries, ie. from parameter_grid
+        :param initial_points: array like of shape (M, 3)
+        :return: SweepResult
+        """
+        initial_points = np.asarray(initial_points, dtype=float).reshape(-1, 3)
+        tasks = [(index, param_set, point) for index, (param_set, point)
+                 in enumerate(itertools.product(params, initial_points))]
+        shape = (len(tasks), self.max_values + 1)
+        memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        try:
+            results = np.ndarray(shape, dtype=float, buffer=memory.buf)
+            results.fill(np.nan)
+            # a few interleaved jobs per process keep the pool busy until the end
+            n_jobs = min(len(tasks), self.processes * 4)
+            jobs = [{'memory': memory.name, 'shape': shape, 'tasks': tasks[part::n_jobs],
+                     'integrator': self.integrator, 'solver params': self.solver_params,
+                     'steps': self.n_steps, 'transient': self.transient, 'summary': self.summary,
+                     'batch size': self.batch_size} for part in range(n_jobs)]
+            if self.processes == 1:
+                done = sum(_sweep_worker(job) for job in jobs)
+            else:
+                with ProcessPoolExecutor(self.processes) as pool:
+                    done = sum(pool.map(_sweep_worker, jobs))
+            assert done == len(tasks)
+            counts = results[:, 0].astype(int).reshape(len(params), len(initial_points))
+            values = results[:, 1:].reshape(len(params), len(initial_points), self.max_values).copy()
+            del results
+        finally:
+            memory.close()
+            memory.unlink()
+        return SweepResult(list(params), initial_points, values, counts)
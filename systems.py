@@ -0,0 +1,387 @@
+"""
+polynomial vector fields in 3d declared by their equations,
+right hand side, Runge Kutta loop and Taylor recurrence are generated from the declaration,
+so TaylorIntegrator and RungeKutta4th integrate them as fast as Lorenz equation,
+generated kernels are cached per declaration
+"""
+import ast
+import keyword
+
+import numpy as np
+
+from integrators import _compile_kernel
+
+_SYSTEM_KERNELS = {}
+
+
+def _add(first, second):
+    result = dict(first)
+    for monomial, coefficient in second.items():
+        result[monomial] = result.get(monomial, 0.0) + coefficient
+    return {monomial: coefficient for monomial, coefficient in result.items() if coefficient != 0.0}
+
+
+def _multiply(first, second):
+    result = {}
+    for monomial_a, coefficient_a in first.items():
+        for monomial_b, coefficient_b in second.items():
+            monomial = tuple(a + b for a, b in zip(monomial_a, monomial_b))
+            result[monomial] = result.get(monomial, 0.0) + coefficient_a * coefficient_b
+    return {monomial: coefficient for monomial, coefficient in result.items() if coefficient != 0.0}
+
+
+def expand(expression, symbols):
+    """
+    expands expression into polynomial in symbols,
+    allowed are numbers, symbols, +, -, *, ** with natural exponent and division by number
+    :param expression: python expression as string
+    :param symbols: sequence of names
+    :return: dict mapping tuple of exponents of symbols to numeric coefficient
+    """
+    zero = (0,) * len(symbols)
+
+    def visit(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return {zero: float(node.value)} if node.value else {}
+        if isinstance(node, ast.Name):
+            assert node.id in symbols, "unknown name {} in {}".format(node.id, expression)
+            return {tuple(int(symbol == node.id) for symbol in symbols): 1.0}
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = visit(node.operand)
+            sign = -1.0 if isinstance(node.op, ast.USub) else 1.0
+            return {monomial: sign * coefficient for monomial, coefficient in operand.items()}
+        if isinstance(node, ast.BinOp):
+            left = visit(node.left)
+            if isinstance(node.op, ast.Pow):
+                assert isinstance(node.right, ast.Constant) and isinstance(node.right.value, int) \
+                    and node.right.value >= 0, "only natural exponents are allowed in " + expression
+                result = {zero: 1.0}
+                for _ in range(node.right.value):
+                    result = _multiply(result, left)
+                return result
+            right = visit(node.right)
+            if isinstance(node.op, ast.Add):
+                return _add(left, right)
+            if isinstance(node.op, ast.Sub):
+                return _add(left, {monomial: -coefficient for monomial, coefficient in right.items()})
+            if isinstance(node.op, ast.Mult):
+                return _multiply(left, right)
+            if isinstance(node.op, ast.Div):
+                assert set(right) == {zero}, "only division by numbers is allowed in " + expression
+                return {monomial: coefficient / right[zero] for monomial, coefficient in left.items()}
+        raise AssertionError("unsupported expression " + expression)
+
+    return visit(ast.parse(expression, mode='eval').body)
+
+
+class PolynomialSystem:
+    """
+    object that conveys polynomial equation dv/dt = f(v) in 3d with named parameters,
+    works wherever LorenzEquation does in TaylorIntegrator, RungeKutta4th and the adaptive solvers,
+    parameters are attributes, as in LorenzEquation they may be ndarrays of shape (N,) in batch methods
+    """
+
+    def __init__(self, name, equations, params, variables=('x', 'y', 'z')):
+        """
+        :param name: name of the system
+        :param equations: 3 expressions for derivatives of variables, ie. 'sigma * (y - x)'
+        :param params: dict of parameter names and default values
+        :param variables: names of 3 variables used in equations
+        """
+        assert len(equations) == 3 and len(variables) == 3
+        names = tuple(variables) + tuple(params)
+        assert len(set(names)) == len(names), "names of variables and parameters have to differ"
+        assert all(name.isidentifier() and not keyword.iskeyword(name) for name in names)
+        self.name = name
+        self.equations = tuple(equations)
+        self.variables = tuple(variables)
+        self.param_names = tuple(params)
+        for param, value in params.items():
+            setattr(self, param, float(value))
+        self.signature = (self.equations, self.variables, self.param_names)
+        self._terms = self._collect_terms()
+        # sources of coefficients c0, c1, ... of all terms in order
+        self._sources = [source for equation in self._terms for _, source in equation]
+        self._eval = self._kernel('eval', None)
+
+    def _collect_terms(self):
+        """
+        :return: for every equation list of (exponents of variables, coefficient source in q0, q1, ...)
+        """
+        terms = []
+        for equation in self.equations:
+            grouped = {}
+            for monomial, coefficient in expand(equation, self.variables + self.param_names).items():
+                factors = [repr(coefficient)] if coefficient != 1.0 else []
+                for index, power in enumerate(monomial[3:]):
+                    factors += ["q{}".format(index)] * power
+                grouped.setdefault(monomial[:3], []).append(" * ".join(factors) or "1.0")
+            terms.append([(monomial, " + ".join(parts)) for monomial, parts in sorted(grouped.items())])
+        return terms
+
+    def _coefficient(self, index):
+        """
+        :return: tuple of sign and factor name of coefficient c{index}, unit coefficients have no factor
+        """
+        source = self._sources[index]
+        if source in ("1.0", "-1.0"):
+            return source[0] == "-", None
+        return False, "c{}".format(index)
+
+    @staticmethod
+    def _sum(parts):
+        """
+        :param parts: list of (negative, product source)
+        :return: source of sum
+        """
+        if not parts:
+            return "0.0"
+        source = ("-" if parts[0][0] else "") + parts[0][1]
+        for negative, part in parts[1:]:
+            source += (" - " if negative else " + ") + part
+        return source
+
+    def _header(self):
+        """
+        :return: source lines unpacking parameters and computing coefficients of monomials into c0, c1, ...
+        """
+        names = ["q{}".format(i) for i in range(len(self.param_names))]
+        lines = ["{}{} = params".format(", ".join(names) or "_", "," if len(names) == 1 else "")]
+        lines += ["c{} = {}".format(index, source) for index, source in enumerate(self._sources)
+                  if source not in ("1.0", "-1.0")]
+        return lines
+
+    def _rhs(self, names):
+        """
+        :param names: names of local variables with values of 3 variables
+        :return: 3 expressions with derivatives
+        """
+        expressions, index = [], 0
+        for equation in self._terms:
+            parts = []
+            for monomial, _ in equation:
+                negative, factor = self._coefficient(index)
+                factors = [] if factor is None else [factor]
+                for variable, power in enumerate(monomial):
+                    factors += [names[variable]] * power
+                parts.append((negative, " * ".join(factors) or "1.0"))
+                index += 1
+            expressions.append(self._sum(parts))
+        return expressions
+
+    def _recurrence(self, order):
+        """
+        source lines computing Taylor coefficients s{i}_{k} of variables for k < order from s0_0, s1_0, s2_0,
+        every monomial of degree above one gets its own series p{j}_{k} built from Cauchy products
+        :return: list of lines without indentation
+        """
+        products = {}
+
+        def series(monomial):
+            """name prefix of series of monomial, products are registered in dependency order"""
+            if sum(monomial) == 1:
+                return "s{}_".format(monomial.index(1))
+            if monomial not in products:
+                last = max(i for i, power in enumerate(monomial) if power)
+                rest = tuple(power - (i == last) for i, power in enumerate(monomial))
+                left = series(rest)
+                products[monomial] = ("p{}_".format(len(products)), left, "s{}_".format(last))
+            return products[monomial][0]
+
+        # terms as (negative, coefficient name or None, series prefix or None for constants)
+        terms, index = [], 0
+        for equation in self._terms:
+            terms.append([])
+            for monomial, _ in equation:
+                negative, factor = self._coefficient(index)
+                terms[-1].append((negative, factor, series(monomial) if sum(monomial) else None))
+                index += 1
+        lines = []
+        for k in range(order - 1):
+            for name, left, right in products.values():
+                lines.append("{}{} = {}".format(name, k, " + ".join(
+                    "{}{} * {}{}".format(left, k - j, right, j) for j in range(k, -1, -1))))
+            for variable, equation in enumerate(terms):
+                parts = [(negative, "{}{}".format(prefix, k) if factor is None else "{} * {}{}".format(factor, prefix, k))
+                         for negative, factor, prefix in equation if prefix is not None]
+                if k == 0:
+                    parts += [(negative, factor or "1.0") for negative, factor, prefix in equation if prefix is None]
+                derivative = self._sum(parts)
+                lines.append("s{}_{} = ({}) / {}".format(variable, k + 1, derivative, k + 1) if k
+                             else "s{}_1 = {}".format(variable, derivative))
+        return lines
+
+    def _kernel(self, kind, order):
+        """
+        generated function of given kind, cached per declaration
+        :param kind: 'eval', 'coefficients', 'taylor steps' or 'runge kutta steps'
+        :param order: order of Taylor method, None for other kinds
+        """
+        key = (self.signature, kind, order)
+        if key in _SYSTEM_KERNELS:
+            return _SYSTEM_KERNELS[key]
+        if kind == 'eval':
+            lines = ["def kernel(s0, s1, s2, params):"]
+            lines += ["    " + line for line in self._header()]
+            lines.append("    return ({}, {}, {})".format(*self._rhs(("s0", "s1", "s2"))))
+        elif kind == 'coefficients':
+            lines = ["def kernel(s0_0, s1_0, s2_0, params):"]
+            lines += ["    " + line for line in self._header() + self._recurrence(order)]
+            lines.append("    return [{}]".format(", ".join(
+                "[{}]".format(", ".join("s{}_{}".format(i, k) for k in range(order))) for i in range(3))))
+        elif kind == 'taylor steps':
+            lines = ["def kernel(s0_0, s1_0, s2_0, params, time_step, n_steps, out):"]
+            lines += ["    " + line for line in self._header()]
+            lines.append("    for k in range(n_steps):")
+            lines += ["        " + line for line in self._recurrence(order)]
+            last = max(order - 1, 0)
+            for i in range(3):
+                lines.append("        v{0} = s{0}_{1}".format(i, last))
+                lines += ["        v{0} = v{0} * time_step + s{0}_{1}".format(i, k) for k in range(last - 1, -1, -1)]
+            for i in range(3):
+                lines += ["        s{0}_0 = v{0}".format(i), "        out[3 * k + {0}] = v{0}".format(i)]
+        else:
+            lines = ["def kernel(s0, s1, s2, params, time_step, n_steps, out):"]
+            lines += ["    " + line for line in self._header()]
+            lines += ["    half = 0.5 * time_step",
+                      "    for k in range(n_steps):"]
+            for stage, (names, factor) in enumerate([(("s0", "s1", "s2"), None), (None, "half"),
+                                                     (None, "half"), (None, "time_step")], start=1):
+                if names is None:
+                    names = tuple("a{}_{}".format(i, stage) for i in range(3))
+                    lines += ["        a{0}_{1} = s{0} + {2} * d{0}_{3}".format(i, stage, factor, stage - 1)
+                              for i in range(3)]
+                lines += ["        d{}_{} = {}".format(i, stage, expression)
+                          for i, expression in enumerate(self._rhs(names))]
+            for i in range(3):
+                lines += ["        s{0} = s{0} + time_step * (d{0}_1 + 2 * d{0}_2 + 2 * d{0}_3 + d{0}_4) / 6".format(i),
+                          "        out[3 * k + {0}] = s{0}".format(i)]
+        kernel = _compile_kernel(lines, "{} {}{}".format(self.name, kind, "" if order is None else " order {}".format(order)))
+        _SYSTEM_KERNELS[key] = kernel
+        return kernel
+
+    def _values(self):
+        return tuple(getattr(self, param) for param in self.param_names)
+
+    def eval(self, point):
+        """
+        :param point: float precision, possibly ndarray 3 values
+        :return: evaluation of equation for specified point as ndarray
+        """
+        assert len(point) == 3
+        return np.asarray(self._eval(point[0], point[1], point[2], self._values()), dtype=float)
+
+    def eval_batch(self, points):
+        """
+        evaluation for whole ensemble of points at once,
+        parameters may be floats or ndarrays of shape (N,) (one set per point)
+        :param points: ndarray of shape (N, 3)
+        :return: evaluation of equation for every point as ndarray of shape (N, 3)
+        """
+        points = np.asarray(points, dtype=float)
+        assert points.ndim == 2 and points.shape[1] == 3
+        values = np.empty_like(points)
+        values[:, 0], values[:, 1], values[:, 2] = self._eval(points[:, 0], points[:, 1], points[:, 2],
+                                                               self._values())
+        return values
+
+    def taylor_coefficients(self, point, order):
+        """
+        :param point: point in 3d
+        :param order: order of Taylor method
+        :return: ndarray of shape (3, order), column k is k-th derivative divided by k!
+        """
+        assert len(point) == 3
+        return np.asarray(self._kernel('coefficients', order)(
+            float(point[0]), float(point[1]), float(point[2]), self._values()), dtype=float)
+
+    def taylor_coefficients_batch(self, points, order):
+        """
+        the same generated recurrence evaluated on columns of ensemble
+        :param points: ndarray of shape (N, 3)
+        :param order: order of Taylor method
+        :return: ndarray of shape (order, 3, N)
+        """
+        points = np.asarray(points, dtype=float)
+        assert points.ndim == 2 and points.shape[1] == 3
+        coefficients = self._kernel('coefficients', order)(points[:, 0], points[:, 1], points[:, 2], self._values())
+        result = np.empty((order, 3, len(points)))
+        for i in range(3):
+            for k in range(order):
+                result[k, i] = coefficients[i][k]
+        return result
+
+    def taylor_steps(self, point, order, time_step, n_steps, out):
+        """
+        :param point: starting point
+        :param out: flat buffer of doubles with room for 3 * n_steps values
+        """
+        self._kernel('taylor steps', order)(float(point[0]), float(point[1]), float(point[2]), self._values(),
+                                            time_step, n_steps, out)
+
+    def runge_kutta_steps(self, point, time_step, n_steps, out):
+        """
+        :param point: starting point
+        :param out: flat buffer of doubles with room for 3 * n_steps values
+        """
+        self._kernel('runge kutta steps', None)(float(point[0]), float(point[1]), float(point[2]), self._values(),
+                                                time_step, n_steps, out)
+
+    def get_params(self):
+        """
+        :return: dictonary of equation parameters
+        """
+        return {param: getattr(self, param) for param in self.param_names}
+
+    def set_params(self, params):
+        """
+        sets the parameters of equation
+        params: dictionary of parameters
+        """
+        for param in self.param_names:
+            setattr(self, param, params[param])
+
+
+def lorenz():
+    """
+    :return: Lorenz equation declared as polynomial system, integrates like LorenzEquation
+    """
+    return PolynomialSystem('Lorenz', ('sigma * (y - x)', 'x * (rho - z) - y', 'x * y - beta * z'),
+                            {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3})
+
+
+def rossler():
+    """
+    :return: Rossler system
+    """
+    return PolynomialSystem('Rossler', ('-y - z', 'x + a * y', 'b + z * (x - c)'),
+                            {'a': 0.2, 'b': 0.2, 'c': 5.7})
+
+
+def chen():
+    """
+    :return: Chen system
+    """
+    return PolynomialSystem('Chen', ('a * (y - x)', '(c - a) * x - x * z + c * y', 'x * y - b * z'),
+                            {'a': 35.0, 'b': 3.0, 'c': 28.0})
+
+
+def lu():
+    """
+    :return: Lu system
+    """
+    return PolynomialSystem('Lu', ('a * (y - x)', '-x * z + c * y', 'x * y - b * z'),
+                            {'a': 36.0, 'b': 3.0, 'c': 20.0})
+
+
+def thomas_cubic():
+    """
+    :return: Thomas cyclically symmetric system with sin replaced by its cubic Taylor polynomial
+    """
+    return PolynomialSystem('Thomas cubic', ('y - y ** 3 / 6 - b * x', 'z - z ** 3 / 6 - b * y',
+                                             'x - x ** 3 / 6 - b * z'),
+                            {'b': 0.18})
+
+
+# factories of declared systems by name
+SYSTEMS = {'Lorenz': lorenz, 'Rossler': rossler, 'Chen': chen, 'Lu': lu, 'Thomas cubic': thomas_cubic}
@@ -0,0 +1,122 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+import batch
+from checkpoint import save_checkpoint
+from integrators import LorenzEquation, TaylorIntegrator
+
+
+class TestBatch(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def expected(self, steps):
+        integrator = TaylorIntegrator(LorenzEquation())
+        integrator.set_solver_params({'order': 10, 'time step': 0.01})
+        return np.vstack([[1.0, 1.0, 1.0], integrator.integrate((1, 1, 1), steps)])
+
+    def test_npy(self):
+        batch.main([self.path('out.npy'), '--steps', '1000', '--order', '10', '--chunk', '64'])
+        np.testing.assert_array_equal(np.load(self.path('out.npy')), self.expected(1000))
+
+    def test_raw_with_time(self):
+        batch.main([self.path('out.bin'), '--steps', '100', '--order', '10', '--with-time', '--chunk', '7'])
+        result = np.fromfile(self.path('out.bin')).reshape(-1, 4)
+        np.testing.assert_array_equal(result[:, 1:], self.expected(100))
+        np.testing.assert_allclose(result[:, 0], np.arange(101) * 0.01)
+
+    def test_csv(self):
+        batch.main([self.path('out.csv'), '--steps', '50', '--order', '10'])
+        np.testing.assert_array_equal(np.loadtxt(self.path('out.csv'), delimiter=',', skiprows=1),
+                                      self.expected(50))
+
+    def test_cache(self):
+        for _ in range(2):
+            batch.main([self.path('out.bin'), '--steps', '200', '--order', '10', '--with-time', '--chunk', '64',
+                        '--cache', self.path('cache')])
+            result = np.fromfile(self.path('out.bin')).reshape(-1, 4)
+            np.testing.assert_array_equal(result[:, 1:], self.expected(200))
+            np.testing.assert_allclose(result[:, 0], np.arange(201) * 0.01)
+        self.assertEqual(len(os.listdir(self.path('cache'))), 1)
+
+    def test_checkpoint_resume(self):
+        writers = dict(batch.WRITERS)
+
+        def crashing(writer_class):
+            class CrashingWriter(writer_class):
+                calls = 0
+
+                def write(self, rows):
+                    CrashingWriter.calls += 1
+                    if CrashingWriter.calls == 7:
+                        raise KeyboardInterrupt
+                    writer_class.write(self, rows)
+            return CrashingWriter
+
+        for name, integrator, options in (('out.npy', 'taylor', []), ('out.csv', 'dormand-prince', ['--with-time']),
+                                          ('out.raw', 'adaptive-taylor', ['--with-time'])):
+            arguments = ['--integrator', integrator, '--steps', '1000', '--chunk', '64'] + options
+            batch.main([self.path('full_' + name)] + arguments)
+            resumable = [self.path(name)] + arguments + ['--checkpoint', self.path('run.npz'),
+                                                         '--checkpoint-interval', '0', '--checkpoint-tail', '50']
+            output_format = batch.parse_args(resumable).format
+            batch.WRITERS[output_format] = crashing(writers[output_format])
+            try:
+                with self.assertRaises(KeyboardInterrupt):
+                    batch.main(resumable)
+            finally:
+                batch.WRITERS.update(writers)
+            self.assertTrue(os.path.exists(self.path('run.npz')))
+            with open(self.path(name), 'rb') as partial:
+                written = partial.read()
+            with self.assertRaises(ValueError):
+                batch.main(resumable[:-6] + ['--sigma', '11'] + resumable[-6:])
+            with open(self.path(name), 'rb') as partial:
+                self.assertEqual(partial.read(), written)
+            batch.main(resumable)
+            self.assertFalse(os.path.exists(self.path('run.npz')))
+            with open(self.path('full_' + name), 'rb') as full, open(self.path(name), 'rb') as resumed:
+                self.assertEqual(full.read(), resumed.read())
+
+    def test_session_checkpoint_refused(self):
+        # checkpoint saved by window has no run description
+        save_checkpoint(self.path('run.npz'), TaylorIntegrator(LorenzEquation()), (1.0, 1.0, 1.0), 10,
+                        extra={'integrator name': 'Taylor', 'begin': [1.0, 1.0, 1.0]})
+        with self.assertRaises(ValueError):
+            batch.main([self.path('out.npy'), '--steps', '100', '--checkpoint', self.path('run.npz')])
+        self.assertFalse(os.path.exists(self.path('out.npy')))
+
+    def test_checkpoint_failure(self):
+        with self.assertRaises(FileNotFoundError):
+            batch.main([self.path('out.npy'), '--steps', '1000', '--chunk', '64',
+                        '--checkpoint', self.path(os.path.join('missing', 'run.npz')), '--checkpoint-interval', '0'])
+
+    def test_sample_steps(self):
+        self.assertEqual(batch.sample_steps(0.005, 0.01), 2)
+        self.assertEqual(batch.sample_steps(0.01, 0.01), 1)
+        with self.assertRaises(ValueError):
+            batch.sample_steps(0.003, 0.01)
+
+    def test_adaptive_times(self):
+        batch.main([self.path('out.npy'), '--steps', '30', '--integrator', 'dormand-prince',
+                    '--rtol', '1e-8', '--with-time', '--chunk', '8'])
+        result = np.load(self.path('out.npy'))
+        self.assertEqual(result.shape, (31, 4))
+        self.assertTrue(np.all(np.diff(result[:, 0]) > 0))
+
+    def test_no_gui_imports(self):
+        code = "import sys, batch; print(any(m in sys.modules for m in ('tkinter', 'matplotlib', 'app')))"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(batch.__file__))).stdout
+        self.assertEqual(output.strip(), 'False')
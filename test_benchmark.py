@@ -0,0 +1,37 @@
+import copy
+from unittest import TestCase
+
+import benchmark
+
+CONFIGURATIONS = [('Runge-Kutta', {'time step': 0.01}), ('Taylor', {'order': 10, 'time step': 0.01}),
+                  ('Dormand-Prince', {'time step': 0.01, 'rtol': 1e-6, 'atol': 1e-9}),
+                  ('Adaptive Taylor', {'order': 12, 'tolerance': 1e-10, 'max step': 0.1})]
+
+
+class TestBenchmark(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = benchmark.run_benchmark(CONFIGURATIONS, t_end=0.5, repeats=1, min_seconds=0)
+
+    def test_rows(self):
+        rows = self.results['results']
+        self.assertEqual([row['integrator'] for row in rows], [name for name, _ in CONFIGURATIONS])
+        self.assertEqual(rows[0]['steps'], 50)
+        self.assertEqual(rows[0]['rhs evaluations'], 200)
+        self.assertIsNone(rows[1]['rhs evaluations'])
+        self.assertGreater(rows[2]['rhs evaluations'], rows[2]['steps'])
+        self.assertLess(rows[1]['error'], rows[0]['error'])
+        for row in rows:
+            self.assertGreater(row['steps per second'], 0)
+            self.assertLess(row['error'], 1e-3)
+
+    def test_compare(self):
+        baseline = copy.deepcopy(self.results)
+        self.assertEqual(benchmark.compare(self.results, baseline), [])
+        baseline['results'][1]['steps per second'] *= 2
+        regressions = benchmark.compare(self.results, baseline, threshold=0.2)
+        self.assertEqual([row['integrator'] for row, _ in regressions], ['Taylor'])
+
+    def test_format_table(self):
+        table = benchmark.format_table(self.results).splitlines()
+        self.assertEqual(len(table), len(CONFIGURATIONS) + 1)
@@ -0,0 +1,91 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from cache import TrajectoryCache, trajectory_key
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th, DormandPrince54
+from systems import lorenz
+
+
+class TestTrajectoryKey(TestCase):
+    def test_depends_on_everything(self):
+        integrator = TaylorIntegrator(LorenzEquation())
+        key = trajectory_key(integrator, (1, 1, 1))
+        self.assertEqual(key, trajectory_key(TaylorIntegrator(LorenzEquation()), (1.0, 1.0, 1.0)))
+        self.assertNotEqual(key, trajectory_key(RungeKutta4th(LorenzEquation()), (1, 1, 1)))
+        self.assertNotEqual(key, trajectory_key(TaylorIntegrator(LorenzEquation(rho=15.0)), (1, 1, 1)))
+        self.assertNotEqual(key, trajectory_key(integrator, (1, 1, 1 + 1e-15)))
+        self.assertNotEqual(key, trajectory_key(TaylorIntegrator(lorenz()), (1, 1, 1)))
+        integrator.set_solver_params({'order': 10, 'time step': 0.01})
+        self.assertNotEqual(key, trajectory_key(integrator, (1, 1, 1)))
+
+
+class TestTrajectoryCache(TestCase):
+    def setUp(self):
+        self.integrator = TaylorIntegrator(LorenzEquation())
+        self.integrator.set_solver_params({'order': 10, 'time step': 0.01})
+        self.expected = np.vstack([[1.0, 1.0, 1.0], self.integrator.integrate((1, 1, 1), 300)])
+
+    def test_hit_and_prefix_extension(self):
+        cache = TrajectoryCache()
+        np.testing.assert_array_equal(cache.get(self.integrator, (1, 1, 1), 100), self.expected[:101])
+        np.testing.assert_array_equal(cache.get(self.integrator, (1, 1, 1), 50), self.expected[:51])
+        np.testing.assert_array_equal(cache.get(self.integrator, (1, 1, 1), 300), self.expected)
+        self.assertEqual(cache.statistics['misses'], 1)
+        self.assertEqual(cache.statistics['hits'], 1)
+        self.assertEqual(cache.statistics['extensions'], 1)
+
+    def test_read_only(self):
+        trajectory = TrajectoryCache().get(self.integrator, (1, 1, 1), 10)
+        with self.assertRaises(ValueError):
+            trajectory[0, 0] = 5.0
+
+    def test_lru_eviction(self):
+        cache = TrajectoryCache(max_bytes=2 * 101 * 3 * 8)
+        for start in ((1, 1, 1), (2, 2, 2), (1, 1, 1), (3, 3, 3)):
+            cache.get(self.integrator, start, 100)
+        self.assertEqual(cache.statistics['evictions'], 1)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        cache.get(self.integrator, (1, 1, 1), 100)
+        self.assertEqual(cache.statistics['hits'], 2)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TrajectoryCache(max_bytes=0, directory=directory)
+            cache.get(self.integrator, (1, 1, 1), 100)
+            cache.get(self.integrator, (2, 2, 2), 100)
+            self.assertEqual(len(os.listdir(directory)), 2)
+            self.assertEqual(cache.nbytes, 0)
+            cache.flush()
+            fresh = TrajectoryCache(directory=directory)
+            np.testing.assert_array_equal(fresh.get(self.integrator, (1, 1, 1), 100), self.expected[:101])
+            np.testing.assert_array_equal(fresh.get(self.integrator, (1, 1, 1), 300), self.expected)
+            self.assertEqual(fresh.statistics['disk hits'], 2)
+            self.assertEqual(fresh.statistics['misses'], 0)
+
+    def test_entry_over_budget(self):
+        cache = TrajectoryCache(max_bytes=100 * 3 * 8)
+        self.assertTrue(cache.fits(49))
+        self.assertFalse(cache.fits(50))
+        np.testing.assert_array_equal(cache.get(self.integrator, (1, 1, 1), 200), self.expected[:201])
+        self.assertEqual(len(cache.entries), 0)
+        self.assertEqual(cache.nbytes, 0)
+        self.assertEqual(cache.statistics['evictions'], 1)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = TrajectoryCache(max_bytes=100 * 3 * 8, directory=directory)
+            cache.get(self.integrator, (1, 1, 1), 10)
+            cache.get(self.integrator, (1, 1, 1), 200)
+            self.assertEqual(cache.nbytes, 0)
+            np.testing.assert_array_equal(cache.get(self.integrator, (1, 1, 1), 300), self.expected)
+            self.assertEqual(cache.statistics['disk hits'], 1)
+            self.assertEqual(cache.statistics['misses'], 1)
+            self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_adaptive_not_cached(self):
+        cache = TrajectoryCache()
+        integrator = DormandPrince54(LorenzEquation())
+        self.assertFalse(cache.accepts(integrator))
+        self.assertEqual(cache.get(integrator, (1, 1, 1), 20).shape, (21, 3))
+        self.assertEqual(len(cache.entries), 0)
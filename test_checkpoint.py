@@ -0,0 +1,104 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from checkpoint import (CHECKPOINT_VERSION, CheckpointWriter, load_checkpoint, matching_integrator, restore_state,
+                        save_checkpoint, snapshot, write)
+from integrators import (LorenzEquation, TaylorIntegrator, RungeKutta4th, DormandPrince54,
+                         AdaptiveTaylorIntegrator)
+from systems import rossler
+
+
+class TestCheckpoint(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'run.npz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_bit_identical_continuation(self):
+        for integrator_class in (TaylorIntegrator, RungeKutta4th, DormandPrince54, AdaptiveTaylorIntegrator):
+            integrator = integrator_class(LorenzEquation(sigma=12.0))
+            whole = integrator_class(LorenzEquation(sigma=12.0)).integrate((1.0, 2.0, 3.0), 300)
+            first = integrator.integrate((1.0, 2.0, 3.0), 120)
+            save_checkpoint(self.path, integrator, first[-1], 120, first[-10:], {'note': 'test'})
+            checkpoint = load_checkpoint(self.path)
+            self.assertIsNot(checkpoint.integrator, integrator)
+            self.assertEqual(checkpoint.integrator.get_lorenz_params(), integrator.get_lorenz_params())
+            self.assertEqual((checkpoint.steps, checkpoint.extra, checkpoint.version), (120, {'note': 'test'},
+                                                                                         CHECKPOINT_VERSION))
+            np.testing.assert_array_equal(checkpoint.tail, first[-10:])
+            rest = checkpoint.integrator.integrate(checkpoint.state, 180)
+            np.testing.assert_array_equal(np.vstack([first, rest]), whole)
+
+    def test_matching_integrator(self):
+        lorenz = LorenzEquation()
+        integrators = {'Taylor': TaylorIntegrator(lorenz), 'Runge-Kutta': RungeKutta4th(lorenz),
+                       'Runge-Kutta fine': RungeKutta4th(lorenz)}
+        # window session names its integrator, batch run has only its type
+        save_checkpoint(self.path, RungeKutta4th(LorenzEquation()), (1.0, 1.0, 1.0), 0,
+                        extra={'integrator name': 'Runge-Kutta fine'})
+        self.assertEqual(matching_integrator(integrators, load_checkpoint(self.path)), 'Runge-Kutta fine')
+        save_checkpoint(self.path, RungeKutta4th(LorenzEquation()), (1.0, 1.0, 1.0), 0, extra={'run': 'abc'})
+        self.assertEqual(matching_integrator(integrators, load_checkpoint(self.path)), 'Runge-Kutta')
+        save_checkpoint(self.path, DormandPrince54(LorenzEquation()), (1.0, 1.0, 1.0), 0)
+        self.assertIsNone(matching_integrator(integrators, load_checkpoint(self.path)))
+        save_checkpoint(self.path, TaylorIntegrator(rossler()), (1.0, 1.0, 1.0), 0)
+        self.assertIsNone(matching_integrator(integrators, load_checkpoint(self.path)))
+
+    def test_restore_state(self):
+        integrator = DormandPrince54(LorenzEquation(rho=24.0))
+        points = integrator.integrate((1.0, 1.0, 1.0), 50)
+        save_checkpoint(self.path, integrator, points[-1], 50)
+        equation = LorenzEquation()
+        other = DormandPrince54(equation)
+        restore_state(other, load_checkpoint(self.path))
+        self.assertEqual(equation.rho, 24.0)
+        self.assertEqual((other.time, other.statistics), (integrator.time, integrator.statistics))
+        np.testing.assert_array_equal(other.integrate(points[-1], 20), integrator.integrate(points[-1], 20))
+        with self.assertRaises(AssertionError):
+            restore_state(TaylorIntegrator(equation), load_checkpoint(self.path))
+
+    def test_polynomial_system(self):
+        integrator = TaylorIntegrator(rossler())
+        save_checkpoint(self.path, integrator, (1.0, 0.0, 0.0), 0)
+        restored = load_checkpoint(self.path).integrator
+        self.assertEqual(restored.lorenz.signature, integrator.lorenz.signature)
+        np.testing.assert_array_equal(restored.integrate((1.0, 0.0, 0.0), 50), integrator.integrate((1.0, 0.0, 0.0), 50))
+
+    def test_newer_version(self):
+        header, arrays = snapshot(TaylorIntegrator(LorenzEquation()), (1.0, 1.0, 1.0), 0)
+        header['version'] = CHECKPOINT_VERSION + 1
+        write(self.path, header, arrays)
+        with self.assertRaises(AssertionError):
+            load_checkpoint(self.path)
+
+    def test_writer(self):
+        integrator = TaylorIntegrator(LorenzEquation())
+        writer = CheckpointWriter(self.path, interval=3600)
+        self.assertFalse(writer.due())
+        point = np.array([1.0, 1.0, 1.0])
+        for steps in range(1, 21):
+            point = integrator.step(point)
+            writer.submit(integrator, point, steps)
+        writer.close()
+        self.assertEqual(writer.statistics['written'] + writer.statistics['dropped'], 20)
+        checkpoint = load_checkpoint(self.path)
+        self.assertEqual(checkpoint.steps, 20)
+        np.testing.assert_array_equal(checkpoint.state, point)
+        self.assertEqual(os.listdir(self.directory.name), ['run.npz'])
+
+    def test_writer_failure(self):
+        integrator = RungeKutta4th(LorenzEquation())
+        writer = CheckpointWriter(os.path.join(self.directory.name, 'missing', 'run.npz'), interval=0)
+        writer.submit(integrator, np.ones(3), 1)
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+        with self.assertRaises(FileNotFoundError):
+            writer.submit(integrator, np.ones(3), 2)
+        with self.assertRaises(FileNotFoundError):
+            writer.close()
+        self.assertEqual(writer.statistics['written'], 0)
@@ -0,0 +1,68 @@
+import itertools
+from unittest import TestCase
+
+import numpy as np
+
+from comparison import ComparisonHistory, ComparisonWorker, advance, configuration, sampling_interval, separations
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th, DormandPrince54, AdaptiveTaylorIntegrator
+
+
+class TestComparison(TestCase):
+    def setUp(self):
+        equation = LorenzEquation()
+        self.configurations = [configuration('Taylor', TaylorIntegrator(equation), {'order': 12}),
+                               configuration('Runge-Kutta', RungeKutta4th(equation), {'time step': 0.005}),
+                               configuration('Dormand-Prince', DormandPrince54(equation)),
+                               configuration('Adaptive Taylor', AdaptiveTaylorIntegrator(equation))]
+
+    def test_configuration(self):
+        config = self.configurations[0]
+        self.assertEqual(config['integrator'], 'Taylor')
+        self.assertEqual(config['solver params'], {'order': 12, 'time step': 0.01})
+        self.assertEqual(config['lorenz params'], LorenzEquation().get_params())
+        self.assertEqual(sampling_interval(self.configurations), 0.01)
+        self.assertEqual(sampling_interval(self.configurations[2:]), 0.01)
+
+    def test_time_step_not_dividing_interval(self):
+        with self.assertRaises(ValueError):
+            ComparisonWorker([configuration('Runge-Kutta', RungeKutta4th(LorenzEquation()), {'time step': 0.003}),
+                              self.configurations[0]], (1.0, 1.0, 1.0))
+
+    def test_advance_samples_common_times(self):
+        start = np.array([1.0, 1.0, 1.0])
+        samples = [advance(config, start, 30, 0.01) for config in self.configurations]
+        reference = TaylorIntegrator(LorenzEquation())
+        reference.set_solver_params({'order': 30, 'time step': 0.001})
+        expected = reference.integrate(start, 300)[9::10]
+        for (points, cpu, steps, params), tolerance in zip(samples, (1e-9, 1e-4, 1e-4, 1e-9)):
+            np.testing.assert_allclose(points, expected, atol=tolerance)
+            self.assertGreater(steps, 0)
+            self.assertGreaterEqual(cpu, 0)
+        self.assertEqual(samples[1][2], 60)
+        self.assertEqual(samples[2][3]['rtol'], 1e-6)
+
+    def test_separations(self):
+        points = np.random.default_rng(0).normal(size=(5, 4, 3))
+        expected = np.array([[np.linalg.norm(sample[i] - sample[j]) for i, j in itertools.combinations(range(4), 2)]
+                             for sample in points])
+        np.testing.assert_allclose(separations(points), expected)
+        self.assertEqual(separations(points[:, :1]).shape, (5, 0))
+
+    def test_worker_and_history(self):
+        for processes in (1, 2):
+            worker = ComparisonWorker(self.configurations, (1.0, 1.0, 1.0), n_samples=10, processes=processes,
+                                      max_rounds=3)
+            self.assertEqual(worker.labels, [config['label'] for config in self.configurations])
+            worker.start()
+            history = ComparisonHistory(4, worker.interval, keep=25)
+            while history.count < 30:
+                history.add(worker.take(2))
+            worker.stop()
+            worker.join()
+            self.assertEqual(history.points.shape, (25, 4, 3))
+            self.assertEqual(history.separations.shape, (25, 6))
+            np.testing.assert_allclose(history.times, (history.count - 24 + np.arange(25)) * 0.01)
+            self.assertEqual(history.costs.shape[1], 4)
+            np.testing.assert_allclose(history.round_times[-1], history.times[-1])
+            # trajectories start together and stay close over short time
+            self.assertLess(history.separations.max(), 1e-2)
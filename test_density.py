@@ -0,0 +1,97 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from density import DensityGrid, accumulate, accumulate_ensemble, parallel_density, main
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th, DormandPrince54
+
+
+def histogram(points, grid):
+    """reference counts from numpy.histogramdd"""
+    counts, _ = np.histogramdd(points, bins=grid.shape, range=grid.bounds)
+    return counts
+
+
+class TestDensityGrid(TestCase):
+    def setUp(self):
+        self.points = np.random.default_rng(0).normal(0, 10, (5000, 3))
+
+    def test_add_matches_histogram(self):
+        for shape in ((4, 5, 6), (40, 50, 60)):
+            grid = DensityGrid(((-20, 20), (-15, 25), (-10, 10)), shape).add(self.points)
+            expected = histogram(self.points, grid)
+            np.testing.assert_array_equal(grid.counts, expected)
+            self.assertEqual(grid.outside, len(self.points) - expected.sum())
+            self.assertEqual(grid.total, len(self.points))
+
+    def test_merge(self):
+        whole = DensityGrid(shape=(10, 10, 10)).add(self.points)
+        first = DensityGrid(shape=(10, 10, 10)).add(self.points[:1234])
+        first.merge(DensityGrid(shape=(10, 10, 10)).add(self.points[1234:]))
+        np.testing.assert_array_equal(first.counts, whole.counts)
+        self.assertEqual(first.outside, whole.outside)
+        with self.assertRaises(AssertionError):
+            first.merge(DensityGrid(shape=(10, 10, 11)))
+
+    def test_density_and_projection(self):
+        grid = DensityGrid(shape=(10, 12, 14)).add(self.points)
+        inside = 1 - grid.outside / grid.total
+        self.assertAlmostEqual(grid.density().sum() * np.prod(grid.voxel_size), inside)
+        self.assertEqual(grid.projection(1).shape, (10, 14))
+        self.assertAlmostEqual(grid.projection(1).sum(), inside)
+
+    def test_save_load(self):
+        grid = DensityGrid(shape=(8, 9, 10)).add(self.points)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grid.npy')
+            grid.save(path)
+            self.assertEqual(np.load(path)['counts'].dtype, np.uint8)
+            loaded = DensityGrid.load(path)
+        np.testing.assert_array_equal(loaded.counts, grid.counts)
+        np.testing.assert_array_equal(loaded.bounds, grid.bounds)
+        self.assertEqual(loaded.outside, grid.outside)
+
+
+class TestAccumulate(TestCase):
+    def setUp(self):
+        self.integrator = TaylorIntegrator(LorenzEquation())
+        self.integrator.set_solver_params({'order': 10, 'time step': 0.01})
+
+    def test_streaming_matches_trajectory(self):
+        grid = DensityGrid(shape=(20, 20, 20))
+        last = accumulate(self.integrator, (1, 1, 1), 1000, grid, chunk_size=64, transient=100)
+        trajectory = self.integrator.integrate((1, 1, 1), 1100)[100:]
+        np.testing.assert_array_equal(grid.counts, histogram(trajectory, grid))
+        np.testing.assert_array_equal(last, trajectory[-1])
+        with self.assertRaises(AssertionError):
+            accumulate(DormandPrince54(LorenzEquation()), (1, 1, 1), 10, grid)
+
+    def test_ensemble(self):
+        runge = RungeKutta4th(LorenzEquation())
+        starts = np.array([[1.0, 1.0, 1.0], [-1.0, 2.0, 20.0]])
+        grid = DensityGrid(shape=(20, 20, 20))
+        accumulate_ensemble(runge, starts, 200, grid)
+        expected = DensityGrid(shape=(20, 20, 20))
+        for start in starts:
+            expected.add(runge.integrate(start, 200))
+        np.testing.assert_array_equal(grid.counts, expected.counts)
+
+    def test_parallel(self):
+        starts = [(1, 1, 1), (2, 2, 2)]
+        grid = parallel_density('Taylor', solver_params={'order': 10}, initial_points=starts, n_steps=500,
+                                transient=0, shape=(10, 10, 10), processes=2)
+        expected = DensityGrid(shape=(10, 10, 10))
+        for start in starts:
+            expected.add(self.integrator.integrate(start, 500))
+        np.testing.assert_array_equal(grid.counts, expected.counts)
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'density.npy')
+            main([path, '--steps', '300', '--transient', '0', '--trajectories', '2', '--processes', '1',
+                  '--shape', '5', '6', '7', '--order', '10'])
+            grid = DensityGrid.load(path)
+        self.assertEqual(grid.shape, (5, 6, 7))
+        self.assertEqual(grid.total, 600)
@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+import numpy as np
+
+from events import Event, detect_events, lorenz_map, maxima, plane
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th
+
+
+def collect(stream):
+    """concatenates streamed event records"""
+    parts = list(stream)
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+
+class TestEvents(TestCase):
+    def setUp(self):
+        self.taylor = TaylorIntegrator(LorenzEquation())
+        self.taylor.set_solver_params({'order': 20, 'time step': 0.01})
+
+    def test_plane_crossings(self):
+        times, states, directions = collect(detect_events(self.taylor, (1, 1, 1), 2000, plane(2, 27.0)))
+        np.testing.assert_allclose(states[:, 2], 27.0, atol=1e-12)
+        self.assertTrue(np.all(np.diff(times) > 0))
+        np.testing.assert_array_equal(directions[1:], -directions[:-1])
+        # state of event is the state of trajectory at event time
+        fine = TaylorIntegrator(LorenzEquation())
+        fine.set_solver_params({'order': 20, 'time step': times[0] / 100})
+        np.testing.assert_allclose(fine.integrate((1, 1, 1), 100)[-1], states[0], atol=1e-10)
+
+    def test_direction_and_chunks(self):
+        upward = collect(detect_events(self.taylor, (1, 1, 1), 2000, plane(2, 27.0, 1), chunk_size=37))
+        both = collect(detect_events(self.taylor, (1, 1, 1), 2000, plane(2, 27.0)))
+        np.testing.assert_array_equal(upward[0], both[0][both[2] == 1])
+        self.assertTrue(np.all(upward[2] == 1))
+
+    def test_runge_kutta_hermite(self):
+        runge = RungeKutta4th(LorenzEquation())
+        runge.set_solver_params({'time step': 0.001})
+        expected, _, _ = collect(detect_events(self.taylor, (1, 1, 1), 500, plane(0, 0.5)))
+        times, states, _ = collect(detect_events(runge, (1, 1, 1), 5000, plane(0, 0.5)))
+        np.testing.assert_allclose(states[:, 0], 0.5, atol=1e-12)
+        np.testing.assert_allclose(times, expected, atol=1e-8)
+
+    def test_maxima(self):
+        values = lorenz_map(self.taylor, (1, 1, 1), 2000, chunk_size=100)
+        times, states, _ = collect(detect_events(self.taylor, (1, 1, 1), 2000, maxima(2)))
+        np.testing.assert_array_equal(values, states[:, 2])
+        np.testing.assert_allclose(LorenzEquation().eval_batch(states)[:, 2], 0.0, atol=1e-9)
+        trajectory = self.taylor.integrate((1, 1, 1), 2000)
+        # maxima of the polynomial are above all computed points around them
+        for time, value in zip(times, values):
+            step = int(time / 0.01)
+            self.assertGreaterEqual(value, np.max(trajectory[max(step - 2, 0):step + 1, 2]) - 1e-12)
+
+    def test_no_events(self):
+        self.assertEqual(list(detect_events(self.taylor, (1, 1, 1), 100, Event(2, 1000.0))), [])
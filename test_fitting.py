@@ -0,0 +1,89 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from batch import make_integrator
+from fitting import fit, linearize, solve_block_tridiagonal, main, PARAM_NAMES
+from integrators import LorenzEquation, RungeKutta4th
+
+
+def observed(n_samples, params=None, transient=500):
+    integrator = RungeKutta4th(LorenzEquation(**(params or {})))
+    integrator.set_solver_params({'time step': 0.01})
+    return integrator.integrate(np.array([1.0, 1.0, 1.0]), transient + n_samples)[transient:]
+
+
+class TestBlockTridiagonal(TestCase):
+    def test_matches_dense_solve(self):
+        generator = np.random.default_rng(0)
+        for size in (1, 2, 3, 4, 7, 16):
+            lower, upper = generator.normal(size=(2, size, 3, 3))
+            diagonal = generator.normal(size=(size, 3, 3)) + 6 * np.eye(3)
+            right = generator.normal(size=(size, 3, 4))
+            dense = np.zeros((3 * size, 3 * size))
+            for i in range(size):
+                dense[3 * i:3 * i + 3, 3 * i:3 * i + 3] = diagonal[i]
+                if i > 0:
+                    dense[3 * i:3 * i + 3, 3 * i - 3:3 * i] = lower[i]
+                if i < size - 1:
+                    dense[3 * i:3 * i + 3, 3 * i + 3:3 * i + 6] = upper[i]
+            result = solve_block_tridiagonal(lower, diagonal, upper, right)
+            np.testing.assert_allclose(result.reshape(3 * size, 4), np.linalg.solve(dense, right.reshape(-1, 4)),
+                                       atol=1e-12)
+
+
+class TestFitting(TestCase):
+    def test_gradient_matches_finite_differences(self):
+        samples = observed(201)
+        nodes = samples[:-1:20] + 0.1
+        values = np.array([9.0, 27.0, 2.5])
+
+        def system(values, nodes, name='Runge-Kutta', solver_params=None):
+            integrator = make_integrator(name, dict(zip(PARAM_NAMES, values)), solver_params or {'time step': 0.005})
+            return linearize(integrator, samples, nodes, 20, 2, 2.0)
+
+        for name, solver_params in (('Runge-Kutta', {'time step': 0.005}), ('Taylor', {'time step': 0.005})):
+            exact = system(values, nodes, name, solver_params)
+            for i, shift in enumerate(1e-6 * np.eye(3)):
+                difference = (system(values + shift, nodes, name, solver_params).cost
+                              - system(values - shift, nodes, name, solver_params).cost) / 4e-6
+                self.assertAlmostEqual(exact.param_gradient[i], difference, delta=1e-6 * abs(difference))
+            shift = np.zeros_like(nodes)
+            shift[4, 2] = 1e-6
+            difference = (system(values, nodes + shift, name, solver_params).cost
+                          - system(values, nodes - shift, name, solver_params).cost) / 4e-6
+            self.assertAlmostEqual(exact.node_gradient[4, 2], difference, delta=1e-6 * abs(difference))
+
+    def test_recovers_params(self):
+        params = {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3}
+        result = fit(observed(2001), 0.01, {'sigma': 8.0, 'rho': 25.0, 'beta': 2.0})
+        self.assertTrue(result.converged)
+        for name in PARAM_NAMES:
+            self.assertAlmostEqual(result.params[name], params[name], places=8)
+        self.assertLess(result.rms, 1e-9)
+        self.assertLess(result.gap, 1e-9)
+        self.assertEqual(result.nodes.shape, (40, 3))
+        self.assertLess(result.history[-1], 1e-12 * result.history[0])
+
+    def test_noisy_samples(self):
+        params = {'sigma': 12.0, 'rho': 35.0, 'beta': 3.0}
+        samples = observed(4001, params) + np.random.default_rng(1).normal(scale=0.05, size=(4001, 3))
+        result = fit(samples, 0.01, integrator='Taylor', solver_params={'order': 8}, length=25)
+        self.assertTrue(result.converged)
+        for name in PARAM_NAMES:
+            self.assertLess(abs(result.params[name] - params[name]), 5 * result.errors[name])
+            self.assertLess(result.errors[name], 0.01 * params[name])
+        self.assertAlmostEqual(result.rms, 0.05, delta=0.01)
+        report = result.report()
+        self.assertEqual(report['segments'], 160)
+        self.assertEqual(report['iterations'], result.iterations)
+        self.assertGreater(report['fit time'], 0)
+
+    def test_main(self):
+        samples = observed(501)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'observed.npy')
+            np.save(path, np.column_stack([0.01 * np.arange(501), samples]))
+            main([path, '--segment', '25', '--sigma', '9', '--rho', '27'])
@@ -1,46 +1,257 @@
 from unittest import TestCase
 
+import numpy as np
+
+from integrators import (LorenzEquation, TaylorIntegrator, RungeKutta4th,
+                         DenseSegment, DormandPrince54, AdaptiveTaylorIntegrator)
+
+
+def ensemble(size=50, seed=0):
+    """random cloud of points around the attractor"""
+    rng = np.random.default_rng(seed)
+    return rng.uniform((-20, -25, 5), (20, 25, 45), size=(size, 3))
+
+
+def reference_solution(t_end=2.0, samples=21):
+    """trajectory from (1, 1, 1) with small step high order Taylor method"""
+    integrator = TaylorIntegrator(LorenzEquation())
+    integrator.set_solver_params({'order': 20, 'time step': 0.001})
+    steps = int(round(t_end / 0.001))
+    trajectory = np.vstack([[1.0, 1.0, 1.0], integrator.integrate((1, 1, 1), steps)])
+    every = steps // (samples - 1)
+    return np.linspace(0, t_end, samples), trajectory[::every]
+
+
+class TestReference(TestCase):
+    def test_reference_agrees_with_runge_kutta(self):
+        _, expected = reference_solution(t_end=1.0, samples=2)
+        integrator = RungeKutta4th(LorenzEquation())
+        integrator.set_solver_params({'time step': 0.0002})
+        np.testing.assert_allclose(integrator.integrate((1, 1, 1), 5000)[-1], expected[-1], atol=1e-9)
+
 
 class TestLorenzEquation(TestCase):
     def test_eval(self):
-        self.fail()
+        lorenz = LorenzEquation(sigma=2.0, rho=3.0, beta=4.0)
+        np.testing.assert_allclose(lorenz.eval((1.0, 2.0, 5.0)), [2.0, -4.0, -18.0])
+        np.testing.assert_allclose(LorenzEquation().eval(np.zeros(3)), np.zeros(3))
+
+    def test_eval_batch(self):
+        lorenz = LorenzEquation()
+        points = ensemble()
+        expected = np.array([lorenz.eval(point) for point in points])
+        np.testing.assert_allclose(lorenz.eval_batch(points), expected)
+
+    def test_eval_batch_params_per_point(self):
+        points = ensemble(4)
+        rhos = np.array([0.5, 14.0, 28.0, 99.0])
+        batch = LorenzEquation()
+        batch.set_params({'sigma': 10.0, 'rho': rhos, 'beta': 8 / 3})
+        expected = np.array([LorenzEquation(rho=rho).eval(point) for rho, point in zip(rhos, points)])
+        np.testing.assert_allclose(batch.eval_batch(points), expected)
 
     def test_get_params(self):
-        self.fail()
+        self.assertEqual(LorenzEquation(1, 2, 3).get_params(), {'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
 
     def test_set_params(self):
-        self.fail()
+        lorenz = LorenzEquation()
+        lorenz.set_params({'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
+        self.assertEqual(lorenz.get_params(), {'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
+        np.testing.assert_allclose(lorenz.eval((1.0, 1.0, 1.0)), [0.0, 0.0, -2.0])
 
 
 class TestTaylorIntegrator(TestCase):
     def test_step(self):
-        self.fail()
+        _, expected = reference_solution(samples=2)
+        integrator = TaylorIntegrator(LorenzEquation())
+        integrator.set_solver_params({'order': 12, 'time step': 0.01})
+        point = np.array([1.0, 1.0, 1.0])
+        for _ in range(200):
+            point = integrator.step(point)
+        np.testing.assert_allclose(point, expected[-1], atol=1e-8)
+
+    def test_convergence_order(self):
+        _, expected = reference_solution(t_end=0.5, samples=2)
+        integrator = TaylorIntegrator(LorenzEquation())
+        for order in (3, 4, 5):
+            errors = []
+            for time_step in (0.01, 0.005):
+                integrator.set_solver_params({'order': order, 'time step': time_step})
+                point = integrator.integrate((1, 1, 1), int(round(0.5 / time_step)))[-1]
+                errors.append(np.max(np.abs(point - expected[-1])))
+            # polynomial of order - 1 degree, global error of that order
+            self.assertAlmostEqual(np.log2(errors[0] / errors[1]), order - 1, delta=0.3)
+
+    def test_coefficients(self):
+        integrator = TaylorIntegrator(LorenzEquation())
+        integrator.set_solver_params({'order': 5, 'time step': 0.01})
+        coefficients = integrator.coefficients((1.0, 2.0, 3.0))
+        self.assertEqual(coefficients.shape, (3, 5))
+        np.testing.assert_allclose(coefficients[:, 0], [1.0, 2.0, 3.0])
+        np.testing.assert_allclose(coefficients[:, 1], integrator.lorenz.eval((1.0, 2.0, 3.0)))
+
+    def test_step_batch(self):
+        integrator = TaylorIntegrator(LorenzEquation())
+        points = ensemble()
+        for order in (1, 2, 4, 7, 20):
+            integrator.set_solver_params({'order': order, 'time step': 0.01})
+            expected = np.array([integrator.step(point) for point in points])
+            np.testing.assert_allclose(integrator.step_batch(points), expected, rtol=1e-12, atol=1e-12)
+
+    def test_integrate(self):
+        integrator = TaylorIntegrator(LorenzEquation())
+        for order in (1, 2, 4, 13, 30):
+            integrator.set_solver_params({'order': order, 'time step': 0.01})
+            point = np.array([1.0, 1.0, 1.0])
+            expected = []
+            for _ in range(200):
+                point = integrator.step(point)
+                expected.append(point)
+            np.testing.assert_allclose(integrator.integrate((1, 1, 1), 200), expected, rtol=1e-10, atol=1e-10)
+
+    def test_integrate_into_out(self):
+        integrator = TaylorIntegrator(LorenzEquation())
+        out = np.zeros((10, 3))
+        result = integrator.integrate((1, 1, 1), 10, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out[0], integrator.step((1, 1, 1)))
 
     def test_get_lorenz_params(self):
-        self.fail()
+        integrator = TaylorIntegrator(LorenzEquation(1, 2, 3))
+        self.assertEqual(integrator.get_lorenz_params(), {'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
 
     def test_set_lorenz_params(self):
-        self.fail()
+        lorenz = LorenzEquation()
+        integrator = TaylorIntegrator(lorenz)
+        integrator.set_lorenz_params({'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
+        self.assertEqual(lorenz.get_params(), {'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
 
     def test_get_solver_params(self):
-        self.fail()
+        self.assertEqual(TaylorIntegrator(LorenzEquation()).get_solver_params(), {'order': 4, 'time step': 0.01})
 
     def test_set_solver_params(self):
-        self.fail()
+        integrator = TaylorIntegrator(LorenzEquation())
+        integrator.set_solver_params({'order': 7.0, 'time step': 0.5})
+        self.assertEqual(integrator.get_solver_params(), {'order': 7, 'time step': 0.5})
+        self.assertIsInstance(integrator.get_solver_params()['order'], int)
 
 
 class TestRungeKutta4th(TestCase):
     def test_step(self):
-        self.fail()
+        _, expected = reference_solution(samples=2)
+        integrator = RungeKutta4th(LorenzEquation())
+        integrator.set_solver_params({'time step': 0.001})
+        point = np.array([1.0, 1.0, 1.0])
+        for _ in range(2000):
+            point = integrator.step(point)
+        np.testing.assert_allclose(point, expected[-1], atol=1e-7)
+
+    def test_convergence_order(self):
+        _, expected = reference_solution(t_end=0.5, samples=2)
+        integrator = RungeKutta4th(LorenzEquation())
+        errors = []
+        for time_step in (0.01, 0.005):
+            integrator.set_solver_params({'time step': time_step})
+            errors.append(np.max(np.abs(integrator.integrate((1, 1, 1), int(round(0.5 / time_step)))[-1]
+                                        - expected[-1])))
+        self.assertAlmostEqual(np.log2(errors[0] / errors[1]), 4, delta=0.3)
+
+    def test_step_batch(self):
+        integrator = RungeKutta4th(LorenzEquation())
+        points = ensemble()
+        expected = np.array([integrator.step(point) for point in points])
+        np.testing.assert_allclose(integrator.step_batch(points), expected, rtol=1e-12, atol=1e-12)
+
+    def test_integrate(self):
+        integrator = RungeKutta4th(LorenzEquation())
+        point = np.array([1.0, 1.0, 1.0])
+        expected = []
+        for _ in range(300):
+            point = integrator.step(point)
+            expected.append(point)
+        np.testing.assert_allclose(integrator.integrate((1, 1, 1), 300), expected, rtol=1e-12, atol=1e-12)
 
     def test_get_lorenz_params(self):
-        self.fail()
+        integrator = RungeKutta4th(LorenzEquation(1, 2, 3))
+        self.assertEqual(integrator.get_lorenz_params(), {'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
 
     def test_set_lorenz_params(self):
-        self.fail()
+        lorenz = LorenzEquation()
+        integrator = RungeKutta4th(lorenz)
+        integrator.set_lorenz_params({'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
+        self.assertEqual(lorenz.get_params(), {'sigma': 1.0, 'rho': 2.0, 'beta': 3.0})
 
     def test_get_solver_params(self):
-        self.fail()
+        self.assertEqual(RungeKutta4th(LorenzEquation()).get_solver_params(), {'time step': 0.01})
+
+    def test_set_solver_params(self):
+        integrator = RungeKutta4th(LorenzEquation())
+        integrator.set_solver_params({'time step': 0.5, 'order': 3})
+        self.assertEqual(integrator.get_solver_params(), {'time step': 0.5})
+
+
+class TestDenseSegment(TestCase):
+    def test_call(self):
+        segment = DenseSegment(1.0, 0.5, np.array([[1.0, 2.0], [0.0, 1.0], [3.0, 0.0]]))
+        self.assertEqual(segment.t_end, 1.5)
+        np.testing.assert_allclose(segment(1.25), [2.0, 0.5, 3.0])
+        np.testing.assert_allclose(segment(np.array([1.0, 1.5])), [[1.0, 0.0, 3.0], [3.0, 1.0, 3.0]])
+
+
+class TestDormandPrince54(TestCase):
+    def test_solve(self):
+        times, expected = reference_solution()
+        integrator = DormandPrince54(LorenzEquation())
+        integrator.set_solver_params({'time step': 0.01, 'rtol': 1e-9, 'atol': 1e-12})
+        steps, points = integrator.solve((1, 1, 1), 2.0)
+        self.assertEqual(steps[-1], 2.0)
+        np.testing.assert_allclose(points[-1], expected[-1], atol=1e-6)
+
+    def test_dense_output(self):
+        times, expected = reference_solution()
+        integrator = DormandPrince54(LorenzEquation())
+        integrator.set_solver_params({'time step': 0.01, 'rtol': 1e-9, 'atol': 1e-12})
+        _, points = integrator.solve((1, 1, 1), 2.0, t_eval=times)
+        np.testing.assert_allclose(points, expected, atol=1e-5)
+
+    def test_fewer_evaluations_than_rk4(self):
+        _, expected = reference_solution()
+        integrator = DormandPrince54(LorenzEquation())
+        integrator.set_solver_params({'time step': 0.01, 'rtol': 1e-7, 'atol': 1e-10})
+        _, points = integrator.solve((1, 1, 1), 2.0)
+        error = np.max(np.abs(points[-1] - expected[-1]))
+        runge = RungeKutta4th(LorenzEquation())
+        runge.set_solver_params({'time step': 2.0 / (integrator.statistics['rhs evaluations'] / 4)})
+        point = np.array([1.0, 1.0, 1.0])
+        for _ in range(integrator.statistics['rhs evaluations'] // 4):
+            point = runge.step(point)
+        self.assertLess(error, np.max(np.abs(point - expected[-1])))
+
+    def test_step_adapts(self):
+        integrator = DormandPrince54(LorenzEquation())
+        point = integrator.step((1, 1, 1))
+        self.assertNotEqual(integrator.get_solver_params()['time step'], 0.01)
+        self.assertAlmostEqual(integrator.time, integrator.last_segment.t_end)
+        np.testing.assert_allclose(integrator.last_segment(integrator.time), point, atol=1e-14)
+
+
+class TestAdaptiveTaylorIntegrator(TestCase):
+    def test_solve(self):
+        times, expected = reference_solution()
+        integrator = AdaptiveTaylorIntegrator(LorenzEquation())
+        steps, points = integrator.solve((1, 1, 1), 2.0)
+        self.assertLess(len(steps), 100)
+        np.testing.assert_allclose(points[-1], expected[-1], atol=1e-9)
+
+    def test_dense_output(self):
+        times, expected = reference_solution()
+        integrator = AdaptiveTaylorIntegrator(LorenzEquation())
+        _, points = integrator.solve((1, 1, 1), 2.0, t_eval=times)
+        np.testing.assert_allclose(points, expected, atol=1e-9)
 
     def test_set_solver_params(self):
-        self.fail()
+        integrator = AdaptiveTaylorIntegrator(LorenzEquation())
+        integrator.set_solver_params({'order': 12.0, 'tolerance': 1e-8, 'max step': 0.05})
+        self.assertEqual(integrator.get_solver_params(), {'order': 12, 'tolerance': 1e-8, 'max step': 0.05})
+        integrator.step((1, 1, 1))
+        self.assertLessEqual(integrator.last_segment.time_step, 0.05)
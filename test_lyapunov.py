@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+import numpy as np
+
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th
+from lyapunov import (lyapunov_spectrum, maximal_exponent_map, tangent_eval, runge_kutta_tangent_step,
+                      taylor_tangent_step)
+
+
+def taylor():
+    integrator = TaylorIntegrator(LorenzEquation())
+    integrator.set_solver_params({'order': 10, 'time step': 0.01})
+    return integrator
+
+
+class TestTangentEquations(TestCase):
+    def test_tangent_eval_is_jacobian(self):
+        lorenz = LorenzEquation()
+        point = np.array([[3.0, -2.0, 20.0]])
+        jacobian = np.array([[(lorenz.eval(point[0] + 1e-6 * e) - lorenz.eval(point[0] - 1e-6 * e)) / 2e-6
+                              for e in np.eye(3)]]).transpose(0, 2, 1)
+        np.testing.assert_allclose(tangent_eval(lorenz, point, np.eye(3)[None]), jacobian, atol=1e-6)
+
+    def test_steps_match_finite_differences(self):
+        point = np.array([[3.0, -2.0, 20.0]])
+        for integrator, step in ((taylor(), taylor_tangent_step),
+                                 (RungeKutta4th(LorenzEquation()), runge_kutta_tangent_step)):
+            new_point, tangents = step(integrator, point, np.eye(3)[None])
+            np.testing.assert_allclose(new_point, integrator.step_batch(point), rtol=1e-12)
+            difference = np.array([(integrator.step(point[0] + 1e-6 * e) - integrator.step(point[0] - 1e-6 * e)) / 2e-6
+                                   for e in np.eye(3)]).T
+            np.testing.assert_allclose(tangents[0], difference, atol=1e-6)
+
+
+class TestLyapunovSpectrum(TestCase):
+    def test_classic_lorenz(self):
+        result = lyapunov_spectrum(taylor(), (1, 1, 1), 8000, transient=500)
+        self.assertAlmostEqual(result.exponents.sum(), -(10 + 1 + 8 / 3), places=5)
+        np.testing.assert_allclose(result.exponents[0], [0.9, 0.0, -14.57], atol=0.15)
+        self.assertEqual(result.history.shape, (800, 1, 3))
+
+    def test_batched_params(self):
+        integrator = RungeKutta4th(LorenzEquation())
+        integrator.set_lorenz_params({'sigma': 10.0, 'rho': np.array([0.5, 28.0]), 'beta': 8 / 3})
+        result = lyapunov_spectrum(integrator, (1, 1, 1), 5000, transient=500)
+        self.assertLess(result.maximal[0], 0)
+        self.assertGreater(result.maximal[1], 0.5)
+
+    def test_maximal_exponent_map(self):
+        exponents = maximal_exponent_map(RungeKutta4th(LorenzEquation()), [10.0], [0.5, 28.0],
+                                         n_steps=3000, transient=300)
+        self.assertEqual(exponents.shape, (2, 1))
+        self.assertLess(exponents[0, 0], 0)
+        self.assertGreater(exponents[1, 0], 0.5)
@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+
+import numpy as np
+from matplotlib.image import imread
+
+from integrators import LorenzEquation, TaylorIntegrator
+from offline import FRAME_NAME, frame_ends, render, main
+
+
+class TestFrameEnds(TestCase):
+    def test_frame_ends(self):
+        np.testing.assert_array_equal(frame_ends(11, 5), [1, 6, 11])
+        np.testing.assert_array_equal(frame_ends(12, 5), [1, 6, 11, 12])
+        np.testing.assert_array_equal(frame_ends(1, 5), [1])
+        np.testing.assert_array_equal(frame_ends(4, 1), [1, 2, 3, 4])
+
+
+class TestRender(TestCase):
+    def setUp(self):
+        start = np.array([1.0, 1.0, 1.0])
+        self.points = np.vstack([start, TaylorIntegrator(LorenzEquation()).integrate(start, 95)])
+
+    def test_frames(self):
+        for processes in (1, 2):
+            with tempfile.TemporaryDirectory() as directory:
+                n_frames = render(self.points, directory, steps_per_frame=10, processes=processes,
+                                  size=(2, 1.5), dpi=50, rotation=1.0)
+                self.assertEqual(n_frames, 11)
+                self.assertEqual(sorted(os.listdir(directory)), [FRAME_NAME.format(i) for i in range(11)])
+                self.assertEqual(imread(os.path.join(directory, FRAME_NAME.format(10))).shape[:2], (75, 100))
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            main([directory, '--steps', '20', '--steps-per-frame', '5', '--processes', '1', '--dpi', '20'])
+            self.assertEqual(len(os.listdir(directory)), 5)
+
+    @skipIf(shutil.which('ffmpeg') is None, "ffmpeg is not installed")
+    def test_video(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'lorenz.mp4')
+            render(self.points, output, processes=1, size=(2, 1.5), dpi=50)
+            self.assertGreater(os.path.getsize(output), 0)
+            self.assertEqual(os.listdir(directory), ['lorenz.mp4'])
+
+    @skipIf(shutil.which('ffmpeg') is not None, "ffmpeg is installed")
+    def test_video_needs_ffmpeg(self):
+        with self.assertRaises(AssertionError):
+            render(self.points, 'lorenz.mp4', processes=1)
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th
+from parareal import parareal, main
+
+
+class TestParareal(TestCase):
+    def setUp(self):
+        self.start = np.array([1.0, 1.0, 1.0])
+
+    def serial(self, integrator, n_steps):
+        return np.vstack([self.start, integrator.integrate(self.start, n_steps)])
+
+    def test_exact_iterations(self):
+        expected = self.serial(TaylorIntegrator(LorenzEquation()), 8 * 40)
+        for processes in (1, 2):
+            result = parareal(self.start, 8, 40, tolerance=0, processes=processes)
+            np.testing.assert_array_equal(result.points, expected)
+            self.assertLessEqual(result.iterations, 8)
+
+    def test_convergence(self):
+        expected = self.serial(TaylorIntegrator(LorenzEquation()), 16 * 50)
+        result = parareal(self.start, 16, 50, coarse_steps=25, tolerance=1e-10, processes=2)
+        self.assertLess(result.iterations, 8)
+        self.assertLessEqual(result.corrections[-1], 1e-10)
+        np.testing.assert_allclose(result.points, expected, rtol=0, atol=1e-7)
+        report = result.report()
+        self.assertEqual(report['iterations'], result.iterations)
+        self.assertAlmostEqual(report['bound'], 16 / result.iterations)
+        self.assertGreater(report['fine time'], 0)
+
+    def test_integrators(self):
+        params = {'sigma': 10.0, 'rho': 24.0, 'beta': 2.0}
+        expected = self.serial(RungeKutta4th(LorenzEquation(**params)), 4 * 50)
+        result = parareal(self.start, 4, 50, params, fine='Runge-Kutta', coarse='Runge-Kutta', coarse_steps=10,
+                          tolerance=0, processes=1)
+        np.testing.assert_array_equal(result.points, expected)
+        with self.assertRaises(AssertionError):
+            parareal(self.start, 4, 50, fine='Dormand-Prince', processes=1)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'out.npy')
+            main([path, '--slices', '4', '--steps-per-slice', '20', '--processes', '1'])
+            self.assertEqual(np.load(path).shape, (81, 3))
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th, DormandPrince54
+from profiling import BIN_EDGES, Profiler, RollingHistogram, sparkline, _cauchy_terms
+
+
+class TestCauchyTerms(TestCase):
+    def test_small_orders(self):
+        # order 3: x1 * z0 + x0 * z1 and x1 * y0 + x0 * y1
+        self.assertEqual(_cauchy_terms(3), 4)
+        # order 4 adds x2 * z0 + x1 * z1 + x0 * z2 and the same with y
+        self.assertEqual(_cauchy_terms(4), 10)
+        self.assertEqual(_cauchy_terms(2), 0)
+        self.assertEqual(_cauchy_terms(1), 0)
+
+
+class TestRollingHistogram(TestCase):
+    def test_keeps_recent_values(self):
+        histogram = RollingHistogram(size=4)
+        for value in (1.0, 2.0, 3.0, 4.0, 5.0, 6.0):
+            histogram.add(value * 1e-3)
+        self.assertEqual(histogram.count, 6)
+        self.assertAlmostEqual(histogram.total, 21e-3)
+        self.assertEqual(sorted(histogram.recent()), [3e-3, 4e-3, 5e-3, 6e-3])
+        self.assertAlmostEqual(histogram.summary()['max'], 6e-3)
+        self.assertEqual(histogram.histogram().sum(), 4)
+        self.assertEqual(len(histogram.histogram()), len(BIN_EDGES) - 1)
+
+    def test_sparkline(self):
+        self.assertEqual(sparkline(np.array([0, 4, 8])), " ▄█")
+
+
+class TestProfiler(TestCase):
+    def setUp(self):
+        self.equation = LorenzEquation()
+        self.integrators = {'Taylor': TaylorIntegrator(self.equation), 'Runge-Kutta': RungeKutta4th(self.equation),
+                            'Dormand-Prince': DormandPrince54(self.equation)}
+        self.profiler = Profiler()
+        self.profiler.instrument_integrators(self.integrators)
+
+    def test_counters_and_timers(self):
+        self.integrators['Taylor'].integrate((1, 1, 1), 100)
+        self.integrators['Taylor'].step((1, 1, 1))
+        self.integrators['Runge-Kutta'].integrate((1, 1, 1), 10)
+        self.integrators['Runge-Kutta'].step((1, 1, 1))
+        counters = self.profiler.counters
+        self.assertEqual(counters['steps'], 112)
+        # 40 inlined in integrate, 4 through eval in step, 1 in Taylor coefficients
+        self.assertEqual(counters['rhs evaluations'], 45)
+        self.assertEqual(counters['cauchy terms'], 101 * 10)
+        self.assertEqual(self.profiler.timers['Taylor integrate'].count, 1)
+        self.assertEqual(self.profiler.timers['rhs eval'].count, 5)
+
+    def test_adaptive(self):
+        solver = self.integrators['Dormand-Prince']
+        solver.integrate((1, 1, 1), 20)
+        self.assertEqual(self.profiler.counters['steps'], 20)
+        self.assertEqual(self.profiler.counters['rhs evaluations'], solver.statistics['rhs evaluations'])
+        self.assertEqual(self.profiler.timers['Dormand-Prince adaptive step'].count, 20)
+
+    def test_restore(self):
+        self.profiler.restore()
+        for integrator in self.integrators.values():
+            self.assertNotIn('integrate', vars(integrator))
+        self.assertNotIn('eval', vars(self.equation))
+        self.integrators['Taylor'].integrate((1, 1, 1), 10)
+        self.assertEqual(self.profiler.counters['steps'], 0)
+
+    def test_exports(self):
+        self.integrators['Runge-Kutta'].integrate((1, 1, 1), 10)
+        with tempfile.TemporaryDirectory() as directory:
+            self.profiler.export_json(os.path.join(directory, 'stats.json'))
+            self.profiler.export_trace(os.path.join(directory, 'trace.json'))
+            with open(os.path.join(directory, 'stats.json')) as file:
+                stats = json.load(file)
+            with open(os.path.join(directory, 'trace.json')) as file:
+                trace = json.load(file)
+        self.assertEqual(stats['counters']['steps'], 10)
+        self.assertEqual(stats['timers']['Runge-Kutta integrate']['count'], 1)
+        self.assertEqual([event['name'] for event in trace['traceEvents']], ['Runge-Kutta integrate'])
+        self.assertIn('Runge-Kutta integrate', self.profiler.report())
@@ -0,0 +1,122 @@
+from unittest import TestCase
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from integrators import LorenzEquation, RungeKutta4th
+from rendering import LevelOfDetailRenderer, BlitAnimation, simplify, screen_coordinates
+from trajectory import TrajectoryBuffer
+
+
+def axes3d():
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(111, projection='3d')
+    axes.set_xlim3d(-25, 25)
+    axes.set_ylim3d(-25, 25)
+    axes.set_zlim3d(0, 50)
+    return axes
+
+
+def trajectory(n_points):
+    buffer = TrajectoryBuffer()
+    buffer.extend(RungeKutta4th(LorenzEquation()).integrate((1, 1, 1), n_points))
+    return buffer
+
+
+class TestSimplify(TestCase):
+    def test_drops_points_in_same_cell(self):
+        screen = np.array([[0.1, 0.1], [0.5, 0.2], [1.5, 0.2], [1.6, 0.9], [3.0, 3.0], [3.1, 3.1]])
+        np.testing.assert_array_equal(simplify(screen, 10), [0, 2, 4, 5])
+
+    def test_budget(self):
+        screen = np.cumsum(np.random.default_rng(0).normal(size=(10000, 2)), axis=0)
+        indices = simplify(screen, 500)
+        self.assertLessEqual(len(indices), 500)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 9999)
+
+    def test_short(self):
+        np.testing.assert_array_equal(simplify(np.zeros((1, 2)), 10), [0])
+
+
+class TestLevelOfDetailRenderer(TestCase):
+    def test_screen_coordinates_inside_axes(self):
+        axes = axes3d()
+        screen = screen_coordinates(axes, trajectory(1000).view())
+        box = axes.bbox
+        self.assertTrue(np.all((screen[:, 0] > box.x0) & (screen[:, 0] < box.x1)))
+        self.assertTrue(np.all((screen[:, 1] > box.y0) & (screen[:, 1] < box.y1)))
+
+    def test_history_and_tail(self):
+        renderer = LevelOfDetailRenderer(axes3d(), budget=300, tail_length=50)
+        points = trajectory(5000)
+        self.assertTrue(renderer.update(points))
+        self.assertLessEqual(len(renderer.history_line.get_xdata()), 300)
+        points.extend(RungeKutta4th(LorenzEquation()).integrate(points.last(), 30))
+        self.assertFalse(renderer.update(points))
+        np.testing.assert_array_equal(renderer.tail_line.get_xdata(), points.view()[-31:, 0])
+        points.extend(RungeKutta4th(LorenzEquation()).integrate(points.last(), 30))
+        self.assertTrue(renderer.update(points))
+        renderer.invalidate()
+        self.assertTrue(renderer.update(points))
+
+    def test_reset_trajectory_refolds(self):
+        renderer = LevelOfDetailRenderer(axes3d(), budget=300)
+        points = trajectory(1000)
+        renderer.update(points)
+        points.reset([(1, 1, 1)])
+        self.assertTrue(renderer.update(points))
+        points.reset(trajectory(2000).view()[::-1])
+        self.assertTrue(renderer.update(points))
+        np.testing.assert_array_equal(renderer.history[0], points.view()[0])
+
+    def test_fold_keeps_history(self):
+        renderer = LevelOfDetailRenderer(axes3d(), budget=3000, tail_length=50)
+        points = trajectory(2000)
+        renderer.update(points)
+        history = renderer.history.copy()
+        points.extend(RungeKutta4th(LorenzEquation()).integrate(points.last(), 60))
+        self.assertTrue(renderer.update(points))
+        # old history is not simplified again, the tail is appended on the same cells
+        np.testing.assert_array_equal(renderer.history[:len(history)], history)
+        np.testing.assert_array_equal(renderer.history[-1], points.last())
+        np.testing.assert_array_equal(renderer.history, points.view()[renderer.history_indices])
+        np.testing.assert_array_equal(renderer.history_line.get_xdata(), renderer.history[:, 0])
+
+    def test_folds_stay_in_budget(self):
+        renderer = LevelOfDetailRenderer(axes3d(), budget=200, tail_length=50)
+        points = TrajectoryBuffer(max_length=3000)
+        points.extend(trajectory(100).view())
+        integrator = RungeKutta4th(LorenzEquation())
+        for _ in range(100):
+            points.extend(integrator.integrate(points.last(), 60))
+            renderer.update(points)
+        first_index = points.count - len(points)
+        self.assertLessEqual(len(renderer.history), 200)
+        self.assertGreater(renderer.cell, 1.0)
+        self.assertTrue(np.all(renderer.history_indices >= first_index))
+        np.testing.assert_array_equal(renderer.history, points.view()[renderer.history_indices - first_index])
+
+
+class TestBlitAnimation(TestCase):
+    def test_frames(self):
+        axes = axes3d()
+        renderer = LevelOfDetailRenderer(axes, budget=300, tail_length=5)
+        points = trajectory(100)
+        integrator = RungeKutta4th(LorenzEquation())
+        frames = []
+
+        def frame(number):
+            frames.append(number)
+            points.append(integrator.step(points.last()))
+            return renderer.update(points)
+
+        animation = BlitAnimation(axes.figure, frame, 200, renderer.artists)
+        self.assertTrue(renderer.tail_line.get_animated())
+        axes.figure.canvas.draw()
+        self.assertIsNotNone(animation.background)
+        for _ in range(12):
+            animation._step()
+        self.assertEqual(frames, list(range(12)))
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from unittest import TestCase, mock
+
+import numpy as np
+
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th
+from loadtest import load_test
+import server
+from server import TrajectoryServer, fetch
+
+
+def serial(integrator, start, n_steps):
+    return np.vstack([start, integrator.integrate(start, n_steps)])
+
+
+class TestTrajectoryServer(TestCase):
+    def run_server(self, client, processes=1, chunk_size=100, max_rows=10 ** 6):
+        """runs client coroutine against server on loopback, returns its result and server statistics"""
+        async def session():
+            server = TrajectoryServer(processes, chunk_size, max_rows=max_rows)
+            port = await server.start()
+            try:
+                return await client(port), server.statistics
+            finally:
+                await server.close()
+                self.assertEqual(server.buffered, 0)
+        return asyncio.run(session())
+
+    def test_trajectory(self):
+        async def client(port):
+            return await asyncio.gather(
+                fetch('127.0.0.1', port, 1000, start=(1.0, 2.0, 3.0)),
+                fetch('127.0.0.1', port, 250, 'runge-kutta', {'sigma': 10.0, 'rho': 24.0, 'beta': 2.0},
+                      {'time step': 0.005}))
+        for processes in (1, 2):
+            ((taylor, header), (runge, _)), statistics = self.run_server(client, processes)
+            self.assertEqual(header, {'rows': 1001, 'shared': False})
+            np.testing.assert_array_equal(taylor, serial(TaylorIntegrator(LorenzEquation()), (1.0, 2.0, 3.0), 1000))
+            integrator = RungeKutta4th(LorenzEquation(10.0, 24.0, 2.0))
+            integrator.set_solver_params({'time step': 0.005})
+            np.testing.assert_array_equal(runge, serial(integrator, (1.0, 1.0, 1.0), 250))
+            self.assertEqual(statistics['jobs'], 2)
+
+    def test_deduplication(self):
+        async def client(port):
+            return await asyncio.gather(*[fetch('127.0.0.1', port, n_steps) for n_steps in (1000, 1000, 999, 10)])
+        results, statistics = self.run_server(client)
+        expected = serial(TaylorIntegrator(LorenzEquation()), (1.0, 1.0, 1.0), 1000)
+        self.assertEqual([header['shared'] for _, header in results], [False, True, True, True])
+        for points, _ in results:
+            np.testing.assert_array_equal(points, expected[:len(points)])
+        self.assertEqual((statistics['requests'], statistics['jobs'], statistics['shared']), (4, 1, 3))
+
+    def test_errors(self):
+        async def client(port):
+            errors = []
+            for integrator, n_steps in (('euler', 10), ('dormand-prince', 10), ('taylor', 0)):
+                with self.assertRaises(ValueError) as context:
+                    await fetch('127.0.0.1', port, n_steps, integrator)
+                errors.append(str(context.exception))
+            return errors
+        errors, statistics = self.run_server(client)
+        self.assertIn('fixed step', errors[1])
+        self.assertEqual(statistics['errors'], 3)
+
+    def test_malformed_requests(self):
+        async def client(port):
+            answers = []
+            for line in (b'[1]\n', b'"steps"\n', b'{"steps": 100000000}\n', b'{"steps": 10, "start": [1, 2]}\n'):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(line)
+                await writer.drain()
+                answers.append(json.loads(await reader.readline()))
+                writer.close()
+            return answers
+        answers, statistics = self.run_server(client)
+        self.assertIn('JSON object', answers[0]['error'])
+        self.assertIn('JSON object', answers[1]['error'])
+        self.assertIn('steps have to be', answers[2]['error'])
+        self.assertIn('one point', answers[3]['error'])
+        self.assertEqual(statistics['errors'], 4)
+
+    def test_buffered_rows_limit(self):
+        async def client(port):
+            # unread stream larger than socket buffers keeps its job and chunks alive
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(json.dumps({'steps': 100000}).encode() + b'\n')
+            await writer.drain()
+            header = json.loads(await reader.readline())
+            _, shared = await fetch('127.0.0.1', port, 50000)
+            with self.assertRaises(ValueError) as context:
+                await fetch('127.0.0.1', port, 100000, start=(2.0, 2.0, 2.0))
+            rest = await reader.read()
+            writer.close()
+            # chunks of finished job are freed, so the same request fits now
+            later, _ = await fetch('127.0.0.1', port, 100000, start=(2.0, 2.0, 2.0))
+            return header, shared, str(context.exception), len(rest), len(later)
+        (header, shared, error, rest, later), statistics = self.run_server(client, chunk_size=4096,
+                                                                           max_rows=150000)
+        self.assertEqual(header, {'rows': 100001, 'shared': False})
+        self.assertTrue(shared['shared'])
+        self.assertIn('no room', error)
+        self.assertGreater(rest, 100001 * 24)
+        self.assertEqual(later, 100001)
+        self.assertEqual((statistics['jobs'], statistics['shared'], statistics['errors']), (2, 1, 1))
+
+    def test_failed_computation(self):
+        async def client(port):
+            rows = []
+            with self.assertRaises(ValueError) as context:
+                await fetch('127.0.0.1', port, 1000, on_chunk=lambda first, size: rows.append(size))
+            return str(context.exception), rows
+        # the first chunk is computed, the second one fails
+        first_chunk = server._compute_chunk('taylor', {'sigma': 10.0, 'rho': 28.0, 'beta': 8 / 3}, {}, (1, 1, 1), 100)
+        with mock.patch('server._compute_chunk', side_effect=[first_chunk, RuntimeError("worker died")]):
+            (error, rows), _ = self.run_server(client)
+        self.assertIn("stream ended after 101 of 1001 rows", error)
+        self.assertIn("worker died", error)
+        self.assertEqual(rows, [101])
+
+    def test_load_test(self):
+        report = asyncio.run(load_test(clients=12, distinct=3, n_steps=500, chunk_size=100))
+        self.assertEqual(report['server']['jobs'], 3)
+        self.assertEqual(report['server']['shared'], 9)
+        self.assertLessEqual(report['first chunk p50'], report['completion max'])
+        self.assertGreater(report['rows per second'], 0)
@@ -0,0 +1,33 @@
+import copy
+from unittest import TestCase
+
+import startup
+
+
+class TestStartup(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = startup.run_benchmark(('integrators', 'main', 'app'), window=False, repeats=1)
+
+    def test_lazy_imports(self):
+        loaded = {row['name']: row['loaded'] for row in self.results['results'] if 'loaded' in row}
+        self.assertEqual(loaded['import integrators'], [])
+        self.assertEqual(loaded['import main'], [])
+        self.assertNotIn('matplotlib', loaded['import app'])
+
+    def test_first_frame(self):
+        row = self.results['results'][-1]
+        self.assertEqual(row['name'], 'first frame headless')
+        self.assertLess(row['imports'], row['window'])
+        self.assertLessEqual(row['window'], row['seconds'])
+        self.assertLess(row['seconds'], row['process'])
+
+    def test_compare(self):
+        baseline = copy.deepcopy(self.results)
+        self.assertEqual(startup.compare(self.results, baseline), [])
+        baseline['results'][0]['seconds'] /= 2
+        regressions = startup.compare(self.results, baseline, threshold=0.2)
+        self.assertEqual([row['name'] for row, _ in regressions], ['import integrators'])
+
+    def test_format_table(self):
+        self.assertEqual(len(startup.format_table(self.results).splitlines()), 5)
@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+import numpy as np
+
+from integrators import LorenzEquation, RungeKutta4th
+from sweep import ParameterSweep, parameter_grid, z_maxima
+
+
+class TestSweep(TestCase):
+    def test_parameter_grid(self):
+        grid = parameter_grid(rho=[1, 2], beta=[3])
+        self.assertEqual(grid, [{'sigma': 10.0, 'rho': 1.0, 'beta': 3.0},
+                                {'sigma': 10.0, 'rho': 2.0, 'beta': 3.0}])
+
+    def test_z_maxima(self):
+        trajectory = np.zeros((7, 3))
+        trajectory[:, 2] = [0, 1, 0, 2, 2, 1, 3]
+        np.testing.assert_array_equal(z_maxima(trajectory), [1, 2])
+
+    def test_run(self):
+        sweep = ParameterSweep(solver_params={'order': 8}, n_steps=500, transient=100, processes=1)
+        result = sweep.run(parameter_grid(rho=[0.5, 28.0]), [(1, 1, 1), (-2, 3, 20)])
+        self.assertEqual(result.counts.shape, (2, 2))
+        self.assertTrue(np.all(result.counts[0] == 0))
+        self.assertTrue(np.all(result.counts[1] > 0))
+        rho, values = result.bifurcation_points()
+        self.assertEqual(len(values), result.counts.sum())
+        self.assertTrue(np.all(rho == 28.0))
+
+    def test_matches_single_trajectory(self):
+        sweep = ParameterSweep(integrator='Runge-Kutta', n_steps=300, transient=50, processes=1)
+        result = sweep.run(parameter_grid(rho=[28.0]), [(1, 1, 1)])
+        trajectory = RungeKutta4th(LorenzEquation()).integrate((1, 1, 1), 350)[50:]
+        np.testing.assert_array_equal(result.summary(0, 0), z_maxima(trajectory))
+
+    def test_batched_and_pool_agree(self):
+        params = parameter_grid(rho=np.linspace(20, 30, 5))
+        points = [(1, 1, 1), (5, 5, 25)]
+        serial = ParameterSweep(integrator='Runge-Kutta', n_steps=300, transient=20, processes=1).run(params, points)
+        pooled = ParameterSweep(integrator='Runge-Kutta', n_steps=300, transient=20, processes=2,
+                                batch_size=3).run(params, points)
+        np.testing.assert_array_equal(serial.counts, pooled.counts)
+        np.testing.assert_allclose(serial.values, pooled.values, rtol=1e-9)
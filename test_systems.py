@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+import numpy as np
+
+from integrators import LorenzEquation, TaylorIntegrator, RungeKutta4th, AdaptiveTaylorIntegrator
+from systems import PolynomialSystem, SYSTEMS, expand, lorenz, rossler
+
+
+class TestExpand(TestCase):
+    def test_expand(self):
+        polynomial = expand('(c - a) * x - x * z / 2 + (x + 1) ** 2', ('x', 'z', 'a', 'c'))
+        self.assertEqual(polynomial, {(1, 0, 0, 1): 1.0, (1, 0, 1, 0): -1.0, (1, 1, 0, 0): -0.5,
+                                      (2, 0, 0, 0): 1.0, (1, 0, 0, 0): 2.0, (0, 0, 0, 0): 1.0})
+
+    def test_not_polynomial(self):
+        for expression in ('x / y', 'x ** 0.5', 'sin(x)', 'w * x'):
+            with self.assertRaises(AssertionError):
+                expand(expression, ('x', 'y'))
+
+
+class TestPolynomialSystem(TestCase):
+    def test_lorenz_declaration(self):
+        declared, equation = lorenz(), LorenzEquation()
+        point = np.array([1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(declared.eval(point), equation.eval(point))
+        taylor = TaylorIntegrator(equation)
+        taylor.set_solver_params({'order': 20, 'time step': 0.01})
+        np.testing.assert_allclose(declared.taylor_coefficients(point, 20), taylor.coefficients(point), rtol=1e-13)
+        for integrator_class in (TaylorIntegrator, RungeKutta4th):
+            expected = integrator_class(equation).integrate(point, 200)
+            np.testing.assert_allclose(integrator_class(declared).integrate(point, 200), expected, rtol=1e-10)
+
+    def test_integrate_matches_step(self):
+        for name, factory in SYSTEMS.items():
+            system = factory()
+            point = (0.1, 0.2, 0.3)
+            for integrator in (TaylorIntegrator(system), RungeKutta4th(system)):
+                expected = [point]
+                for _ in range(50):
+                    expected.append(integrator.step(expected[-1]))
+                np.testing.assert_array_equal(integrator.integrate(point, 50), np.asarray(expected[1:]), name)
+
+    def test_taylor_against_runge_kutta(self):
+        system = rossler()
+        taylor = TaylorIntegrator(system)
+        taylor.set_solver_params({'order': 20, 'time step': 0.01})
+        runge = RungeKutta4th(system)
+        runge.set_solver_params({'time step': 0.001})
+        np.testing.assert_allclose(taylor.integrate((1, 1, 1), 100)[-1], runge.integrate((1, 1, 1), 1000)[-1],
+                                   atol=1e-10)
+
+    def test_batch_with_parameter_arrays(self):
+        system = rossler()
+        system.set_params({'a': np.array([0.1, 0.2]), 'b': np.array([0.2, 0.3]), 'c': np.array([5.7, 4.0])})
+        points = np.array([[1.0, 2.0, 3.0], [-1.0, 0.5, 2.0]])
+        taylor = TaylorIntegrator(system)
+        batch = taylor.step_batch(points)
+        for i in range(2):
+            single = rossler()
+            single.set_params({'a': system.a[i], 'b': system.b[i], 'c': system.c[i]})
+            np.testing.assert_allclose(batch[i], TaylorIntegrator(single).step(points[i]), rtol=1e-14)
+            np.testing.assert_allclose(system.eval_batch(points)[i], single.eval(points[i]), rtol=1e-14)
+
+    def test_constant_equation(self):
+        system = PolynomialSystem('drift', ('1', 'x', 'k * y'), {'k': 2.0})
+        taylor = TaylorIntegrator(system)
+        taylor.set_solver_params({'order': 4, 'time step': 0.5})
+        # x = t, y = t ** 2 / 2, z = t ** 3 / 3 is reproduced exactly by order 4
+        np.testing.assert_allclose(taylor.integrate((0, 0, 0), 2), [[0.5, 0.125, 0.125 / 3], [1, 0.5, 1 / 3]])
+        np.testing.assert_array_equal(taylor.step_batch(np.zeros((2, 3))), [[0.5, 0.125, 0.125 / 3]] * 2)
+
+    def test_adaptive_taylor(self):
+        system = rossler()
+        solver = AdaptiveTaylorIntegrator(system)
+        _, points = solver.solve((1, 1, 1), 1.0)
+        taylor = TaylorIntegrator(rossler())
+        taylor.set_solver_params({'order': 20, 'time step': 0.01})
+        np.testing.assert_allclose(points[-1], taylor.integrate((1, 1, 1), 100)[-1], atol=1e-9)
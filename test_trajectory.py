@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+import numpy as np
+
+from trajectory import TrajectoryBuffer
+
+
+def points(count, start=0):
+    """distinct points, row i is (i, 2i, 3i)"""
+    return np.arange(start, start + count)[:, None] * np.array([1.0, 2.0, 3.0])
+
+
+class TestTrajectoryBuffer(TestCase):
+    def test_append_grows(self):
+        buffer = TrajectoryBuffer(capacity=2)
+        for point in points(100):
+            buffer.append(point)
+        self.assertEqual(len(buffer), 100)
+        np.testing.assert_array_equal(buffer.view(), points(100))
+
+    def test_extend(self):
+        buffer = TrajectoryBuffer(capacity=4)
+        buffer.extend(points(3))
+        buffer.extend(points(20, 3))
+        np.testing.assert_array_equal(buffer.view(), points(23))
+        np.testing.assert_array_equal(buffer.last(), points(1, 22)[0])
+
+    def test_ring_append(self):
+        buffer = TrajectoryBuffer(max_length=7)
+        for count, point in enumerate(points(30), 1):
+            buffer.append(point)
+            np.testing.assert_array_equal(buffer.view(), points(min(count, 7), max(count - 7, 0)))
+
+    def test_ring_extend(self):
+        buffer = TrajectoryBuffer(max_length=5)
+        total = 0
+        for size in (2, 4, 1, 5, 12, 3):
+            buffer.extend(points(size, total))
+            total += size
+            np.testing.assert_array_equal(buffer.view(), points(min(total, 5), max(total - 5, 0)))
+
+    def test_ring_memory_bounded(self):
+        buffer = TrajectoryBuffer(max_length=10)
+        data = buffer.data
+        buffer.extend(points(1000))
+        self.assertIs(buffer.data, data)
+
+    def test_columns_are_views(self):
+        buffer = TrajectoryBuffer(max_length=4)
+        buffer.extend(points(6))
+        x_values, y_values, z_values = buffer.columns()
+        self.assertIs(x_values.base, buffer.data)
+        self.assertTrue(x_values.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(np.stack([x_values, y_values, z_values], axis=1), points(4, 2))
+
+    def test_reset(self):
+        buffer = TrajectoryBuffer()
+        buffer.extend(points(10))
+        buffer.reset(points(2, 50))
+        np.testing.assert_array_equal(buffer[:, 0], [50, 51])
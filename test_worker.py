@@ -0,0 +1,74 @@
+import time
+from unittest import TestCase
+
+import numpy as np
+
+from integrators import LorenzEquation, RungeKutta4th
+from cache import TrajectoryCache
+from worker import IntegrationWorker
+
+
+def wait_for(worker, n_points, timeout=5.0):
+    """takes n_points from worker, waiting for the producer"""
+    parts, count, deadline = [], 0, time.monotonic() + timeout
+    while count < n_points and time.monotonic() < deadline:
+        part = worker.take(n_points - count)
+        parts.append(part)
+        count += len(part)
+        time.sleep(0.001)
+    return np.concatenate(parts)
+
+
+class TestIntegrationWorker(TestCase):
+    def setUp(self):
+        self.integrator = RungeKutta4th(LorenzEquation())
+        self.worker = IntegrationWorker(self.integrator, (1, 1, 1), chunk_size=7, max_chunks=3)
+
+    def tearDown(self):
+        self.worker.stop()
+        if self.worker.is_alive():
+            self.worker.join(timeout=5)
+
+    def test_take_follows_trajectory(self):
+        self.worker.start()
+        points = wait_for(self.worker, 50)
+        np.testing.assert_array_equal(points, RungeKutta4th(LorenzEquation()).integrate((1, 1, 1), 50))
+
+    def test_backpressure(self):
+        self.worker.start()
+        time.sleep(0.2)
+        self.assertLessEqual(self.worker.chunks.qsize(), 3)
+        self.assertEqual(len(self.worker.take(100)), 21)
+
+    def test_restart_drops_computed_steps(self):
+        self.worker.start()
+        wait_for(self.worker, 5)
+        time.sleep(0.1)
+        self.worker.restart((2, 2, 2), apply=lambda: self.integrator.set_lorenz_params(
+            {'sigma': 10.0, 'rho': 15.0, 'beta': 8 / 3}))
+        points = wait_for(self.worker, 30)
+        np.testing.assert_array_equal(points, RungeKutta4th(LorenzEquation(rho=15.0)).integrate((2, 2, 2), 30))
+
+    def test_take_without_data(self):
+        self.assertEqual(self.worker.take(10).shape, (0, 3))
+
+    def test_cached_trajectory(self):
+        cache = TrajectoryCache()
+        self.worker.cache = cache
+        self.worker.start()
+        first = wait_for(self.worker, 40)
+        self.worker.restart((1, 1, 1))
+        second = wait_for(self.worker, 40)
+        expected = RungeKutta4th(LorenzEquation()).integrate((1, 1, 1), 40)
+        np.testing.assert_array_equal(first, expected)
+        np.testing.assert_array_equal(second, expected)
+        self.assertEqual(cache.statistics['misses'], 1)
+
+    def test_trajectory_outgrowing_cache(self):
+        cache = TrajectoryCache(max_bytes=2 * 21 * 3 * 8)
+        self.worker.cache = cache
+        self.worker.start()
+        points = wait_for(self.worker, 100)
+        np.testing.assert_array_equal(points, RungeKutta4th(LorenzEquation()).integrate((1, 1, 1), 100))
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertEqual(cache.statistics['misses'], 1)
@@ -0,0 +1,137 @@
+"""
+growable storage for trajectories of 3d points
+"""
+import numpy as np
+
+
+class TrajectoryBuffer:
+    """
+    preallocated store of 3d points with amortized O(1) append
+    points are kept coordinate-major, so x, y and z are contiguous rows
+    with max_length set buffer works as ring and keeps only the last max_length points,
+    every point is then written twice (at i and i + max_length),
+    so the window of last points is always one contiguous slice
+    """
+
+    def __init__(self, max_length=None, capacity=1024):
+        """
+        :param max_length: None for unbounded trajectory, otherwise number of last points kept
+        :param capacity: initial number of preallocated points for unbounded trajectory
+        """
+        assert max_length is None or max_length > 0
+        self.max_length = max_length
+        if max_length is None:
+            self.data = np.empty((3, max(int(capacity), 1)))
+        else:
+            self.data = np.empty((3, 2 * max_length))
+        self.count = 0
+
+    def __len__(self):
+        """
+        :return: number of points currently stored
+        """
+        if self.max_length is None:
+            return self.count
+        return min(self.count, self.max_length)
+
+    def _window(self):
+        """
+        :return: start and end index of stored points in self.data
+        """
+        if self.max_length is None:
+            return 0, self.count
+        end = (self.count - 1) % self.max_length + self.max_length + 1 if self.count else 0
+        return end - len(self), end
+
+    def _grow(self, needed):
+        """
+        doubles the capacity of unbounded buffer until needed points fit
+        :param needed: number of points that has to fit
+        """
+        capacity = self.data.shape[1]
+        while capacity < needed:
+            capacity *= 2
+        data = np.empty((3, capacity))
+        data[:, :self.count] = self.data[:, :self.count]
+        self.data = data
+
+    def append(self, point):
+        """
+        adds one point at the end of trajectory
+        :param point: 3 values
+        """
+        if self.max_length is None:
+            if self.count == self.data.shape[1]:
+                self._grow(self.count + 1)
+            self.data[:, self.count] = point
+        else:
+            position = self.count % self.max_length
+            self.data[:, position] = point
+            self.data[:, position + self.max_length] = point
+        self.count += 1
+
+    def extend(self, points):
+        """
+        adds several points at the end of trajectory
+        :param points: array like of shape (N, 3)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if self.max_length is None:
+            if self.count + len(points) > self.data.shape[1]:
+                self._grow(self.count + len(points))
+            self.data[:, self.count:self.count + len(points)] = points.T
+            self.count += len(points)
+            return
+        # only the last max_length points can survive
+        skipped = max(len(points) - self.max_length, 0)
+        self.count += skipped
+        for chunk_start in range(skipped, len(points), self.max_length):
+            chunk = points[chunk_start:chunk_start + self.max_length]
+            position = self.count % self.max_length
+            first = min(len(chunk), self.max_length - position)
+            for offset in (0, self.max_length):
+                self.data[:, position + offset:position + offset + first] = chunk[:first].T
+                self.data[:, offset:offset + len(chunk) - first] = chunk[first:].T
+            self.count += len(chunk)
+
+    def clear(self):
+        """
+        removes all points, keeps allocated memory
+        """
+        self.count = 0
+
+    def reset(self, points):
+        """
+        replaces stored points
+        :param points: array like of shape (N, 3)
+        """
+        self.clear()
+        self.extend(points)
+
+    def columns(self):
+        """
+        zero-copy views of stored points, ready for Line3D.set_data and set_3d_properties
+        views are valid until next append or extend
+        :return: tuple of x, y, z ndarrays
+        """
+        start, end = self._window()
+        return self.data[0, start:end], self.data[1, start:end], self.data[2, start:end]
+
+    def view(self):
+        """
+        zero-copy view of stored points, valid until next append or extend
+        :return: ndarray of shape (N, 3)
+        """
+        start, end = self._window()
+        return self.data[:, start:end].T
+
+    def last(self):
+        """
+        :return: copy of the last stored point as ndarray
+        """
+        assert self.count > 0
+        _, end = self._window()
+        return self.data[:, end - 1].copy()
+
+    def __getitem__(self, item):
+        return self.view()[item]
@@ -0,0 +1,114 @@
+"""
+background integration for the GUI,
+worker thread integrates ahead into bounded queue, drawing code only takes what is ready
+"""
+import queue
+import threading
+
+import numpy as np
+
+
+class IntegrationWorker(threading.Thread):
+    """
+    producer thread computing chunks of trajectory ahead of the animation,
+    full queue blocks the producer (backpressure when GUI falls behind),
+    every restart bumps generation, chunks of older generations are thrown away
+    """
+
+    def __init__(self, integrator, start, chunk_size=10, max_chunks=100, cache=None):
+        """
+        :param integrator: any integrator with integrate(initial, n_steps)
+        :param start: point the trajectory continues from
+        :param chunk_size: steps computed at once
+        :param max_chunks: chunks computed ahead at most
+        :param cache: optional TrajectoryCache, chunks are then taken from trajectory cached for point of last restart
+               until it outgrows memory budget of the cache, then they are integrated from the last point
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.integrator = integrator
+        self.point = np.asarray(start, dtype=float)
+        self.cache = cache
+        # point of last restart and steps computed from it, they address the cached trajectory
+        self.origin = self.point
+        self.done = 0
+        self.chunk_size = chunk_size
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        # held while integrating, so changes of integrator never happen in the middle of a chunk
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.stopped = threading.Event()
+        self.pending = np.empty((0, 3))
+
+    def run(self):
+        """
+        producer loop
+        """
+        while not self.stopped.is_set():
+            with self.lock:
+                generation = self.generation
+                if (self.cache is not None and self.cache.accepts(self.integrator)
+                        and self.cache.fits(self.done + self.chunk_size)):
+                    trajectory = self.cache.get(self.integrator, self.origin, self.done + self.chunk_size)
+                    chunk = np.array(trajectory[self.done + 1:])
+                else:
+                    chunk = self.integrator.integrate(self.point, self.chunk_size)
+                self.point = chunk[-1]
+                self.done += self.chunk_size
+            while not self.stopped.is_set() and generation == self.generation:
+                try:
+                    self.chunks.put((generation, chunk), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def restart(self, point, apply=None, integrator=None):
+        """
+        drops everything computed ahead and continues from point,
+        safe to call from GUI thread while worker is running
+        :param point: point the trajectory continues from, ie. last drawn point
+        :param apply: optional function without arguments changing equation or solver params
+        :param integrator: optional integrator replacing the current one
+        """
+        with self.lock:
+            if apply is not None:
+                apply()
+            if integrator is not None:
+                self.integrator = integrator
+            self.point = self.origin = np.asarray(point, dtype=float)
+            self.done = 0
+            self.generation += 1
+            self.pending = np.empty((0, 3))
+            while True:
+                try:
+                    self.chunks.get_nowait()
+                except queue.Empty:
+                    break
+
+    def take(self, n_points):
+        """
+        takes up to n_points ready points of current generation without waiting,
+        must be called from one thread only
+        :param n_points: maximal number of points
+        :return: ndarray of shape (N, 3), N <= n_points, possibly empty
+        """
+        parts, count = [], 0
+        while count < n_points:
+            if not len(self.pending):
+                try:
+                    generation, chunk = self.chunks.get_nowait()
+                except queue.Empty:
+                    break
+                if generation != self.generation:
+                    continue
+                self.pending = chunk
+            part = self.pending[:n_points - count]
+            self.pending = self.pending[len(part):]
+            parts.append(part)
+            count += len(part)
+        return np.concatenate(parts) if parts else np.empty((0, 3))
+
+    def stop(self):
+        """
+        stops the producer loop
+        """
+        self.stopped.set()